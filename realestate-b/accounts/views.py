@@ -366,11 +366,8 @@ def dashboard_stats(request):
                 agent=user, status__in=["new", "contacted", "viewing", "qualified"]
             ).count(),
             "unread_messages": Conversation.objects.filter(
-                agent=user, messages__is_read=False
-            )
-            .exclude(messages__sender=user)
-            .distinct()
-            .count(),
+                agent=user, agent_unread_count__gt=0
+            ).count(),
             "upcoming_bookings": Booking.objects.filter(
                 agent=user, status__in=["pending", "confirmed"]
             ).count(),
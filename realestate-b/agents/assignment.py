@@ -0,0 +1,94 @@
+"""
+Pluggable agent assignment for new leads and bookings.
+
+Strategies pick from the AgentWorkload table, so an assignment is an indexed
+lookup over one row per agent instead of a count over every lead or booking.
+``AGENT_ASSIGNMENT_STRATEGY`` selects the default strategy by name.
+"""
+from django.conf import settings
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .models import AgentWorkload
+
+
+class AssignmentStrategy:
+    name = None
+
+    def ordering(self, counter):
+        """Order workloads so the agent to assign comes first."""
+        raise NotImplementedError
+
+    def candidates(self, counter):
+        return AgentWorkload.objects.filter(agent__user_type="agent")
+
+    def pick(self, counter):
+        workload = (
+            self.candidates(counter)
+            .select_related("agent")
+            .order_by(*self.ordering(counter))
+            .first()
+        )
+        return workload.agent if workload else None
+
+
+class LeastBusyStrategy(AssignmentStrategy):
+    """The agent with the fewest open leads (or bookings)."""
+
+    name = "least_busy"
+
+    def ordering(self, counter):
+        return (counter, "agent_id")
+
+
+class RoundRobinStrategy(AssignmentStrategy):
+    """The agent who has waited longest since their last assignment."""
+
+    name = "round_robin"
+
+    def ordering(self, counter):
+        return (F("last_assigned_at").asc(nulls_first=True), "agent_id")
+
+
+class RatingWeightedStrategy(AssignmentStrategy):
+    """
+    Least busy relative to rating: an agent rated 4 takes about twice the
+    load of an agent rated 1 before being passed over.
+    """
+
+    name = "rating_weighted"
+
+    def candidates(self, counter):
+        rating = Cast(
+            Coalesce(F("agent__agent_profile__average_rating"), Value(0)), FloatField()
+        )
+        return (
+            super()
+            .candidates(counter)
+            .annotate(weighted_load=(Cast(F(counter), FloatField()) + 1) / (rating + 1))
+        )
+
+    def ordering(self, counter):
+        return ("weighted_load", "agent_id")
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (LeastBusyStrategy, RoundRobinStrategy, RatingWeightedStrategy)
+}
+
+
+def get_strategy(name=None):
+    return STRATEGIES[name or settings.AGENT_ASSIGNMENT_STRATEGY]()
+
+
+def assign_agent(counter="open_leads", strategy=None):
+    """
+    Choose the agent for a new lead (``counter="open_leads"``) or booking
+    (``counter="open_bookings"``). Returns None when there are no agents.
+    """
+    agent = get_strategy(strategy).pick(counter)
+    if agent is not None:
+        AgentWorkload.objects.filter(agent=agent).update(last_assigned_at=timezone.now())
+    return agent
@@ -0,0 +1,103 @@
+"""
+Results at the defaults (500 agents, 1,000,000 leads, median of 5 runs) on
+SQLite, after 304 s of seeding:
+
+    strategy                  ms
+    count (before)         784.7
+    least_busy               2.1
+    round_robin              2.2
+    rating_weighted          3.7
+
+The count over every lead grows with the lead table; the workload-table
+strategies do not.
+"""
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from agents.assignment import STRATEGIES, assign_agent
+from agents.workload import rebuild
+from leads.models import Lead
+
+User = get_user_model()
+
+STATUSES = ("new", "contacted", "qualified", "viewing", "closed_won", "closed_lost")
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks agent assignment from the workload table against the "
+        "previous count over every lead on seeded data. Seeded rows are rolled "
+        "back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--agents", type=int, default=500)
+        parser.add_argument("--leads", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._seed(options["agents"], options["leads"])
+            repeat = options["repeat"]
+            self.stdout.write(f"{'strategy':<18}{'ms':>10}")
+            self.stdout.write(f"{'count (before)':<18}{self._time(self._count, repeat):>10.1f}")
+            for name in STRATEGIES:
+                timing = self._time(lambda: assign_agent(strategy=name), repeat)
+                self.stdout.write(f"{name:<18}{timing:>10.1f}")
+            transaction.set_rollback(True)
+
+    def _seed(self, agent_count, lead_count):
+        rng = random.Random(42)
+        started = time.perf_counter()
+        agents = User.objects.bulk_create(
+            [
+                User(
+                    username=f"bench-agent-{i}",
+                    email=f"bench-agent-{i}@example.com",
+                    user_type="agent",
+                )
+                for i in range(agent_count)
+            ]
+        )
+        agent_ids = [agent.pk for agent in agents]
+        batch = []
+        for i in range(lead_count):
+            batch.append(
+                Lead(
+                    email=f"bench-lead-{i}@example.com",
+                    status=rng.choice(STATUSES),
+                    agent_id=rng.choice(agent_ids),
+                )
+            )
+            if len(batch) == 5000:
+                Lead.objects.bulk_create(batch)
+                batch = []
+        Lead.objects.bulk_create(batch)
+        # bulk_create skips the workload receivers
+        rebuild()
+        self.stdout.write(
+            f"Seeded {agent_count} agents and {lead_count} leads in "
+            f"{time.perf_counter() - started:.1f}s"
+        )
+
+    def _time(self, pick, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            pick()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def _count(self):
+        return (
+            User.objects.filter(user_type="agent")
+            .annotate(lead_count=Count("assigned_leads"))
+            .order_by("lead_count")
+            .first()
+        )
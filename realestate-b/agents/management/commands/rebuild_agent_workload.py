@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from agents.workload import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recounts every agent's open leads and bookings"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt workload for {count} agents."))
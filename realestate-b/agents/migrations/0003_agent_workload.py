@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# As agents.workload.rebuild at the time of this migration
+def _per_agent(queryset):
+    return dict(
+        queryset.filter(agent__isnull=False)
+        .order_by()
+        .values("agent")
+        .annotate(total=Count("pk"))
+        .values_list("agent", "total")
+    )
+
+
+def backfill_workload(apps, schema_editor):
+    CustomUser = apps.get_model("accounts", "CustomUser")
+    Lead = apps.get_model("leads", "Lead")
+    Booking = apps.get_model("bookings", "Booking")
+    AgentWorkload = apps.get_model("agents", "AgentWorkload")
+
+    open_leads = _per_agent(Lead.objects.exclude(status__in=("closed_won", "closed_lost")))
+    open_bookings = _per_agent(Booking.objects.filter(status__in=("pending", "confirmed")))
+    AgentWorkload.objects.bulk_create(
+        [
+            AgentWorkload(
+                agent_id=agent_id,
+                open_leads=open_leads.get(agent_id, 0),
+                open_bookings=open_bookings.get(agent_id, 0),
+            )
+            for agent_id in CustomUser.objects.filter(user_type="agent").values_list("pk", flat=True)
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_alter_customuser_user_type'),
+        ('agents', '0002_agentprofile_slug'),
+        ('bookings', '0002_booking_lead'),
+        ('leads', '0008_lead_scoring_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentWorkload',
+            fields=[
+                ('agent', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='workload', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('open_leads', models.PositiveIntegerField(default=0)),
+                ('open_bookings', models.PositiveIntegerField(default=0)),
+                ('last_assigned_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['open_leads', 'agent'], name='workload_open_leads_idx'), models.Index(fields=['open_bookings', 'agent'], name='workload_open_bookings_idx'), models.Index(fields=['last_assigned_at', 'agent'], name='workload_last_assigned_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_workload, migrations.RunPython.noop),
+    ]
@@ -66,3 +66,30 @@ class AgentReview(models.Model):
 
     def __str__(self):
         return f"Review for {self.agent.user.get_full_name()} by {self.client_name}"
+
+
+class AgentWorkload(models.Model):
+    """
+    Per-agent load counters used to assign new leads and bookings (see
+    agents.assignment). Kept current by the receivers in agents.signals;
+    ``python manage.py rebuild_agent_workload`` recomputes them.
+    """
+
+    agent = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="workload"
+    )
+    # Leads not yet closed (won or lost)
+    open_leads = models.PositiveIntegerField(default=0)
+    # Bookings still pending or confirmed
+    open_bookings = models.PositiveIntegerField(default=0)
+    last_assigned_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["open_leads", "agent"], name="workload_open_leads_idx"),
+            models.Index(fields=["open_bookings", "agent"], name="workload_open_bookings_idx"),
+            models.Index(fields=["last_assigned_at", "agent"], name="workload_last_assigned_idx"),
+        ]
+
+    def __str__(self):
+        return f"Workload - {self.agent.username}"
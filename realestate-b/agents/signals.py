@@ -1,6 +1,14 @@
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import AgentProfile
+
+from bookings.models import Booking
+from leads.models import Lead
+
+from . import workload
+from .models import AgentProfile, AgentWorkload
+
+User = get_user_model()
 
 @receiver(post_save, sender=AgentProfile)
 def sync_user_verification(sender, instance, **kwargs):
@@ -17,3 +25,71 @@ def sync_user_verification(sender, instance, **kwargs):
         user.is_verified = instance.is_verified
         user.save(update_fields=['is_verified'])
         del user._syncing_verification
+
+
+# ─── Workload counters ───────────────────────────────────────────────────────
+
+
+def _workload_states(instance, created, update_fields, is_open):
+    """
+    ``(agent_id, is_open)`` of ``instance`` as loaded and as saved, or None
+    when it was saved without having been loaded.
+    """
+    agent_id, status = instance.agent_id, instance.status
+    if created:
+        return (None, False), (agent_id, is_open(status))
+    if not hasattr(instance, "_loaded_status"):
+        return None
+    # Fields left out of update_fields keep their loaded values in the database
+    if update_fields is not None and "agent" not in update_fields:
+        agent_id = instance._loaded_agent_id
+    if update_fields is not None and "status" not in update_fields:
+        status = instance._loaded_status
+    before = (instance._loaded_agent_id, is_open(instance._loaded_status))
+    return before, (agent_id, is_open(status))
+
+
+def _move_workload(counter, instance, created, raw, update_fields, is_open):
+    if raw:
+        return
+    states = _workload_states(instance, created, update_fields, is_open)
+    if states is not None:
+        workload.move(counter, *states)
+
+
+def _release_workload(counter, instance, is_open):
+    status = getattr(instance, "_loaded_status", instance.status)
+    agent_id = getattr(instance, "_loaded_agent_id", instance.agent_id)
+    workload.move(counter, (agent_id, is_open(status)), (None, False))
+
+
+@receiver(post_save, sender=Lead)
+def count_open_lead(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    _move_workload("open_leads", instance, created, raw, update_fields, workload.lead_is_open)
+
+
+@receiver(post_delete, sender=Lead)
+def uncount_open_lead(sender, instance, **kwargs):
+    _release_workload("open_leads", instance, workload.lead_is_open)
+
+
+@receiver(post_save, sender=Booking)
+def count_open_booking(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    _move_workload(
+        "open_bookings", instance, created, raw, update_fields, workload.booking_is_open
+    )
+
+
+@receiver(post_delete, sender=Booking)
+def uncount_open_booking(sender, instance, **kwargs):
+    _release_workload("open_bookings", instance, workload.booking_is_open)
+
+
+@receiver(post_save, sender=User)
+def create_agent_workload(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Give agents a workload row so assignment can consider them."""
+    if raw or instance.user_type != "agent":
+        return
+    if created or update_fields is None or "user_type" in update_fields:
+        if not AgentWorkload.objects.filter(agent=instance).exists():
+            workload.rebuild(agent_ids=[instance.pk])
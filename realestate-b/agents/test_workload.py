@@ -0,0 +1,170 @@
+"""
+Tests for agent workload counters (agents.workload) and assignment
+strategies (agents.assignment).
+"""
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from agents.assignment import assign_agent
+from agents.models import AgentProfile, AgentWorkload
+from agents.workload import rebuild
+from bookings.models import Booking
+from leads.models import Lead
+
+pytestmark = [pytest.mark.integration]
+
+
+def workload(agent):
+    return AgentWorkload.objects.get(agent=agent)
+
+
+@pytest.fixture
+def booking_factory(client_user_factory, property_factory):
+    def create_booking(agent, status="pending"):
+        return Booking.objects.create(
+            property=property_factory(agent=agent),
+            client=client_user_factory(),
+            agent=agent,
+            date=timezone.now() + timedelta(days=1),
+            status=status,
+        )
+
+    return create_booking
+
+
+class TestCounters:
+    def test_agents_get_a_workload_row(self, agent_user_factory, client_user_factory):
+        agent = agent_user_factory()
+        client = client_user_factory()
+
+        assert workload(agent).open_leads == 0
+        assert not AgentWorkload.objects.filter(agent=client).exists()
+
+    def test_open_leads_follow_assignment_and_status(self, agent_user_factory, lead_factory):
+        first, second = agent_user_factory(), agent_user_factory()
+        lead = lead_factory(agent=first)
+        assert workload(first).open_leads == 1
+
+        lead = Lead.objects.get(pk=lead.pk)
+        lead.agent = second
+        lead.save()
+        assert workload(first).open_leads == 0
+        assert workload(second).open_leads == 1
+
+        lead.status = "closed_won"
+        lead.save(update_fields=["status"])
+        assert workload(second).open_leads == 0
+
+        lead.status = "negotiation"
+        lead.save()
+        assert workload(second).open_leads == 1
+
+        lead.delete()
+        assert workload(second).open_leads == 0
+
+    def test_open_bookings_follow_status(self, agent_user_factory, booking_factory):
+        agent = agent_user_factory()
+        booking = booking_factory(agent)
+        booking_factory(agent, status="completed")
+        assert workload(agent).open_bookings == 1
+
+        booking.status = "cancelled"
+        booking.save()
+        assert workload(agent).open_bookings == 0
+
+    def test_rebuild_matches_receivers(self, agent_user_factory, lead_factory, booking_factory):
+        agent = agent_user_factory()
+        lead_factory(agent=agent)
+        lead_factory(agent=agent, status="closed_lost")
+        booking_factory(agent)
+        expected = workload(agent)
+
+        AgentWorkload.objects.update(open_leads=0, open_bookings=0)
+        rebuild()
+
+        rebuilt = workload(agent)
+        assert (rebuilt.open_leads, rebuilt.open_bookings) == (
+            expected.open_leads,
+            expected.open_bookings,
+        )
+        assert rebuilt.open_leads == 1
+
+    def test_rebuild_skips_non_agents(self, agent_user_factory, client_user_factory):
+        agent, client = agent_user_factory(), client_user_factory()
+
+        rebuild(agent_ids=[agent.pk, client.pk])
+
+        assert workload(agent).open_leads == 0
+        assert not AgentWorkload.objects.filter(agent=client).exists()
+
+
+class TestStrategies:
+    @pytest.fixture
+    def agents(self, agent_user_factory):
+        busy, idle = agent_user_factory(), agent_user_factory()
+        # Only these two agents take part
+        AgentWorkload.objects.exclude(agent__in=[busy, idle]).delete()
+        AgentWorkload.objects.filter(agent=busy).update(
+            open_leads=3, last_assigned_at=timezone.now()
+        )
+        AgentWorkload.objects.filter(agent=idle).update(
+            open_leads=1, last_assigned_at=timezone.now() - timedelta(hours=1)
+        )
+        return busy, idle
+
+    def test_least_busy(self, agents):
+        busy, idle = agents
+        assert assign_agent(strategy="least_busy") == idle
+
+    def test_round_robin_takes_turns(self, agents):
+        busy, idle = agents
+        assert assign_agent(strategy="round_robin") == idle
+        assert assign_agent(strategy="round_robin") == busy
+
+    def test_rating_weighted_prefers_top_rated(self, agents):
+        busy, idle = agents
+        AgentProfile.objects.create(
+            user=busy, bio="", license_number="L-1", average_rating=5
+        )
+        assert assign_agent(strategy="rating_weighted") == busy
+
+    def test_default_strategy_from_settings(self, agents, settings):
+        busy, idle = agents
+        settings.AGENT_ASSIGNMENT_STRATEGY = "least_busy"
+        assert assign_agent() == idle
+
+    def test_no_agents(self, db):
+        AgentWorkload.objects.all().delete()
+        assert assign_agent() is None
+
+    def test_assignment_is_a_single_lookup(self, agents, django_assert_num_queries):
+        # One pick and one last_assigned_at update, however many leads exist
+        with django_assert_num_queries(2):
+            assign_agent()
+
+
+class TestBookingAssignment:
+    def test_booking_without_agent_uses_strategy(
+        self, client_client, agent_user_factory, property_factory, booking_factory
+    ):
+        prop = property_factory()
+        prop.agent = None
+        prop.save()
+        busy, idle = agent_user_factory(), agent_user_factory()
+        booking_factory(busy)
+        AgentWorkload.objects.exclude(agent__in=[busy, idle]).delete()
+
+        response = client_client.post(
+            reverse("booking-list"),
+            {"property": prop.pk, "date": (timezone.now() + timedelta(days=2)).isoformat()},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        booking = Booking.objects.get(pk=response.data["id"])
+        assert booking.agent == idle
+        assert workload(idle).open_bookings == 1
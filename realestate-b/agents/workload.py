@@ -0,0 +1,106 @@
+"""
+Maintenance of the AgentWorkload counters.
+
+A lead counts towards its agent's ``open_leads`` until it is closed; a
+booking counts towards ``open_bookings`` while it is pending or confirmed.
+The receivers in ``agents.signals`` move the counters by deltas in the same
+transaction as the lead or booking write, comparing against the agent and
+status the row was loaded with.
+
+Writes that bypass signals (``QuerySet.update``, ``bulk_create``) must call
+``adjust`` themselves, or be followed by
+``python manage.py rebuild_agent_workload``.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+from bookings.models import Booking
+from leads.models import Lead
+
+from .models import AgentWorkload
+
+CLOSED_LEAD_STATUSES = ("closed_won", "closed_lost")
+OPEN_BOOKING_STATUSES = ("pending", "confirmed")
+
+
+def lead_is_open(status):
+    return status is not None and status not in CLOSED_LEAD_STATUSES
+
+
+def booking_is_open(status):
+    return status in OPEN_BOOKING_STATUSES
+
+
+def adjust(agent_id, counter, delta):
+    """Move ``counter`` of ``agent_id``'s workload by ``delta``."""
+    if agent_id is None or not delta:
+        return
+    value = F(counter) + delta
+    if delta < 0:
+        value = Greatest(value, Value(0))
+    if not AgentWorkload.objects.filter(agent_id=agent_id).update(**{counter: value}):
+        # First assignment to an agent without a workload row yet
+        rebuild(agent_ids=[agent_id])
+
+
+def move(counter, before, after):
+    """
+    Apply the change of a row from ``before`` to ``after``, each an
+    ``(agent_id, is_open)`` pair.
+    """
+    if before == after:
+        return
+    before_agent, before_open = before
+    after_agent, after_open = after
+    if before_open:
+        adjust(before_agent, counter, -1)
+    if after_open:
+        adjust(after_agent, counter, 1)
+
+
+def rebuild(agent_ids=None):
+    """
+    Recompute the workload of every agent (or of those among ``agent_ids``)
+    with one grouped count per counter.
+    """
+    agents = get_user_model().objects.filter(user_type="agent")
+    leads = Lead.objects.exclude(status__in=CLOSED_LEAD_STATUSES)
+    bookings = Booking.objects.filter(status__in=OPEN_BOOKING_STATUSES)
+    if agent_ids is not None:
+        agents = agents.filter(pk__in=agent_ids)
+        leads = leads.filter(agent_id__in=agent_ids)
+        bookings = bookings.filter(agent_id__in=agent_ids)
+
+    def per_agent(queryset):
+        return dict(
+            queryset.filter(agent__isnull=False)
+            .order_by()
+            .values("agent")
+            .annotate(total=Count("pk"))
+            .values_list("agent", "total")
+        )
+
+    open_leads = per_agent(leads)
+    open_bookings = per_agent(bookings)
+    agent_ids = list(agents.values_list("pk", flat=True))
+    last_assigned = dict(
+        AgentWorkload.objects.filter(agent_id__in=agent_ids).values_list(
+            "agent_id", "last_assigned_at"
+        )
+    )
+
+    AgentWorkload.objects.filter(agent_id__in=agent_ids).delete()
+    AgentWorkload.objects.bulk_create(
+        [
+            AgentWorkload(
+                agent_id=agent_id,
+                open_leads=open_leads.get(agent_id, 0),
+                open_bookings=open_bookings.get(agent_id, 0),
+                last_assigned_at=last_assigned.get(agent_id),
+            )
+            for agent_id in agent_ids
+        ],
+        batch_size=500,
+    )
+    return len(agent_ids)
@@ -1,5 +1,14 @@
 from django.contrib import admin
-from .models import PropertyView, SearchAnalytics, LeadConversion, AgentPerformance
+from .models import (
+    AgentPerformance,
+    DailyLeadStats,
+    DailyPropertyStats,
+    DailySearchStats,
+    DailySiteStats,
+    LeadConversion,
+    PropertyView,
+    SearchAnalytics,
+)
 
 
 @admin.register(PropertyView)
@@ -42,3 +51,30 @@ class AgentPerformanceAdmin(admin.ModelAdmin):
     search_fields = ("agent__username", "agent__email")
     readonly_fields = ("created_at", "updated_at")
     raw_id_fields = ("agent",)
+
+
+@admin.register(DailyPropertyStats)
+class DailyPropertyStatsAdmin(admin.ModelAdmin):
+    list_display = ("date", "property", "views")
+    list_filter = ("date",)
+    raw_id_fields = ("property",)
+
+
+@admin.register(DailySiteStats)
+class DailySiteStatsAdmin(admin.ModelAdmin):
+    list_display = ("date", "views")
+    exclude = ("visitors",)
+
+
+@admin.register(DailyLeadStats)
+class DailyLeadStatsAdmin(admin.ModelAdmin):
+    list_display = ("date", "agent", "source", "created", "won", "lost")
+    list_filter = ("date", "source")
+    raw_id_fields = ("agent",)
+
+
+@admin.register(DailySearchStats)
+class DailySearchStatsAdmin(admin.ModelAdmin):
+    list_display = ("date", "normalized_query", "searches", "zero_result_searches")
+    list_filter = ("date",)
+    search_fields = ("normalized_query",)
@@ -0,0 +1,163 @@
+"""
+Grouped lead aggregates for the analytics dashboards.
+
+Each figure is computed with one ``GROUP BY`` query over the given leads,
+so its cost stays flat as charts gain buckets or choices gain entries, or
+time series gain days.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Case, CharField, Count, DateField, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from leads.models import Lead
+
+# (name, highest score in the tier); scores above the last bound are "very_hot"
+SCORE_TIERS = (("cold", 25), ("warm", 50), ("hot", 75))
+TOP_SCORE_TIER = "very_hot"
+
+HISTOGRAM_STEP = 10
+HISTOGRAM_MAX = 100
+
+# Longest time series the dashboards ask for
+MAX_SERIES_DAYS = 365
+
+
+def _period_start(day, interval):
+    return day - timedelta(days=day.weekday()) if interval == "week" else day
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class LeadAggregates:
+    """
+    Aggregates over ``leads`` (every lead by default), e.g.
+    ``LeadAggregates(Lead.objects.filter(agent=user)).score_distribution()``.
+    """
+
+    def __init__(self, leads=None):
+        self.leads = Lead.objects.all() if leads is None else leads
+
+    def counts_by(self, field):
+        """``{value: count}`` of the leads grouped by ``field``."""
+        return dict(
+            self.leads.order_by()
+            .values(field)
+            .annotate(count=Count("pk"))
+            .values_list(field, "count")
+        )
+
+    def score_distribution(self):
+        """
+        Lead counts per score tier and per 10-point histogram bucket (1-10
+        up to 91-100), the average score and the total, from one query
+        grouped by tier and bucket.
+        """
+        tier = Case(
+            *[When(score__lte=bound, then=Value(name)) for name, bound in SCORE_TIERS],
+            default=Value(TOP_SCORE_TIER),
+            output_field=CharField(),
+        )
+        bucket = Case(
+            *[
+                When(score__gt=low, score__lte=low + HISTOGRAM_STEP, then=Value(low))
+                for low in range(0, HISTOGRAM_MAX, HISTOGRAM_STEP)
+            ],
+            default=Value(None),
+            output_field=IntegerField(),
+        )
+        rows = (
+            self.leads.order_by()
+            .annotate(tier=tier, bucket=bucket)
+            .values("tier", "bucket")
+            .annotate(count=Count("pk"), score_total=Sum("score"))
+        )
+
+        distribution = dict.fromkeys([name for name, _ in SCORE_TIERS] + [TOP_SCORE_TIER], 0)
+        buckets = dict.fromkeys(range(0, HISTOGRAM_MAX, HISTOGRAM_STEP), 0)
+        total = score_total = 0
+        for row in rows:
+            distribution[row["tier"]] += row["count"]
+            if row["bucket"] is not None:
+                buckets[row["bucket"]] += row["count"]
+            total += row["count"]
+            score_total += row["score_total"] or 0
+
+        return {
+            "distribution": distribution,
+            "histogram": [
+                {
+                    "range": f"{low + 1}-{low + HISTOGRAM_STEP}",
+                    "count": count,
+                    "min": low + 1,
+                    "max": low + HISTOGRAM_STEP,
+                }
+                for low, count in buckets.items()
+            ],
+            "average_score": score_total / total if total else 0,
+            "total_leads": total,
+        }
+
+    def source_distribution(self):
+        """
+        Count and share of each ``Lead.SOURCE_CHOICES`` entry that has
+        leads, in choice order, and the total.
+        """
+        counts = self.counts_by("source")
+        total = sum(counts.values())
+        return {
+            "distribution": [
+                {
+                    "source": source,
+                    "label": label,
+                    "count": counts[source],
+                    "percentage": round(counts[source] / total * 100, 1),
+                }
+                for source, label in Lead.SOURCE_CHOICES
+                if counts.get(source)
+            ],
+            "total": total,
+        }
+
+    def time_series(self, start, end, interval="day", by=None):
+        """
+        Leads created from ``start`` to ``end`` (dates, inclusive, in the
+        current time zone) counted per day, or per week starting on Monday
+        when ``interval="week"``. Periods without leads are filled in with
+        zero counts.
+
+        Returns ``[{"date": date, "count": n}]`` in date order; with ``by``,
+        each point also has ``"breakdown"``, ``{value: count}`` of its
+        leads grouped by that field.
+        """
+        truncate = TruncWeek if interval == "week" else TruncDate
+        fields = ["period", by] if by else ["period"]
+        rows = (
+            self.leads.filter(
+                created_at__gte=_day_start(start),
+                created_at__lt=_day_start(end + timedelta(days=1)),
+            )
+            .order_by()
+            .annotate(period=truncate("created_at", output_field=DateField()))
+            .values(*fields)
+            .annotate(count=Count("pk"))
+        )
+
+        step = timedelta(days=7 if interval == "week" else 1)
+        series = {}
+        period = _period_start(start, interval)
+        while period <= end:
+            series[period] = {"date": period, "count": 0}
+            if by:
+                series[period]["breakdown"] = {}
+            period += step
+
+        for row in rows:
+            point = series[row["period"]]
+            point["count"] += row["count"]
+            if by:
+                point["breakdown"][row[by]] = row["count"]
+        return list(series.values())
@@ -0,0 +1,143 @@
+"""
+Retention for the raw ``PropertyView`` and ``SearchAnalytics`` tables.
+
+``manage.py archive_analytics`` archives rows older than the table's
+retention window a local day at a time, oldest first. It first rolls the
+day up into the daily tables (``analytics.rollups``), then writes the rows
+to a gzipped JSONL or CSV file under ``MEDIA_ROOT/archive/<table>/<year>/``
+and deletes them in batches, so no statement holds a large delete.
+
+The last day archived is kept in ``RollupState`` as ``archive:<table>``;
+rollups never rewrite a day at or before it. A run interrupted between
+export and delete exports the remaining rows again to a second file for the
+same day (``<day>.1.jsonl.gz``), so rows can appear in two files but are
+never lost; their ``id`` tells them apart.
+"""
+import csv
+import gzip
+import json
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Min
+
+from . import rollups
+from .models import PropertyView, RollupState, SearchAnalytics
+
+FORMATS = ("jsonl", "csv")
+
+
+class Archive:
+    """Archiving of one raw table, ``model``, by its ``timestamp`` field."""
+
+    def __init__(self, name, model, timestamp, retention_setting):
+        self.name = name
+        self.model = model
+        self.timestamp = timestamp
+        self.retention_setting = retention_setting
+        self.fields = [field.attname for field in model._meta.concrete_fields]
+
+    @property
+    def retention_days(self):
+        return getattr(settings, self.retention_setting)
+
+    @property
+    def directory(self):
+        return Path(settings.MEDIA_ROOT) / "archive" / self.name
+
+    def cutoff(self, retention_days=None):
+        """The first local day to keep."""
+        retention_days = self.retention_days if retention_days is None else retention_days
+        return rollups.local_date() - timedelta(days=retention_days)
+
+    def due_days(self, retention_days=None):
+        """
+        The days with rows to archive, oldest first: those before the
+        cutoff that are already rolled up.
+        """
+        first = self.model.objects.aggregate(first=Min(self.timestamp))["first"]
+        through = rollups.rolled_through()
+        if first is None or through is None:
+            return []
+        first = rollups.local_date(first)
+        last = min(self.cutoff(retention_days) - timedelta(days=1), through)
+        return [first + timedelta(days=n) for n in range((last - first).days + 1)]
+
+    def rows(self, day):
+        return self.model.objects.filter(
+            **{
+                f"{self.timestamp}__gte": rollups.day_start(day),
+                f"{self.timestamp}__lt": rollups.day_start(day + timedelta(days=1)),
+            }
+        )
+
+    def archive_day(self, day, fmt="jsonl", batch_size=5000):
+        """
+        Export the rows of ``day`` and delete them. Returns
+        ``(rows archived, path of the file written or None)``.
+        """
+        rows = self.rows(day).order_by("pk")
+        last_pk = rows.values_list("pk", flat=True).last()
+        path = None
+        exported = 0
+        if last_pk is not None:
+            rows = rows.filter(pk__lte=last_pk)
+            path = self._path(day, fmt)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(path, "wt", encoding="utf-8", newline="") as out:
+                exported = self._export(rows, out, fmt, batch_size)
+
+            # Only rows already exported are deleted
+            while True:
+                batch = list(rows.values_list("pk", flat=True)[:batch_size])
+                if not batch:
+                    break
+                self.model.objects.filter(pk__in=batch).delete()
+
+        RollupState.objects.update_or_create(
+            name=f"archive:{self.name}", defaults={"rolled_through": day}
+        )
+        return exported, path
+
+    def _export(self, rows, out, fmt, batch_size):
+        values = rows.values(*self.fields).iterator(chunk_size=batch_size)
+        count = 0
+        if fmt == "jsonl":
+            for row in values:
+                out.write(json.dumps(row, cls=DjangoJSONEncoder))
+                out.write("\n")
+                count += 1
+            return count
+
+        writer = csv.DictWriter(out, fieldnames=self.fields)
+        writer.writeheader()
+        for row in values:
+            writer.writerow(
+                {
+                    field: json.dumps(value) if isinstance(value, (dict, list)) else value
+                    for field, value in row.items()
+                }
+            )
+            count += 1
+        return count
+
+    def _path(self, day, fmt):
+        directory = self.directory / f"{day:%Y}"
+        path = directory / f"{day.isoformat()}.{fmt}.gz"
+        part = 0
+        while path.exists():
+            part += 1
+            path = directory / f"{day.isoformat()}.{part}.{fmt}.gz"
+        return path
+
+
+PROPERTY_VIEWS = Archive(
+    "property_views", PropertyView, "viewed_at", "PROPERTY_VIEW_RETENTION_DAYS"
+)
+SEARCHES = Archive(
+    "searches", SearchAnalytics, "searched_at", "SEARCH_ANALYTICS_RETENTION_DAYS"
+)
+
+ARCHIVES = {archive.name: archive for archive in (PROPERTY_VIEWS, SEARCHES)}
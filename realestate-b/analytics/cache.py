@@ -0,0 +1,146 @@
+"""
+Two-level caching for expensive dashboard payloads.
+
+A ``LayeredCache`` keeps recent values in a per-process LRU in front of the
+Django cache backend, so a hot payload costs neither a query nor a cache
+round trip. Every value carries an ETag (a hash of its JSON) computed once
+when it is built.
+
+Values are fresh for as many seconds as the ``ttl_setting`` setting says and
+are then kept for ``stale_setting`` seconds more. To avoid a stampede when a
+value expires, one caller takes a short lock in the Django cache
+(``cache.add``) and rebuilds it while the others keep serving the stale
+value; with no value at all, they wait for the rebuild for up to
+``lock_timeout`` seconds before building it themselves. Within a process,
+one thread per key rebuilds at a time and the others serve the stale value
+meanwhile; only a cold miss waits for it.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+WAIT_INTERVAL = 0.05
+
+
+class LayeredCache:
+    def __init__(self, prefix, ttl_setting, stale_setting, maxsize=64, lock_timeout=10):
+        self.prefix = prefix
+        self.ttl_setting = ttl_setting
+        self.stale_setting = stale_setting
+        self.maxsize = maxsize
+        self.lock_timeout = lock_timeout
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._building = {}
+
+    @property
+    def ttl(self):
+        return getattr(settings, self.ttl_setting)
+
+    @property
+    def stale_ttl(self):
+        return getattr(settings, self.stale_setting)
+
+    def get(self, key, build):
+        """
+        ``(value, etag)`` for ``key``, calling ``build()`` to make the value
+        when no fresh one is cached.
+        """
+        entry = self._get_local(key)
+        if self._is_fresh(entry):
+            return entry["value"], entry["etag"]
+
+        key_lock = self._key_lock(key)
+        stale = entry if self._is_servable(entry) else None
+        if not key_lock.acquire(blocking=stale is None):
+            # Another thread of this process is rebuilding it
+            return stale["value"], stale["etag"]
+        try:
+            # Another thread of this process may have rebuilt it meanwhile
+            entry = self._get_local(key)
+            if self._is_fresh(entry):
+                return entry["value"], entry["etag"]
+
+            entry = cache.get(self._key(key))
+            if self._is_fresh(entry):
+                self._set_local(key, entry)
+                return entry["value"], entry["etag"]
+
+            lock_key = self._key(key, "lock")
+            if cache.add(lock_key, True, self.lock_timeout):
+                try:
+                    entry = self._build(key, build)
+                finally:
+                    cache.delete(lock_key)
+            elif entry is None:
+                entry = self._wait(key) or self._build(key, build)
+            # else: another process is rebuilding; serve the stale value
+            return entry["value"], entry["etag"]
+        finally:
+            key_lock.release()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+        cache.delete(self._key(key))
+
+    def clear(self):
+        """Empty this process's LRU (the shared entries expire on their own)."""
+        with self._lock:
+            self._local.clear()
+
+    def _build(self, key, build):
+        value = build()
+        encoded = json.dumps(value, cls=DjangoJSONEncoder, sort_keys=True).encode()
+        entry = {
+            "value": value,
+            "etag": f'"{hashlib.sha1(encoded).hexdigest()}"',
+            "fresh_until": time.time() + self.ttl,
+        }
+        cache.set(self._key(key), entry, self.ttl + self.stale_ttl)
+        self._set_local(key, entry)
+        return entry
+
+    def _wait(self, key):
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            entry = cache.get(self._key(key))
+            if entry is not None:
+                self._set_local(key, entry)
+                return entry
+        return None
+
+    def _key(self, key, *suffix):
+        return ":".join([self.prefix, key, *suffix])
+
+    def _is_fresh(self, entry):
+        return entry is not None and entry["fresh_until"] > time.time()
+
+    def _is_servable(self, entry):
+        """Fresh, or stale for no longer than ``stale_setting`` seconds."""
+        return entry is not None and entry["fresh_until"] + self.stale_ttl > time.time()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._building.setdefault(key, threading.Lock())
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                self._local.move_to_end(key)
+            return entry
+
+    def _set_local(self, key, entry):
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
@@ -0,0 +1,187 @@
+"""
+Sections of the management dashboard.
+
+``management_analytics``, ``management_metrics`` and ``search_analytics``
+each serve a few of them. ``summary`` builds all of them for
+``management_summary`` in one pass: the lead score and source
+distributions share one ``LeadAggregates``, and the lead total comes from
+the score distribution instead of another count.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from agents.models import AgentProfile
+from leads.models import Lead
+from properties.models import Property
+
+from . import performance, rollups
+from .aggregates import LeadAggregates
+from .models import AgentPerformance, PropertyView, SearchAnalytics
+
+User = get_user_model()
+
+
+def overview(total_leads=None):
+    property_totals = Property.objects.aggregate(
+        total=Count("id"),
+        verified=Count("id", filter=Q(is_verified=True)),
+        revenue=Sum("price", filter=Q(status="sold")),
+    )
+    total_properties = property_totals["total"]
+    verified_properties = property_totals["verified"]
+    return {
+        "total_properties": total_properties,
+        "verified_properties": verified_properties,
+        "total_agents": AgentProfile.objects.count(),
+        "total_clients": User.objects.filter(user_type="client").count(),
+        "total_leads": Lead.objects.count() if total_leads is None else total_leads,
+        "total_revenue": property_totals["revenue"] or 0,
+        "property_status_distribution": {
+            "verified": verified_properties,
+            "pending": total_properties - verified_properties,  # Approximation
+            "rejected": 0,  # We don't have a rejected status field explicitly usually
+        },
+    }
+
+
+def today():
+    today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        "new_properties": Property.objects.filter(created_at__gte=today_start).count(),
+        "new_leads": Lead.objects.filter(created_at__gte=today_start).count(),
+        "property_views": PropertyView.objects.filter(viewed_at__gte=today_start).count(),
+        "searches": SearchAnalytics.objects.filter(searched_at__gte=today_start).count(),
+    }
+
+
+def new_agents_this_month():
+    start_of_month = timezone.localdate().replace(day=1)
+    return User.objects.filter(user_type="agent", date_joined__gte=start_of_month).count()
+
+
+def _performance_rows():
+    """
+    The latest month's rows stored by ``manage.py compute_agent_performance``
+    or, before it has stored any, this month's computed on read.
+    """
+    period = performance.latest_period()
+    if period is not None:
+        return list(AgentPerformance.objects.filter(period=period).select_related("agent"))
+    rows = performance.compute(performance.month_start())
+    agents_by_id = User.objects.in_bulk(rows)
+    for agent_id, perf in rows.items():
+        perf.agent = agents_by_id[agent_id]
+    return list(rows.values())
+
+
+def agents():
+    """``(top_agents, agent_performance_list)`` from the latest month's performance."""
+    perfs = _performance_rows()
+    top = sorted(perfs, key=lambda perf: (-perf.properties_sold, -perf.leads_generated, perf.agent_id))
+    by_revenue = sorted(perfs, key=lambda perf: (-perf.total_sales_value, perf.agent_id))
+    top_agents = [
+        {
+            "username": perf.agent.username,
+            "properties_count": perf.properties_listed,
+            "leads_count": perf.leads_generated,
+            "sold_properties": perf.properties_sold,
+        }
+        for perf in top[:5]
+    ]
+    agent_list = [
+        {
+            "id": perf.agent.id,
+            "username": perf.agent.username,
+            "email": perf.agent.email,
+            "properties_count": perf.properties_listed,
+            "properties_sold": perf.properties_sold,
+            "leads_count": perf.leads_generated,
+            "revenue": perf.total_sales_value,
+            "median_response_time": perf.median_response_time,
+            "p90_response_time": perf.p90_response_time,
+        }
+        for perf in by_revenue[:20]
+    ]
+    return top_agents, agent_list
+
+
+def lead_trends(days):
+    """Leads created on each of the last ``days`` days, from the daily rollups."""
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    created = rollups.LEADS.totals(start, end, by=("date",))
+    return [
+        {"date": date.strftime("%Y-%m-%d"), "count": created[(date,)]["created"]}
+        for date in (start + timedelta(days=i) for i in range(days))
+    ]
+
+
+def monthly_metrics():
+    """This month's conversion rate and per-source performance, from the daily rollups."""
+    start_of_month = timezone.localdate().replace(day=1)
+    by_source = rollups.LEADS.totals(start_of_month, timezone.localdate(), by=("source",))
+
+    # Calculate conversion rate: closed_won / (closed_won + closed_lost)
+    won_leads = sum(counts["won"] for counts in by_source.values())
+    lost_leads = sum(counts["lost"] for counts in by_source.values())
+    total_closed = won_leads + lost_leads
+    conversion_rate = round((won_leads / total_closed * 100) if total_closed > 0 else 0, 2)
+
+    source_performance = []
+    for src, label in Lead.SOURCE_CHOICES:
+        total = by_source[(src,)]["created"]
+        converted = by_source[(src,)]["won"]
+        if total > 0:
+            source_performance.append({
+                "source": src,
+                "label": label,
+                "total_leads": total,
+                "conversions": converted,
+                "rate": round((converted / total * 100), 2),
+            })
+
+    return {
+        "this_month": {
+            "new_agents": new_agents_this_month(),
+            "conversion_rate": conversion_rate,
+            "won_leads": won_leads,
+            "lost_leads": lost_leads,
+        },
+        "source_performance": source_performance,
+    }
+
+
+def popular_searches(limit=20):
+    """
+    The most frequent normalized queries of all time, from the daily search
+    rollups and the raw searches after them (archiving deletes raw searches
+    once they are rolled up); filter-only listings have none.
+    """
+    totals = rollups.SEARCHES.totals(
+        None, rollups.local_date(), by=("normalized_query",), normalized_query__gt=""
+    )
+    ranked = sorted(totals.items(), key=lambda item: (-item[1]["searches"], item[0]))
+    return [{"query": query, "count": counts["searches"]} for (query,), counts in ranked[:limit]]
+
+
+def summary(trend_days):
+    """Every section of the management dashboard, with ``trend_days`` of lead trends."""
+    leads = LeadAggregates()
+    scores = leads.score_distribution()
+    metrics = monthly_metrics()
+    top_agents, agent_list = agents()
+    return {
+        "overview": overview(total_leads=scores["total_leads"]),
+        "today": today(),
+        "this_month": metrics["this_month"],
+        "source_performance": metrics["source_performance"],
+        "top_agents": top_agents,
+        "agent_performance_list": agent_list,
+        "lead_trends": lead_trends(trend_days),
+        "lead_score_distribution": scores,
+        "lead_source_distribution": leads.source_distribution(),
+        "popular_searches": popular_searches(),
+    }
@@ -0,0 +1,134 @@
+"""
+HyperLogLog sketches for approximate distinct counts.
+
+A sketch has ``2 ** precision`` one-byte registers. At the default precision
+of 12 the standard error of a count is about 1.6% whatever the cardinality.
+Sketches of the same precision merge by taking the larger of each pair of
+registers, so the sketch of a union of sets can be built from the sketches
+of its parts.
+
+``to_bytes`` stores a sketch sparsely (3 bytes per used register) while
+that is smaller than the dense form, so the many sketches of small sets (a
+property's visitors on one day) stay a few bytes each.
+"""
+import hashlib
+import math
+import re
+import struct
+
+DEFAULT_PRECISION = 12
+
+_SPARSE = 1
+_DENSE = 2
+_SPARSE_ENTRY = struct.Struct(">HB")
+_USED_REGISTER = re.compile(rb"[^\x00]")
+
+
+def _sigma(x):
+    if x == 1:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous, z = z, z + x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x):
+    if x in (0, 1):
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        y *= 0.5
+        previous, z = z, z - (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+class HyperLogLog:
+    def __init__(self, precision=DEFAULT_PRECISION):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        """Add ``value`` (a str or bytes) to the set."""
+        if isinstance(value, str):
+            value = value.encode()
+        hashed = int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "big")
+        rest_bits = 64 - self.precision
+        index = hashed >> rest_bits
+        rank = rest_bits - (hashed & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, other):
+        """Merge ``other`` (a sketch or its bytes) into this sketch."""
+        if not isinstance(other, HyperLogLog):
+            self.merge_bytes(other)
+            return
+        self._check_precision(other.precision)
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def merge_bytes(self, data):
+        """Merge a sketch serialized by ``to_bytes`` without decoding it first."""
+        data = bytes(data)
+        if not data:
+            return
+        kind, precision = data[0], data[1]
+        self._check_precision(precision)
+        registers = self.registers
+        if kind == _SPARSE:
+            for index, rank in _SPARSE_ENTRY.iter_unpack(data[2:]):
+                if rank > registers[index]:
+                    registers[index] = rank
+        elif kind == _DENSE:
+            self.registers = bytearray(map(max, registers, data[2:]))
+        else:
+            raise ValueError(f"Unknown sketch encoding {kind}")
+
+    def count(self):
+        """
+        The estimated number of distinct values added, using Ertl's improved
+        estimator ("New cardinality estimation algorithms for HyperLogLog
+        sketches", 2017), which needs no bias-correction tables.
+        """
+        m = len(self.registers)
+        max_rank = 65 - self.precision
+        histogram = [0] * (max_rank + 1)
+        for rank in self.registers:
+            histogram[rank] += 1
+
+        z = m * _tau(1 - histogram[max_rank] / m)
+        for rank in range(max_rank - 1, 0, -1):
+            z = 0.5 * (z + histogram[rank])
+        z += m * _sigma(histogram[0] / m)
+        return round(m * m / (2 * math.log(2) * z)) if z != math.inf else 0
+
+    def to_bytes(self):
+        registers = self.registers
+        used = len(registers) - registers.count(0)
+        if used * _SPARSE_ENTRY.size < len(registers):
+            return bytes([_SPARSE, self.precision]) + b"".join(
+                _SPARSE_ENTRY.pack(match.start(), registers[match.start()])
+                for match in _USED_REGISTER.finditer(registers)
+            )
+        return bytes([_DENSE, self.precision]) + bytes(registers)
+
+    @classmethod
+    def from_bytes(cls, data, precision=DEFAULT_PRECISION):
+        """Decode ``to_bytes`` output; empty data is an empty sketch."""
+        data = bytes(data)
+        sketch = cls(data[1] if data else precision)
+        sketch.merge_bytes(data)
+        return sketch
+
+    def _check_precision(self, precision):
+        if precision != self.precision:
+            raise ValueError(
+                f"Cannot merge a sketch of precision {precision} into {self.precision}"
+            )
@@ -0,0 +1,73 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.archive import ARCHIVES, FORMATS
+from analytics.rollups import rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Archives raw property views and searches older than their retention "
+        "window: rolls them up, exports them to gzipped JSONL or CSV files "
+        "under MEDIA_ROOT/archive and deletes them in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--table",
+            choices=sorted(ARCHIVES),
+            action="append",
+            help="Archive only this table (repeatable; default: all)",
+        )
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            help="Keep this many days instead of the table's configured retention",
+        )
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only list the days that would be archived"
+        )
+
+    def handle(self, *args, **options):
+        retention_days = options["retention_days"]
+        if retention_days is not None and retention_days < 1:
+            raise CommandError("--retention-days must be at least 1")
+        fmt = options["format"] or settings.ANALYTICS_ARCHIVE_FORMAT
+        if fmt not in FORMATS:
+            raise CommandError(f"Unknown archive format {fmt!r}")
+        batch_size = options["batch_size"] or settings.ANALYTICS_ARCHIVE_BATCH_SIZE
+        archives = [ARCHIVES[name] for name in options["table"] or sorted(ARCHIVES)]
+
+        if not options["dry_run"]:
+            # Archived days must be rolled up first
+            rollup()
+
+        for archive in archives:
+            days = archive.due_days(retention_days)
+            if not days:
+                self.stdout.write(f"{archive.name}: nothing to archive.")
+                continue
+            if options["dry_run"]:
+                rows = sum(archive.rows(day).count() for day in days)
+                self.stdout.write(
+                    f"{archive.name}: would archive {rows} rows from {days[0]} to {days[-1]}."
+                )
+                continue
+
+            started = time.perf_counter()
+            archived = 0
+            for day in days:
+                rows, _ = archive.archive_day(day, fmt, batch_size)
+                archived += rows
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{archive.name}: archived {archived} rows from {days[0]} to "
+                    f"{days[-1]} to {archive.directory} in {elapsed:.1f}s "
+                    f"({archived / elapsed if elapsed else 0:.0f} rows/s)."
+                )
+            )
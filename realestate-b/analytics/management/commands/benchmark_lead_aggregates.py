@@ -0,0 +1,90 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg
+
+from analytics.aggregates import LeadAggregates
+from leads.models import Lead
+
+SOURCES = [source for source, _ in Lead.SOURCE_CHOICES]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the grouped lead score and source distributions against "
+        "the previous one-count-per-bucket queries on seeded data. Seeded rows "
+        "are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--leads", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._seed(options["leads"])
+            repeat = options["repeat"]
+            self.stdout.write(f"{'endpoint':<22}{'before ms':>12}{'grouped ms':>12}")
+            for name, before, after in (
+                ("score distribution", self._score_counts, self._score_grouped),
+                ("source distribution", self._source_counts, self._source_grouped),
+            ):
+                self.stdout.write(
+                    f"{name:<22}{self._time(before, repeat):>12.1f}"
+                    f"{self._time(after, repeat):>12.1f}"
+                )
+            transaction.set_rollback(True)
+
+    def _seed(self, count):
+        rng = random.Random(42)
+        started = time.perf_counter()
+        batch = []
+        for i in range(count):
+            batch.append(
+                Lead(
+                    email=f"bench-lead-{i}@example.com",
+                    source=rng.choice(SOURCES),
+                    score=rng.randint(0, 300),
+                )
+            )
+            if len(batch) == 5000:
+                Lead.objects.bulk_create(batch)
+                batch = []
+        Lead.objects.bulk_create(batch)
+        self.stdout.write(f"Seeded {count} leads in {time.perf_counter() - started:.1f}s")
+
+    def _time(self, compute, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            compute()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def _score_counts(self):
+        leads = Lead.objects.all()
+        for low, high in ((None, 25), (25, 50), (50, 75), (75, None)):
+            bucket = leads
+            if low is not None:
+                bucket = bucket.filter(score__gt=low)
+            if high is not None:
+                bucket = bucket.filter(score__lte=high)
+            bucket.count()
+        for low in range(0, 100, 10):
+            leads.filter(score__gt=low, score__lte=low + 10).count()
+        leads.aggregate(avg=Avg("score"))
+        leads.count()
+
+    def _score_grouped(self):
+        LeadAggregates().score_distribution()
+
+    def _source_counts(self):
+        Lead.objects.count()
+        for source in SOURCES:
+            Lead.objects.filter(source=source).count()
+
+    def _source_grouped(self):
+        LeadAggregates().source_distribution()
@@ -0,0 +1,150 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from analytics import rollups
+from analytics.hll import HyperLogLog
+from analytics.models import PropertyView
+from properties.models import Property
+
+User = get_user_model()
+
+CARDINALITIES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks HyperLogLog unique-visitor counts: sketch accuracy across "
+        "cardinalities, then the rolled-up sketches against the previous "
+        "distinct count on seeded views. Seeded rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--views", type=int, default=1_000_000)
+        parser.add_argument("--visitors", type=int, default=200_000)
+        parser.add_argument("--properties", type=int, default=2_000)
+        parser.add_argument("--agents", type=int, default=50)
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        self._accuracy()
+        with transaction.atomic():
+            agent = self._seed(options)
+            started = time.perf_counter()
+            rollups.rollup()
+            self.stdout.write(f"Rolled up in {time.perf_counter() - started:.1f}s")
+
+            today = rollups.local_date()
+            repeat = options["repeat"]
+            self.stdout.write(
+                f"{'scope':<10}{'exact':>10}{'estimate':>10}{'error %':>9}"
+                f"{'distinct ms':>13}{'sketch ms':>11}"
+            )
+            for scope, filters in (("platform", {}), ("agent", {"property__agent": agent})):
+                exact, distinct_ms = self._time(
+                    lambda: PropertyView.objects.filter(**filters)
+                    .values("ip_address")
+                    .distinct()
+                    .count(),
+                    repeat,
+                )
+                estimate, sketch_ms = self._time(
+                    lambda: rollups.PROPERTIES.unique_visitors(None, today, **filters),
+                    repeat,
+                )
+                self.stdout.write(
+                    f"{scope:<10}{exact:>10}{estimate:>10}"
+                    f"{(estimate - exact) / exact * 100:>9.2f}"
+                    f"{distinct_ms:>13.1f}{sketch_ms:>11.1f}"
+                )
+            transaction.set_rollback(True)
+
+    def _accuracy(self):
+        """Errors of one sketch and of 30 merged partial sketches per cardinality."""
+        self.stdout.write(
+            f"{'distinct':>10}{'error %':>9}{'merged error %':>16}{'bytes':>7}"
+        )
+        for n in CARDINALITIES:
+            whole = HyperLogLog()
+            parts = [HyperLogLog() for _ in range(30)]
+            for i in range(n):
+                value = f"visitor-{n}-{i}"
+                whole.add(value)
+                parts[i % 30].add(value)
+            merged = HyperLogLog()
+            for part in parts:
+                merged.merge_bytes(part.to_bytes())
+            self.stdout.write(
+                f"{n:>10}{(whole.count() - n) / n * 100:>9.2f}"
+                f"{(merged.count() - n) / n * 100:>16.2f}{len(whole.to_bytes()):>7}"
+            )
+
+    def _seed(self, options):
+        rng = random.Random(42)
+        started = time.perf_counter()
+        agents = User.objects.bulk_create(
+            [
+                User(
+                    username=f"bench-agent-{i}",
+                    email=f"bench-agent-{i}@example.com",
+                    user_type="agent",
+                )
+                for i in range(options["agents"])
+            ]
+        )
+        properties = Property.objects.bulk_create(
+            [
+                Property(
+                    title=f"Bench property {i}",
+                    slug=f"bench-visitors-{i}",
+                    description="",
+                    price=1_000_000,
+                    price_display="",
+                    agent=rng.choice(agents),
+                )
+                for i in range(options["properties"])
+            ],
+            batch_size=5000,
+        )
+        property_ids = [prop.pk for prop in properties]
+
+        # viewed_at is auto_now_add, so each day's views are created now and
+        # then moved back to their day with one update.
+        days = options["days"]
+        per_day = options["views"] // days
+        today = rollups.local_date()
+        for n in range(days, 0, -1):
+            PropertyView.objects.bulk_create(
+                [
+                    PropertyView(
+                        property_id=rng.choice(property_ids),
+                        ip_address=self._ip(rng.randrange(options["visitors"])),
+                    )
+                    for _ in range(per_day)
+                ],
+                batch_size=5000,
+            )
+            PropertyView.objects.filter(viewed_at__gte=rollups.day_start(today)).update(
+                viewed_at=rollups.day_start(today - timedelta(days=n)) + timedelta(hours=12)
+            )
+        self.stdout.write(
+            f"Seeded {per_day * days} views in {time.perf_counter() - started:.1f}s"
+        )
+        return agents[0]
+
+    def _ip(self, number):
+        return f"10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}"
+
+    def _time(self, compute, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = compute()
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings)
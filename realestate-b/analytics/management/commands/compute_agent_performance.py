@@ -0,0 +1,45 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.performance import month_start, store
+
+
+def _month(value):
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+class Command(BaseCommand):
+    help = (
+        "Computes every agent's monthly performance (AgentPerformance) with "
+        "grouped queries. Defaults to the current month; re-running a month "
+        "replaces its figures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", type=_month, help="Compute this month (YYYY-MM)")
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=1,
+            help="Compute this many months, ending with --month or the current month",
+        )
+
+    def handle(self, *args, **options):
+        if options["months"] < 1:
+            raise CommandError("--months must be at least 1")
+        period = options["month"] or month_start()
+        periods = [period]
+        for _ in range(options["months"] - 1):
+            periods.append(month_start(periods[-1] - timedelta(days=1)))
+
+        for period in reversed(periods):
+            started = time.perf_counter()
+            created, updated = store(period)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{period:%Y-%m}: {created} created, {updated} updated in "
+                    f"{time.perf_counter() - started:.2f}s."
+                )
+            )
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('properties', '0011_property_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('rolled_through', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySearchStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('search_query', models.CharField(max_length=255)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('zero_result_searches', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('date', 'search_query')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyLeadStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('source', models.CharField(max_length=20)),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('won', models.PositiveIntegerField(default=0)),
+                ('lost', models.PositiveIntegerField(default=0)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_lead_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'source'], name='analytics_d_date_930fac_idx'), models.Index(fields=['agent', 'date'], name='analytics_d_agent_i_e1ad67_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPropertyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='properties.property')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['property', 'date'], name='analytics_d_propert_9713e6_idx')],
+                'unique_together': {('date', 'property')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:55
+
+from django.db import migrations, models
+
+
+def restart_rollups(apps, schema_editor):
+    # Days rolled up before this migration have no visitor sketches; dropping
+    # the watermark makes the next rollup_analytics run rewrite them.
+    apps.get_model("analytics", "RollupState").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySiteStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('visitors', models.BinaryField(default=b'')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='dailypropertystats',
+            name='visitors',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RunPython(restart_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_visitor_sketches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='searchanalytics',
+            index=models.Index(fields=['searched_at'], name='analytics_s_searche_a43152_idx'),
+        ),
+    ]
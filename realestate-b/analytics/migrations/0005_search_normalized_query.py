@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:08
+
+import re
+
+from django.db import migrations, models
+
+# As properties.search.normalize_query at the time of this migration
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_queries(apps, schema_editor):
+    SearchAnalytics = apps.get_model("analytics", "SearchAnalytics")
+    batch = []
+    for search in SearchAnalytics.objects.only("search_query").iterator(chunk_size=2000):
+        search.normalized_query = " ".join(_TERM_RE.findall(search.search_query.casefold()))[:255]
+        batch.append(search)
+        if len(batch) == 2000:
+            SearchAnalytics.objects.bulk_update(batch, ["normalized_query"])
+            batch = []
+    SearchAnalytics.objects.bulk_update(batch, ["normalized_query"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_search_analytics_searched_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchanalytics',
+            name='normalized_query',
+            field=models.CharField(blank=True, db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='searchanalytics',
+            name='results_count',
+            field=models.IntegerField(blank=True, default=0, null=True),
+        ),
+        migrations.RunPython(normalize_queries, migrations.RunPython.noop),
+    ]
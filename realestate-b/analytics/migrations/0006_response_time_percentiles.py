@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_search_normalized_query'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentperformance',
+            name='median_response_time',
+            field=models.DurationField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='agentperformance',
+            name='p90_response_time',
+            field=models.DurationField(blank=True, null=True),
+        ),
+    ]
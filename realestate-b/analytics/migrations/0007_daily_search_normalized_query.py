@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:37
+
+import re
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+
+# As properties.search.normalize_query at the time of this migration
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_rollups(apps, schema_editor):
+    """
+    Re-key the existing rows by normalized query, summing the rows of raw
+    queries that normalize alike. Archived days have no raw rows left to
+    roll up again, so the rows are merged rather than rebuilt.
+    """
+    DailySearchStats = apps.get_model("analytics", "DailySearchStats")
+    merged = defaultdict(Counter)
+    for row in DailySearchStats.objects.iterator(chunk_size=2000):
+        normalized = " ".join(_TERM_RE.findall(row.search_query.casefold()))[:255]
+        merged[(row.date, normalized)].update(
+            searches=row.searches, zero_result_searches=row.zero_result_searches
+        )
+    DailySearchStats.objects.all().delete()
+    DailySearchStats.objects.bulk_create(
+        [
+            DailySearchStats(
+                date=date,
+                search_query=normalized,
+                normalized_query=normalized,
+                searches=counts["searches"],
+                zero_result_searches=counts["zero_result_searches"],
+            )
+            for (date, normalized), counts in merged.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_response_time_percentiles'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='dailysearchstats',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='dailysearchstats',
+            name='normalized_query',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(normalize_rollups, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='dailysearchstats',
+            name='search_query',
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailysearchstats',
+            unique_together={('date', 'normalized_query')},
+        ),
+    ]
@@ -2,6 +2,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from properties.models import Property
+from properties.search import normalize_query
 from leads.models import Lead
 
 User = get_user_model()
@@ -25,12 +26,23 @@ class PropertyView(models.Model):
 
 class SearchAnalytics(models.Model):
     search_query = models.CharField(max_length=255)
+    # properties.search.normalize_query(search_query), grouped on for popularity
+    normalized_query = models.CharField(max_length=255, blank=True, db_index=True)
     filters_used = models.JSONField(default=dict, blank=True)
-    results_count = models.IntegerField(default=0)
+    # None when the listing was paged without a count
+    results_count = models.IntegerField(default=0, null=True, blank=True)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     ip_address = models.GenericIPAddressField()
     searched_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["searched_at"])]
+
+    def save(self, *args, **kwargs):
+        if not self.normalized_query:
+            self.normalized_query = normalize_query(self.search_query)
+        super().save(*args, **kwargs)
+
 
 class LeadConversion(models.Model):
     lead = models.OneToOneField(
@@ -63,9 +75,80 @@ class AgentPerformance(models.Model):
     average_response_time = models.DurationField(
         null=True, blank=True
     )  # Time to respond to leads
+    # First-response latency percentiles (analytics.response_times)
+    median_response_time = models.DurationField(null=True, blank=True)
+    p90_response_time = models.DurationField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ["agent", "period"]
+
+
+# ─── Daily rollups ───────────────────────────────────────────────────────────
+# Pre-aggregated per-day figures written by `manage.py rollup_analytics`
+# (see analytics.rollups). Days are local dates.
+
+
+class DailyPropertyStats(models.Model):
+    date = models.DateField()
+    property = models.ForeignKey(
+        Property, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    views = models.PositiveIntegerField(default=0)
+    # HyperLogLog sketch of the visitors' IP addresses (analytics.hll)
+    visitors = models.BinaryField(default=b"")
+
+    class Meta:
+        unique_together = ["date", "property"]
+        indexes = [models.Index(fields=["property", "date"])]
+
+
+class DailySiteStats(models.Model):
+    """Views and visitor sketch of every property together, per day."""
+
+    date = models.DateField(unique=True)
+    views = models.PositiveIntegerField(default=0)
+    visitors = models.BinaryField(default=b"")
+
+
+class DailyLeadStats(models.Model):
+    date = models.DateField()
+    agent = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="daily_lead_stats"
+    )
+    source = models.CharField(max_length=20)
+    created = models.PositiveIntegerField(default=0)
+    # Leads moved to (or created in) closed_won / closed_lost that day
+    won = models.PositiveIntegerField(default=0)
+    lost = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["date", "source"]),
+            models.Index(fields=["agent", "date"]),
+        ]
+
+
+class DailySearchStats(models.Model):
+    date = models.DateField()
+    # SearchAnalytics.normalized_query, so popularity survives archiving
+    normalized_query = models.CharField(max_length=255, blank=True)
+    searches = models.PositiveIntegerField(default=0)
+    zero_result_searches = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ["date", "normalized_query"]
+
+
+class RollupState(models.Model):
+    """
+    How far the daily rollups have been written, and, in the
+    ``archive:<table>`` rows, how far a raw table has been archived.
+    """
+
+    name = models.CharField(max_length=50, primary_key=True)
+    # Every day up to and including this one is rolled up (or archived)
+    rolled_through = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
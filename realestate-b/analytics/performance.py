@@ -0,0 +1,163 @@
+"""
+Monthly agent performance (``AgentPerformance``).
+
+``manage.py compute_agent_performance`` computes every agent's figures for a
+month with one grouped query per source table and writes them with
+``bulk_create``/``bulk_update``; the endpoints only read the stored rows.
+Months are local calendar months and a row's ``period`` is the first day.
+
+For the month:
+
+- ``properties_listed``: the agent's listings created in it.
+- ``leads_generated``: the agent's leads created in it, of which
+  ``leads_converted`` are now qualified or won.
+- ``properties_sold`` and ``total_sales_value``: the distinct properties,
+  and the sum of their prices, of the agent's leads moved to ``closed_won``
+  in it (``LeadStatusLog``).
+- ``average_response_time``, ``median_response_time`` and
+  ``p90_response_time``: the first-response latency of the leads created
+  in it (``analytics.response_times``).
+
+Leads count towards the agent they are assigned to now.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from leads.models import Lead, LeadStatusLog
+from properties.models import Property
+
+from . import response_times
+from .models import AgentPerformance
+from .rollups import day_start, local_date
+
+User = get_user_model()
+
+CONVERTED_STATUSES = ("closed_won", "qualified")
+
+FIELDS = (
+    "properties_listed",
+    "properties_sold",
+    "total_sales_value",
+    "leads_generated",
+    "leads_converted",
+    "conversion_rate",
+    "average_response_time",
+    "median_response_time",
+    "p90_response_time",
+)
+
+
+def month_start(day=None):
+    """The first day of ``day``'s month (default: this month)."""
+    return (day or local_date()).replace(day=1)
+
+
+def next_month(period):
+    return (period + timedelta(days=32)).replace(day=1)
+
+
+def compute(period, agent_ids=None):
+    """
+    Unsaved ``AgentPerformance`` rows of the month starting ``period``, for
+    every agent or just ``agent_ids``, as ``{agent_id: row}``.
+    """
+    start, end = day_start(period), day_start(next_month(period))
+    if agent_ids is None:
+        agent_ids = User.objects.filter(user_type="agent").values_list("pk", flat=True)
+    rows = {
+        agent_id: AgentPerformance(agent_id=agent_id, period=period, total_sales_value=0)
+        for agent_id in agent_ids
+    }
+
+    listed = (
+        Property.objects.filter(agent_id__in=rows, created_at__gte=start, created_at__lt=end)
+        .values("agent_id")
+        .annotate(count=Count("pk"))
+    )
+    for row in listed:
+        rows[row["agent_id"]].properties_listed = row["count"]
+
+    leads = Lead.objects.filter(
+        agent_id__in=rows, created_at__gte=start, created_at__lt=end
+    )
+    for row in leads.values("agent_id").annotate(
+        generated=Count("pk"),
+        converted=Count("pk", filter=Q(status__in=CONVERTED_STATUSES)),
+    ):
+        perf = rows[row["agent_id"]]
+        perf.leads_generated = row["generated"]
+        perf.leads_converted = row["converted"]
+        perf.conversion_rate = round(row["converted"] / row["generated"] * 100, 2)
+
+    for agent_id, latency in response_times.by_agent(leads).items():
+        perf = rows[agent_id]
+        perf.average_response_time = latency["average"]
+        perf.median_response_time = latency["median"]
+        perf.p90_response_time = latency["p90"]
+
+    sales = (
+        LeadStatusLog.objects.filter(
+            to_status="closed_won",
+            lead__agent_id__in=rows,
+            created_at__gte=start,
+            created_at__lt=end,
+        )
+        .values("lead__agent_id")
+        .annotate(
+            sold=Count("lead__property", distinct=True),
+            value=Sum("lead__property__price"),
+        )
+    )
+    for row in sales:
+        perf = rows[row["lead__agent_id"]]
+        perf.properties_sold = row["sold"]
+        perf.total_sales_value = row["value"] or 0
+    return rows
+
+
+def store(period):
+    """Compute and save every agent's row for ``period``. Returns ``(created, updated)``."""
+    rows = compute(period)
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            perf.agent_id: perf
+            for perf in AgentPerformance.objects.filter(period=period).select_for_update()
+        }
+        updated = []
+        for agent_id, perf in rows.items():
+            if agent_id in existing:
+                perf.pk = existing[agent_id].pk
+                perf.updated_at = now
+                updated.append(perf)
+        created = [perf for agent_id, perf in rows.items() if agent_id not in existing]
+        AgentPerformance.objects.bulk_update(updated, [*FIELDS, "updated_at"], batch_size=500)
+        AgentPerformance.objects.bulk_create(created, batch_size=500)
+    return len(created), len(updated)
+
+
+def agent_performance(agent, period=None):
+    """
+    ``agent``'s stored row for ``period`` (default: this month), or, before
+    the batch job has written it, an unsaved row computed for the agent alone.
+    """
+    period = period or month_start()
+    perf = AgentPerformance.objects.filter(agent=agent, period=period).first()
+    if perf is None:
+        perf = compute(period, [agent.pk])[agent.pk]
+        perf.agent = agent
+    return perf
+
+
+def latest_period():
+    """The most recent period with stored rows, up to this month, or None."""
+    return (
+        AgentPerformance.objects.filter(period__lte=month_start())
+        .order_by("-period")
+        .values_list("period", flat=True)
+        .first()
+    )
@@ -0,0 +1,74 @@
+"""
+Per-property analytics for ``property_analytics``.
+
+Daily views come from the daily rollups (``analytics.rollups``), bucketed by
+local date, and unique visitors are estimated from the rollups' visitor
+sketches. A property's figures are cached for
+``PROPERTY_ANALYTICS_CACHE_TTL`` seconds and dropped when the property view
+buffer flushes new views for it. The cache is shared between processes
+through Redis when ``REDIS_URL`` is set; without it, each process has its
+own and only the flushing process drops its copy, so the others may lag by
+up to the TTL.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from leads.models import Lead
+
+from . import rollups
+
+WINDOW_DAYS = 30
+
+
+def _cache_key(property_id):
+    return f"analytics:property:{property_id}"
+
+
+def property_summary(property_obj):
+    """Views, visitors and lead conversion of ``property_obj`` over the last 30 days."""
+    ttl = settings.PROPERTY_ANALYTICS_CACHE_TTL
+    key = _cache_key(property_obj.pk)
+    if ttl:
+        summary = cache.get(key)
+        if summary is not None:
+            return summary
+
+    end = rollups.local_date()
+    start = end - timedelta(days=WINDOW_DAYS - 1)
+    daily = rollups.PROPERTIES.totals(start, end, by=("date",), property=property_obj)
+    recent_views = [
+        {"date": day, "views": daily[(day,)]["views"]}
+        for day in (start + timedelta(days=i) for i in range(WINDOW_DAYS))
+    ]
+    window_views = sum(point["views"] for point in recent_views)
+
+    since = rollups.day_start(start)
+    unique_visitors = rollups.PROPERTIES.unique_visitors(start, end, property=property_obj)
+    leads = Lead.objects.filter(property=property_obj)
+    leads_from_property = leads.count()
+    recent_leads = leads.filter(created_at__gte=since).count()
+
+    summary = {
+        "total_views": property_obj.views,
+        "recent_views": recent_views,
+        "leads_from_property": leads_from_property,
+        "performance_metrics": {
+            "views_last_30_days": window_views,
+            "unique_visitors": unique_visitors,
+            "leads_last_30_days": recent_leads,
+            "conversion_rate": (
+                round(recent_leads / unique_visitors * 100, 2) if unique_visitors else 0
+            ),
+            "average_daily_views": round(window_views / WINDOW_DAYS, 2),
+        },
+    }
+    if ttl:
+        cache.set(key, summary, ttl)
+    return summary
+
+
+def invalidate(property_ids):
+    """Drop the cached summaries of ``property_ids``."""
+    cache.delete_many([_cache_key(pk) for pk in property_ids])
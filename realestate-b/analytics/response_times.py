@@ -0,0 +1,92 @@
+"""
+First-response latency of leads.
+
+A lead's first response is the earliest of:
+
+- its first status change (``LeadStatusLog``),
+- the first message its agent wrote, other than automatic ones, in one of
+  the lead's conversations,
+- ``Lead.last_contacted``, which is never earlier than the first contact
+  and so is safe to take the minimum with.
+
+Each source is read once with a grouped ``MIN`` over the leads asked for,
+and the results are merged by lead id, so the cost is one pass per table
+however many leads there are. Events from before the lead was created are
+ignored, and leads nobody has responded to yet are left out.
+"""
+import math
+import statistics
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import F, Min
+
+from leads.models import LeadStatusLog, Message
+
+
+def first_responses(leads):
+    """``{lead_id: (agent_id, latency)}`` for the responded leads of the ``leads`` queryset."""
+    created = {}
+    first = {}
+    for pk, agent_id, created_at, last_contacted in leads.values_list(
+        "pk", "agent_id", "created_at", "last_contacted"
+    ):
+        created[pk] = (agent_id, created_at)
+        if last_contacted is not None and last_contacted >= created_at:
+            first[pk] = last_contacted
+
+    status_changes = (
+        LeadStatusLog.objects.filter(lead__in=leads, created_at__gte=F("lead__created_at"))
+        .order_by()
+        .values("lead_id")
+        .annotate(first=Min("created_at"))
+        .values_list("lead_id", "first")
+    )
+    agent_messages = (
+        Message.objects.filter(
+            conversation__lead__in=leads,
+            sender=F("conversation__agent"),
+            is_auto=False,
+            created_at__gte=F("conversation__lead__created_at"),
+        )
+        .order_by()
+        .values("conversation__lead_id")
+        .annotate(first=Min("created_at"))
+        .values_list("conversation__lead_id", "first")
+    )
+    for source in (status_changes, agent_messages):
+        for lead_id, responded_at in source:
+            if lead_id not in first or responded_at < first[lead_id]:
+                first[lead_id] = responded_at
+
+    return {
+        pk: (created[pk][0], responded_at - created[pk][1])
+        for pk, responded_at in first.items()
+        if pk in created
+    }
+
+
+def percentile(ordered, fraction):
+    """The nearest-rank percentile of the sorted, non-empty ``ordered``."""
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def by_agent(leads):
+    """
+    ``{agent_id: {"average", "median", "p90"}}`` first-response latencies of
+    the ``leads`` queryset, per assigned agent.
+    """
+    latencies = defaultdict(list)
+    for agent_id, latency in first_responses(leads).values():
+        if agent_id is not None:
+            latencies[agent_id].append(latency)
+
+    stats = {}
+    for agent_id, values in latencies.items():
+        values.sort()
+        stats[agent_id] = {
+            "average": sum(values, timedelta()) / len(values),
+            "median": statistics.median(values),
+            "p90": percentile(values, 0.9),
+        }
+    return stats
@@ -0,0 +1,367 @@
+"""
+Daily analytics rollups.
+
+``DailyLeadStats``, ``DailyPropertyStats`` and ``DailySearchStats`` hold
+per-day counts aggregated from the raw ``Lead``/``LeadStatusLog``,
+``PropertyView`` and ``SearchAnalytics`` tables. ``manage.py
+rollup_analytics`` writes them and records in ``RollupState`` the last day
+written; rolling a day up again replaces its rows, so the command is safe to
+re-run.
+
+Dashboards read totals with ``Rollup.totals``, which sums rollup rows for
+the days already rolled up and aggregates the raw tables only for the days
+after that (normally just today). Distinct visitors can't be summed, so
+``DailyPropertyStats`` and ``DailySiteStats`` keep a HyperLogLog sketch of
+each day's visitors instead, which ``PropertyRollup.unique_visitors`` merges.
+"""
+import zoneinfo
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DateField, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from leads.models import Lead, LeadStatusLog
+
+from .hll import HyperLogLog
+from .models import (
+    DailyLeadStats,
+    DailyPropertyStats,
+    DailySearchStats,
+    DailySiteStats,
+    PropertyView,
+    RollupState,
+    SearchAnalytics,
+)
+
+STATE_NAME = "daily"
+
+CLOSED_STATUSES = {"closed_won": "won", "closed_lost": "lost"}
+
+
+def local_zone():
+    """Days are bucketed in the site's time zone, whatever zone is active."""
+    return zoneinfo.ZoneInfo(settings.TIME_ZONE)
+
+
+def local_date(value=None):
+    return timezone.localdate(value, timezone=local_zone())
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min), local_zone())
+
+
+def _per_day(queryset, timestamp, start, end, *fields, **aggregates):
+    """
+    Rows of ``queryset`` from ``start`` to ``end`` (local dates, inclusive)
+    grouped by their local date, as ``day``, and ``fields``, with
+    ``aggregates`` (a ``count`` by default).
+    """
+    if start is not None:
+        queryset = queryset.filter(**{f"{timestamp}__gte": day_start(start)})
+    return (
+        queryset.filter(**{f"{timestamp}__lt": day_start(end + timedelta(days=1))})
+        .order_by()
+        .annotate(day=TruncDate(timestamp, tzinfo=local_zone(), output_field=DateField()))
+        .values("day", *fields)
+        .annotate(**(aggregates or {"count": Count("pk")}))
+    )
+
+
+def rolled_through(name=STATE_NAME):
+    """The last day the rollups cover, or None before the first rollup."""
+    state = RollupState.objects.filter(name=name).first()
+    return state.rolled_through if state else None
+
+
+def archived_through(table):
+    """The last day whose raw ``table`` rows were archived (analytics.archive), or None."""
+    return rolled_through(f"archive:{table}")
+
+
+class Rollup:
+    """
+    A rollup model with ``date``, the dimension columns in ``keys`` and the
+    counters in ``counters``. ``compute`` aggregates the raw tables into
+    ``{(date, *keys): Counter}``.
+    """
+
+    model = None
+    keys = ()
+    counters = ()
+    # Name of the raw table in analytics.archive, if it is archived
+    archived_as = None
+
+    def compute(self, start, end, **filters):
+        raise NotImplementedError
+
+    def raw_start(self, start):
+        """
+        ``start``, moved past the days whose raw rows have been archived:
+        rolling those up again would replace their rows with nothing.
+        """
+        archived = archived_through(self.archived_as) if self.archived_as else None
+        if archived is None:
+            return start
+        return max(start, archived + timedelta(days=1))
+
+    def earliest(self):
+        """The first day with raw data, or None."""
+        raise NotImplementedError
+
+    def write(self, start, end):
+        """Replace the rollup rows of ``start`` to ``end`` with fresh ones."""
+        rows = self.compute(start, end)
+        self.model.objects.filter(date__gte=start, date__lte=end).delete()
+        self.model.objects.bulk_create(
+            [
+                self.model(date=key[0], **dict(zip(self.keys, key[1:])), **counts)
+                for key, counts in rows.items()
+            ],
+            batch_size=1000,
+        )
+        return len(rows)
+
+    def totals(self, start, end, by=(), **filters):
+        """
+        Counters summed from ``start`` (None for all time) to ``end``,
+        grouped by ``by`` (any of ``"date"`` and ``keys``) into
+        ``{(values of by): Counter}``. ``filters`` apply to the rollup rows
+        and the raw rows alike.
+        """
+        totals = defaultdict(Counter)
+        through = rolled_through()
+        live_start = start
+
+        if through is not None and (start is None or start <= through):
+            rows = self.model.objects.filter(date__lte=min(end, through), **filters)
+            if start is not None:
+                rows = rows.filter(date__gte=start)
+            for row in (
+                rows.order_by()
+                .values(*by)
+                .annotate(**{counter: Sum(counter) for counter in self.counters})
+            ):
+                totals[tuple(row[field] for field in by)].update(
+                    {counter: row[counter] or 0 for counter in self.counters}
+                )
+            live_start = through + timedelta(days=1)
+
+        if live_start is None or live_start <= end:
+            positions = [("date", *self.keys).index(field) for field in by]
+            for key, counts in self.compute(live_start, end, **filters).items():
+                totals[tuple(key[i] for i in positions)].update(counts)
+        return totals
+
+    def total(self, start, end, **filters):
+        """Counters summed over every row from ``start`` to ``end``."""
+        return self.totals(start, end, **filters).get((), Counter())
+
+
+class LeadRollup(Rollup):
+    model = DailyLeadStats
+    keys = ("agent_id", "source")
+    counters = ("created", "won", "lost")
+
+    def compute(self, start, end, **filters):
+        leads = Lead.objects.filter(**filters)
+        logs = LeadStatusLog.objects.filter(
+            to_status__in=CLOSED_STATUSES,
+            **{f"lead__{lookup}": value for lookup, value in filters.items()},
+        )
+        rows = defaultdict(Counter)
+        for row in _per_day(leads, "created_at", start, end, "agent_id", "source"):
+            rows[(row["day"], row["agent_id"], row["source"])]["created"] += row["count"]
+        for row in _per_day(
+            logs, "created_at", start, end, "lead__agent_id", "lead__source", "to_status"
+        ):
+            key = (row["day"], row["lead__agent_id"], row["lead__source"])
+            rows[key][CLOSED_STATUSES[row["to_status"]]] += row["count"]
+        # Leads created closed have no status log
+        created_closed = leads.filter(status__in=CLOSED_STATUSES, status_logs__isnull=True)
+        for row in _per_day(
+            created_closed, "created_at", start, end, "agent_id", "source", "status"
+        ):
+            key = (row["day"], row["agent_id"], row["source"])
+            rows[key][CLOSED_STATUSES[row["status"]]] += row["count"]
+        return rows
+
+    def earliest(self):
+        created = Lead.objects.aggregate(first=Min("created_at"))["first"]
+        return local_date(created) if created else None
+
+
+class PropertyRollup(Rollup):
+    model = DailyPropertyStats
+    keys = ("property_id",)
+    counters = ("views",)
+    archived_as = "property_views"
+
+    def compute(self, start, end, **filters):
+        views = PropertyView.objects.filter(**filters)
+        return {
+            (row["day"], row["property_id"]): Counter(views=row["count"])
+            for row in _per_day(views, "viewed_at", start, end, "property_id")
+        }
+
+    def earliest(self):
+        viewed = PropertyView.objects.aggregate(first=Min("viewed_at"))["first"]
+        return local_date(viewed) if viewed else None
+
+    def write(self, start, end):
+        """
+        Replace the rows of ``start`` to ``end`` with fresh ones carrying a
+        sketch of each property's visitors, plus one ``DailySiteStats`` row
+        per day. Works a day at a time so a long backfill holds only one
+        day's sketches in memory.
+        """
+        written = 0
+        day = start
+        while day <= end:
+            written += self._write_day(day)
+            day += timedelta(days=1)
+        return written
+
+    def _write_day(self, day):
+        counts = self.compute(day, day)
+        sketches = defaultdict(HyperLogLog)
+        site = HyperLogLog()
+        for property_id, ip_address in self._visitors(day, day).iterator():
+            sketches[property_id].add(ip_address)
+            site.add(ip_address)
+
+        self.model.objects.filter(date=day).delete()
+        DailySiteStats.objects.filter(date=day).delete()
+        if not counts:
+            return 0
+        self.model.objects.bulk_create(
+            [
+                self.model(
+                    date=day,
+                    property_id=property_id,
+                    views=views["views"],
+                    visitors=sketches[property_id].to_bytes(),
+                )
+                for (_, property_id), views in counts.items()
+            ],
+            batch_size=1000,
+        )
+        DailySiteStats.objects.create(
+            date=day,
+            views=sum(views["views"] for views in counts.values()),
+            visitors=site.to_bytes(),
+        )
+        return len(counts)
+
+    def _views(self, start, end, **filters):
+        """Raw views from ``start`` (None for all time) to ``end``."""
+        views = PropertyView.objects.filter(**filters)
+        if start is not None:
+            views = views.filter(viewed_at__gte=day_start(start))
+        return views.filter(viewed_at__lt=day_start(end + timedelta(days=1))).order_by()
+
+    def _visitors(self, start, end, **filters):
+        """Distinct ``(property_id, ip_address)`` pairs viewed from ``start`` to ``end``."""
+        return (
+            self._views(start, end, **filters)
+            .values_list("property_id", "ip_address")
+            .distinct()
+        )
+
+    def unique_visitors(self, start, end, **filters):
+        """
+        Approximate number of distinct visitor IPs from ``start`` (None for
+        all time) to ``end``, over the properties ``filters`` select (every
+        property by default). Merges the rolled-up sketches and adds the raw
+        views of the days after them. With no rolled-up days in range, the
+        count is exact, a ``COUNT(DISTINCT)`` over the raw views.
+        """
+        through = rolled_through()
+        if through is None or (start is not None and start > through):
+            return self._views(start, end, **filters).aggregate(
+                visitors=Count("ip_address", distinct=True)
+            )["visitors"]
+
+        sketch = HyperLogLog()
+        rows = self.model.objects.filter(**filters) if filters else DailySiteStats.objects.all()
+        rows = rows.filter(date__lte=min(end, through))
+        if start is not None:
+            rows = rows.filter(date__gte=start)
+        for visitors in rows.values_list("visitors", flat=True).iterator():
+            sketch.merge_bytes(visitors)
+
+        live_start = through + timedelta(days=1)
+        if live_start <= end:
+            live = self._views(live_start, end, **filters).values_list("ip_address", flat=True)
+            for ip_address in live.distinct().iterator():
+                sketch.add(ip_address)
+        return sketch.count()
+
+
+class SearchRollup(Rollup):
+    model = DailySearchStats
+    keys = ("normalized_query",)
+    counters = ("searches", "zero_result_searches")
+    archived_as = "searches"
+
+    def compute(self, start, end, **filters):
+        searches = SearchAnalytics.objects.filter(**filters)
+        return {
+            (row["day"], row["normalized_query"]): Counter(
+                searches=row["searches"],
+                zero_result_searches=row["zero_result_searches"],
+            )
+            for row in _per_day(
+                searches,
+                "searched_at",
+                start,
+                end,
+                "normalized_query",
+                searches=Count("pk"),
+                zero_result_searches=Count("pk", filter=Q(results_count=0)),
+            )
+        }
+
+    def earliest(self):
+        searched = SearchAnalytics.objects.aggregate(first=Min("searched_at"))["first"]
+        return local_date(searched) if searched else None
+
+
+LEADS = LeadRollup()
+PROPERTIES = PropertyRollup()
+SEARCHES = SearchRollup()
+
+ROLLUPS = {"leads": LEADS, "properties": PROPERTIES, "searches": SEARCHES}
+
+
+def rollup(start=None, end=None):
+    """
+    Write the rollups from ``start`` to ``end`` (default: yesterday). Without
+    ``start`` it carries on from the last day rolled up, or from the first
+    day with data. Returns ``(start, end, {name: rows written})``, with no
+    rows when there was nothing to roll up.
+    """
+    end = end or local_date() - timedelta(days=1)
+    through = rolled_through()
+    if through is not None:
+        first = through + timedelta(days=1)
+    else:
+        firsts = [day for day in (r.earliest() for r in ROLLUPS.values()) if day]
+        first = min(firsts) if firsts else end
+    start = start or first
+    if start > end:
+        return start, end, {}
+
+    with transaction.atomic():
+        written = {name: r.write(r.raw_start(start), end) for name, r in ROLLUPS.items()}
+        # The watermark only moves over an unbroken run of rolled-up days
+        if start <= first:
+            RollupState.objects.update_or_create(
+                name=STATE_NAME,
+                defaults={"rolled_through": max(end, through or end)},
+            )
+    return start, end, written
@@ -0,0 +1,155 @@
+"""
+Tests for the grouped lead aggregates (analytics.aggregates) and the
+dashboard endpoints built on them.
+"""
+from datetime import datetime, time, timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from analytics.aggregates import LeadAggregates
+from leads.models import Lead
+
+pytestmark = [pytest.mark.integration]
+
+SCORES = [0, 5, 10, 11, 25, 26, 50, 51, 75, 76, 99, 100, 150]
+
+
+@pytest.fixture
+def scored_leads(agent_client, lead_factory):
+    agent = agent_client.user
+    for i, score in enumerate(SCORES):
+        lead = lead_factory(
+            agent=agent, email=f"lead{i}@test.com", source="whatsapp" if i % 3 else "website"
+        )
+        Lead.objects.filter(pk=lead.pk).update(score=score)
+    lead_factory(source="referral")  # another agent's lead
+    return agent
+
+
+class TestScoreDistribution:
+    def test_matches_per_bucket_counts(self, scored_leads):
+        leads = Lead.objects.filter(agent=scored_leads)
+
+        result = LeadAggregates(leads).score_distribution()
+
+        assert result["distribution"] == {
+            "cold": leads.filter(score__lte=25).count(),
+            "warm": leads.filter(score__gt=25, score__lte=50).count(),
+            "hot": leads.filter(score__gt=50, score__lte=75).count(),
+            "very_hot": leads.filter(score__gt=75).count(),
+        }
+        assert [bucket["count"] for bucket in result["histogram"]] == [
+            leads.filter(score__gt=low, score__lte=low + 10).count()
+            for low in range(0, 100, 10)
+        ]
+        assert result["histogram"][0] == {"range": "1-10", "count": 2, "min": 1, "max": 10}
+        assert result["average_score"] == pytest.approx(sum(SCORES) / len(SCORES))
+        assert result["total_leads"] == len(SCORES)
+
+    def test_no_leads(self, db):
+        result = LeadAggregates(Lead.objects.none()).score_distribution()
+
+        assert result["total_leads"] == 0
+        assert result["average_score"] == 0
+        assert set(result["distribution"].values()) == {0}
+
+    def test_endpoint_is_one_query(self, agent_client, scored_leads, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = agent_client.get(reverse("lead-score-distribution"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["total_leads"] == len(SCORES)
+
+
+class TestSourceDistribution:
+    def test_counts_and_percentages(self, scored_leads):
+        result = LeadAggregates(Lead.objects.filter(agent=scored_leads)).source_distribution()
+
+        assert result["total"] == len(SCORES)
+        assert result["distribution"] == [
+            {"source": "website", "label": "Website", "count": 5, "percentage": 38.5},
+            {"source": "whatsapp", "label": "WhatsApp", "count": 8, "percentage": 61.5},
+        ]
+
+    def test_endpoint_is_one_query(self, agent_client, scored_leads, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = agent_client.get(reverse("lead-source-distribution"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["total"] == len(SCORES)
+
+    def test_counts_by(self, scored_leads):
+        assert LeadAggregates().counts_by("source") == {
+            "website": 5,
+            "whatsapp": 8,
+            "referral": 1,
+        }
+
+
+class TestTimeSeries:
+    @pytest.fixture
+    def dated_leads(self, agent_client, lead_factory):
+        agent = agent_client.user
+        today = timezone.localdate()
+        leads = ((0, "website"), (0, "whatsapp"), (0, "website"), (3, "referral"), (40, "website"))
+        for days_ago, source in leads:
+            lead = lead_factory(agent=agent, source=source, email=f"{days_ago}-{source}@test.com")
+            created = timezone.make_aware(
+                datetime.combine(today - timedelta(days=days_ago), time(12))
+            )
+            Lead.objects.filter(pk=lead.pk).update(created_at=created)
+        return agent
+
+    def test_daily_points_are_filled(self, dated_leads):
+        today = timezone.localdate()
+
+        series = LeadAggregates(Lead.objects.filter(agent=dated_leads)).time_series(
+            today - timedelta(days=6), today, by="source"
+        )
+
+        assert [point["date"] for point in series] == [
+            today - timedelta(days=n) for n in range(6, -1, -1)
+        ]
+        assert series[-1]["count"] == 3
+        assert series[-1]["breakdown"] == {"website": 2, "whatsapp": 1}
+        assert series[-4]["count"] == 1
+        assert sum(point["count"] for point in series) == 4
+
+    def test_weekly_points_start_on_monday(self, dated_leads):
+        today = timezone.localdate()
+
+        series = LeadAggregates(Lead.objects.filter(agent=dated_leads)).time_series(
+            today - timedelta(days=59), today, interval="week"
+        )
+
+        assert all(point["date"].weekday() == 0 for point in series)
+        assert sum(point["count"] for point in series) == 5
+
+    def test_agent_endpoint(self, agent_client, dated_leads, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = agent_client.get(reverse("lead-trends"), {"days": 365})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["trends"]) == 365
+        assert response.data["total_leads"] == 5
+        assert response.data["trends"][-1]["sources"] == {"website": 2, "whatsapp": 1}
+        assert response.data["trends"][-1]["date"] == timezone.localdate().strftime("%Y-%m-%d")
+
+    @pytest.mark.parametrize("days", ["0", "366", "abc"])
+    def test_agent_endpoint_rejects_bad_days(self, agent_client, days):
+        response = agent_client.get(reverse("lead-trends"), {"days": days})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_management_lead_trends(self, management_client, lead_factory):
+        lead_factory()
+
+        response = management_client.get(reverse("management-analytics"), {"days": 30})
+
+        assert response.status_code == status.HTTP_200_OK
+        trends = response.data["lead_trends"]
+        assert len(trends) == 30
+        assert trends[-1] == {"date": timezone.localdate().strftime("%Y-%m-%d"), "count": 1}
@@ -0,0 +1,130 @@
+"""
+Tests for archiving the raw analytics tables (analytics.archive).
+"""
+import csv
+import gzip
+import json
+from datetime import datetime, time, timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from analytics import dashboard, rollups
+from analytics.archive import PROPERTY_VIEWS, SEARCHES
+from analytics.models import DailyPropertyStats, PropertyView, SearchAnalytics
+
+pytestmark = [pytest.mark.integration]
+
+
+def days_ago(n):
+    return timezone.localdate() - timedelta(days=n)
+
+
+def at(day):
+    return timezone.make_aware(datetime.combine(day, time(12)))
+
+
+@pytest.fixture(autouse=True)
+def archive_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.PROPERTY_VIEW_RETENTION_DAYS = 3
+    settings.SEARCH_ANALYTICS_RETENTION_DAYS = 3
+    return settings
+
+
+@pytest.fixture
+def prop(property_factory):
+    """A property viewed and searched for twice a day over the last six days."""
+    prop = property_factory()
+    for n in range(6):
+        for ip in ("10.0.0.1", "10.0.0.2"):
+            view = PropertyView.objects.create(property=prop, ip_address=ip)
+            PropertyView.objects.filter(pk=view.pk).update(viewed_at=at(days_ago(n)))
+            search = SearchAnalytics.objects.create(
+                search_query="villa", filters_used={"bedrooms": 3}, ip_address=ip
+            )
+            SearchAnalytics.objects.filter(pk=search.pk).update(searched_at=at(days_ago(n)))
+    return prop
+
+
+def read_jsonl(path):
+    with gzip.open(path, "rt") as archived:
+        return [json.loads(line) for line in archived]
+
+
+class TestArchiveDay:
+    def test_exports_then_deletes(self, prop):
+        rollups.rollup()
+
+        rows, path = PROPERTY_VIEWS.archive_day(days_ago(5), batch_size=1)
+
+        assert rows == 2
+        assert path.name == f"{days_ago(5).isoformat()}.jsonl.gz"
+        archived = read_jsonl(path)
+        assert {row["ip_address"] for row in archived} == {"10.0.0.1", "10.0.0.2"}
+        assert archived[0]["property_id"] == prop.pk
+        assert not PROPERTY_VIEWS.rows(days_ago(5)).exists()
+        assert rollups.archived_through("property_views") == days_ago(5)
+
+    def test_csv(self, prop):
+        rollups.rollup()
+
+        _, path = SEARCHES.archive_day(days_ago(5), fmt="csv")
+
+        with gzip.open(path, "rt", newline="") as archived:
+            rows = list(csv.DictReader(archived))
+        assert len(rows) == 2
+        assert json.loads(rows[0]["filters_used"]) == {"bedrooms": 3}
+
+    def test_rerun_writes_a_second_file(self, prop):
+        rollups.rollup()
+        _, first = PROPERTY_VIEWS.archive_day(days_ago(5))
+        view = PropertyView.objects.create(property=prop, ip_address="10.0.0.3")
+        PropertyView.objects.filter(pk=view.pk).update(viewed_at=at(days_ago(5)))
+
+        _, second = PROPERTY_VIEWS.archive_day(days_ago(5))
+
+        assert second.name == f"{days_ago(5).isoformat()}.1.jsonl.gz"
+        assert len(read_jsonl(first)) == 2
+        assert len(read_jsonl(second)) == 1
+
+
+class TestCommand:
+    def test_archives_days_past_retention(self, prop, capsys):
+        call_command("archive_analytics")
+
+        out = capsys.readouterr().out
+        # Today and the three days before it are kept
+        assert "property_views: archived 4 rows" in out
+        assert "rows/s" in out
+        assert PropertyView.objects.count() == 8
+        assert SearchAnalytics.objects.count() == 8
+        assert rollups.archived_through("searches") == days_ago(4)
+        # Totals still include the archived days
+        assert rollups.PROPERTIES.total(None, days_ago(0))["views"] == 12
+        assert rollups.SEARCHES.total(None, days_ago(0))["searches"] == 12
+        assert dashboard.popular_searches() == [{"query": "villa", "count": 12}]
+
+    def test_rollups_keep_archived_days(self, prop):
+        call_command("archive_analytics", table=["property_views"])
+
+        rollups.rollup(start=days_ago(5))
+
+        assert DailyPropertyStats.objects.get(date=days_ago(5)).views == 2
+        assert rollups.PROPERTIES.total(None, days_ago(0))["views"] == 12
+
+    def test_retention_override_and_dry_run(self, prop, capsys):
+        rollups.rollup()
+
+        call_command("archive_analytics", retention_days=1, dry_run=True)
+
+        # Today and yesterday are kept
+        assert "would archive 8 rows" in capsys.readouterr().out
+        assert PropertyView.objects.count() == 12
+
+    @pytest.mark.django_db
+    def test_nothing_to_archive(self, capsys):
+        call_command("archive_analytics")
+
+        assert "property_views: nothing to archive." in capsys.readouterr().out
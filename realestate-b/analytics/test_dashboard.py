@@ -0,0 +1,175 @@
+"""
+Tests for the composite management summary and its cache (analytics.cache).
+"""
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from analytics import views
+from analytics.cache import LayeredCache
+
+pytestmark = [pytest.mark.integration]
+
+SECTIONS = {
+    "overview",
+    "today",
+    "this_month",
+    "source_performance",
+    "top_agents",
+    "agent_performance_list",
+    "lead_trends",
+    "lead_score_distribution",
+    "lead_source_distribution",
+    "popular_searches",
+}
+
+
+@pytest.fixture(autouse=True)
+def summary_cache():
+    views.SUMMARY_CACHE.clear()
+    yield views.SUMMARY_CACHE
+    views.SUMMARY_CACHE.clear()
+
+
+@pytest.fixture
+def url():
+    return reverse("management-summary")
+
+
+class TestManagementSummary:
+    def test_all_sections(self, management_client, lead_factory, url):
+        lead_factory()
+
+        response = management_client.get(url, {"days": 3})
+
+        assert response.status_code == 200
+        assert set(response.data) == SECTIONS
+        assert response.data["overview"]["total_leads"] == 1
+        assert len(response.data["lead_trends"]) == 3
+        assert response["ETag"]
+        assert response["Cache-Control"] == "private, no-cache"
+
+    def test_agents_computed_before_the_batch_job(self, management_client, lead_factory, url):
+        lead = lead_factory()
+
+        response = management_client.get(url)
+
+        # The agent with a lead this month ranks first
+        assert response.data["top_agents"][0]["username"] == lead.agent.username
+        listed = {agent["id"]: agent for agent in response.data["agent_performance_list"]}
+        assert listed[lead.agent_id]["leads_count"] == 1
+
+    def test_cached_for_later_requests(self, management_client, url, django_assert_num_queries):
+        first = management_client.get(url)
+
+        with django_assert_num_queries(0):
+            second = management_client.get(url)
+
+        assert second.data == first.data
+        assert second["ETag"] == first["ETag"]
+
+    def test_not_modified(self, management_client, url):
+        etag = management_client.get(url)["ETag"]
+
+        response = management_client.get(url, HTTP_IF_NONE_MATCH=f'"other", {etag}')
+
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+        assert not response.content
+
+    def test_days_keyed_separately(self, management_client, url):
+        management_client.get(url, {"days": 3})
+
+        response = management_client.get(url, {"days": 5})
+
+        assert len(response.data["lead_trends"]) == 5
+
+    def test_invalid_days(self, management_client, url):
+        assert management_client.get(url, {"days": 0}).status_code == 400
+
+    def test_management_only(self, agent_client, url):
+        assert agent_client.get(url).status_code == 403
+
+
+@pytest.mark.django_db
+class TestLayeredCache:
+    @pytest.fixture
+    def layered(self, settings):
+        settings.TEST_CACHE_TTL = 60
+        settings.TEST_STALE_TTL = 300
+        return LayeredCache("test", "TEST_CACHE_TTL", "TEST_STALE_TTL", maxsize=2)
+
+    def test_builds_once(self, layered):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return {"n": len(calls)}
+
+        assert layered.get("a", build)[0] == {"n": 1}
+        layered.clear()  # still shared through the Django cache
+        assert layered.get("a", build)[0] == {"n": 1}
+        assert len(calls) == 1
+
+    def test_etag_follows_value(self, layered):
+        _, first = layered.get("a", lambda: {"n": 1})
+        _, same = layered.get("b", lambda: {"n": 1})
+        _, other = layered.get("c", lambda: {"n": 2})
+
+        assert first == same != other
+
+    def test_lru_evicts_oldest(self, layered):
+        for key in "abc":
+            layered.get(key, lambda: key)
+
+        assert list(layered._local) == ["b", "c"]
+
+    def test_serves_stale_while_another_rebuilds(self, layered, settings):
+        layered.get("a", lambda: "old")
+        settings.TEST_CACHE_TTL = 0
+        layered.invalidate("a")
+        layered.get("a", lambda: "stale")  # fresh_until is now in the past
+        cache.add("test:a:lock", True)
+
+        value, _ = layered.get("a", lambda: "new")
+
+        assert value == "stale"
+
+    def test_serves_stale_to_threads_while_one_rebuilds(self, layered, settings):
+        settings.TEST_CACHE_TTL = 0
+        layered.get("a", lambda: "stale")
+        started, release = threading.Event(), threading.Event()
+
+        def slow_build():
+            started.set()
+            release.wait(5)
+            return "new"
+
+        rebuilder = threading.Thread(target=layered.get, args=("a", slow_build))
+        rebuilder.start()
+        started.wait(5)
+        try:
+            value, _ = layered.get("a", lambda: pytest.fail("built twice"))
+        finally:
+            release.set()
+            rebuilder.join()
+
+        assert value == "stale"
+
+    def test_rebuilds_when_expired(self, layered, settings):
+        settings.TEST_CACHE_TTL = 0
+        layered.get("a", lambda: "old")
+
+        assert layered.get("a", lambda: "new")[0] == "new"
+        assert cache.get("test:a:lock") is None
+
+    def test_waits_for_rebuild_without_stale_value(self, layered, monkeypatch):
+        cache.add("test:a:lock", True)
+        monkeypatch.setattr(
+            time, "sleep", lambda _: cache.set("test:a", {"value": "theirs", "etag": '"x"', "fresh_until": 0})
+        )
+
+        assert layered.get("a", lambda: "ours")[0] == "theirs"
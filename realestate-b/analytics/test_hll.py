@@ -0,0 +1,131 @@
+"""
+Tests for HyperLogLog sketches (analytics.hll) and the unique-visitor counts
+built on them.
+"""
+from datetime import datetime, time, timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from analytics import rollups
+from analytics.hll import HyperLogLog
+from analytics.models import DailyPropertyStats, DailySiteStats, PropertyView
+
+
+def sketch_of(values, precision=12):
+    sketch = HyperLogLog(precision)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+class TestHyperLogLog:
+    @pytest.mark.parametrize("n", [0, 1, 10, 1_000, 50_000])
+    def test_estimate_within_error(self, n):
+        estimate = sketch_of(f"10.0.{i}" for i in range(n)).count()
+
+        # Four standard errors at precision 12
+        assert abs(estimate - n) <= max(1, n * 0.065)
+
+    def test_duplicates_are_counted_once(self):
+        assert sketch_of(["10.0.0.1"] * 100).count() == 1
+
+    def test_merge_equals_union(self):
+        a = sketch_of(f"ip-{i}" for i in range(0, 6_000))
+        b = sketch_of(f"ip-{i}" for i in range(4_000, 10_000))
+        union = sketch_of(f"ip-{i}" for i in range(10_000))
+
+        a.update(b)
+
+        assert a.registers == union.registers
+
+    @pytest.mark.parametrize("n", [5, 20_000])
+    def test_bytes_roundtrip(self, n):
+        sketch = sketch_of(f"ip-{i}" for i in range(n))
+        data = sketch.to_bytes()
+
+        assert HyperLogLog.from_bytes(data).registers == sketch.registers
+        merged = HyperLogLog()
+        merged.update(data)
+        assert merged.registers == sketch.registers
+
+    def test_small_sketches_stay_small(self):
+        assert len(sketch_of(["a", "b", "c"]).to_bytes()) == 2 + 3 * 3
+        assert len(sketch_of(f"ip-{i}" for i in range(20_000)).to_bytes()) == 2 + 4096
+
+    def test_empty_bytes_is_an_empty_sketch(self):
+        assert HyperLogLog.from_bytes(b"").count() == 0
+
+    def test_precision_mismatch(self):
+        with pytest.raises(ValueError):
+            HyperLogLog(12).update(HyperLogLog(10))
+        with pytest.raises(ValueError):
+            HyperLogLog(12).merge_bytes(HyperLogLog(14).to_bytes())
+
+
+def days_ago(n):
+    return timezone.localdate() - timedelta(days=n)
+
+
+@pytest.fixture
+def visits(agent_user_factory, property_factory):
+    """Two agents' properties, viewed over the last three days."""
+    mine = property_factory(agent=agent_user_factory())
+    other = property_factory(agent=agent_user_factory())
+
+    def view(prop, n, ip):
+        row = PropertyView.objects.create(property=prop, ip_address=ip)
+        PropertyView.objects.filter(pk=row.pk).update(
+            viewed_at=timezone.make_aware(datetime.combine(days_ago(n), time(12)))
+        )
+
+    for n in (2, 1, 0):
+        view(mine, n, "10.0.0.1")
+    view(mine, 2, "10.0.0.2")
+    view(other, 1, "10.0.0.2")
+    view(other, 0, "10.0.0.3")
+    return mine, other
+
+
+@pytest.mark.integration
+class TestUniqueVisitors:
+    def test_rollup_writes_sketches(self, visits):
+        mine, _ = visits
+        rollups.rollup()
+
+        row = DailyPropertyStats.objects.get(property=mine, date=days_ago(2))
+        assert HyperLogLog.from_bytes(row.visitors).count() == 2
+        site = DailySiteStats.objects.get(date=days_ago(1))
+        assert (site.views, HyperLogLog.from_bytes(site.visitors).count()) == (2, 2)
+
+    @pytest.mark.parametrize("rolled", [False, True])
+    def test_counts_across_days_and_properties(self, visits, rolled):
+        mine, _ = visits
+        if rolled:
+            rollups.rollup()
+            # Rolled-up raw rows are no longer read
+            PropertyView.objects.filter(viewed_at__lt=rollups.day_start(days_ago(0))).delete()
+
+        unique_visitors = rollups.PROPERTIES.unique_visitors
+        assert unique_visitors(None, days_ago(0)) == 3
+        assert unique_visitors(days_ago(1), days_ago(0)) == 3
+        assert unique_visitors(days_ago(1), days_ago(1)) == 2
+        assert unique_visitors(None, days_ago(0), property__agent=mine.agent) == 2
+        assert unique_visitors(days_ago(1), days_ago(0), property=mine) == 1
+
+    def test_counts_in_sql_without_rollups(self, visits, django_assert_num_queries):
+        # The rollup state, then one COUNT(DISTINCT) rather than every visitor
+        with django_assert_num_queries(2) as captured:
+            assert rollups.PROPERTIES.unique_visitors(None, days_ago(0)) == 3
+
+        assert "COUNT(DISTINCT" in captured.captured_queries[-1]["sql"]
+
+    def test_summary_endpoint(self, api_client, visits):
+        mine, _ = visits
+        rollups.rollup()
+        api_client.force_authenticate(user=mine.agent)
+
+        response = api_client.get(reverse("property-views-summary"))
+
+        assert response.data == {"total_views": 4, "unique_visitors": 2}
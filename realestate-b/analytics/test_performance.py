@@ -0,0 +1,125 @@
+"""
+Tests for the monthly agent performance job (analytics.performance).
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from accounts.models import CustomUser
+from analytics import performance
+from analytics.models import AgentPerformance
+from leads.models import Lead, LeadStatusLog
+from properties.models import Property
+
+pytestmark = [pytest.mark.integration]
+
+
+@pytest.fixture
+def agent_activity(agent_user_factory, property_factory, lead_factory):
+    """An agent with two listings and three leads this month, one of them won."""
+    agent = agent_user_factory()
+    idle = agent_user_factory()
+    sold = property_factory(agent=agent, price=Decimal("5000000"))
+    property_factory(agent=agent)
+    old = property_factory(agent=agent)
+    Property.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=70))
+
+    now = timezone.now()
+    won = lead_factory(agent=agent, property=sold, status="closed_won")
+    lead_factory(agent=agent, email="second@test.com", status="qualified")
+    lead_factory(agent=agent, email="third@test.com")
+    Lead.objects.filter(agent=agent).update(created_at=now - timedelta(hours=5))
+    for to_status, hours_ago in (("contacted", 3), ("closed_won", 1)):
+        log = LeadStatusLog.objects.create(lead=won, from_status="new", to_status=to_status)
+        LeadStatusLog.objects.filter(pk=log.pk).update(
+            created_at=now - timedelta(hours=hours_ago)
+        )
+    return agent, idle
+
+
+class TestCompute:
+    def test_grouped_metrics(self, agent_activity, django_assert_max_num_queries):
+        agent, idle = agent_activity
+        period = performance.month_start()
+        if performance.local_date(timezone.now() - timedelta(hours=5)) < period:
+            pytest.skip("the leads fall in the previous month")
+
+        with django_assert_max_num_queries(7):
+            rows = performance.compute(period)
+
+        perf = rows[agent.pk]
+        assert perf.properties_listed == 2
+        assert (perf.leads_generated, perf.leads_converted) == (3, 2)
+        assert perf.conversion_rate == 66.67
+        assert (perf.properties_sold, perf.total_sales_value) == (1, Decimal("5000000"))
+        # Only the won lead has been responded to, two hours after creation
+        assert perf.average_response_time == timedelta(hours=2)
+        assert perf.p90_response_time == timedelta(hours=2)
+        assert rows[idle.pk].leads_generated == 0
+
+    def test_store_creates_then_updates(self, agent_activity):
+        agent, _ = agent_activity
+        period = performance.month_start()
+        agents = CustomUser.objects.filter(user_type="agent").count()
+
+        assert performance.store(period) == (agents, 0)
+        Lead.objects.filter(agent=agent).update(status="closed_lost")
+        assert performance.store(period) == (0, agents)
+
+        perf = AgentPerformance.objects.get(agent=agent, period=period)
+        assert perf.leads_converted == 0
+
+
+class TestEndpoints:
+    def test_agent_performance_only_reads(
+        self, api_client, agent_activity, django_assert_num_queries
+    ):
+        agent, _ = agent_activity
+        call_command("compute_agent_performance")
+        api_client.force_authenticate(user=agent)
+
+        with django_assert_num_queries(2):  # the user, the row
+            response = api_client.get(reverse("agent-performance"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["properties_sold"] == 1
+        assert AgentPerformance.objects.count() == (
+            CustomUser.objects.filter(user_type="agent").count()
+        )
+
+    def test_agent_performance_before_first_run(self, api_client, agent_activity):
+        agent, _ = agent_activity
+        api_client.force_authenticate(user=agent)
+
+        response = api_client.get(reverse("agent-performance"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["agent"] == agent.pk
+        assert not AgentPerformance.objects.exists()
+
+    def test_management_reads_latest_period(self, management_client, agent_activity):
+        agent, _ = agent_activity
+        last_month = performance.month_start(performance.month_start() - timedelta(days=1))
+        call_command("compute_agent_performance", month=last_month, months=1)
+        AgentPerformance.objects.filter(agent=agent).update(
+            properties_sold=3, total_sales_value=Decimal("9000000")
+        )
+
+        response = management_client.get(reverse("management-analytics"))
+
+        assert response.data["top_agents"][0]["sold_properties"] == 3
+        assert response.data["agent_performance_list"][0]["revenue"] == Decimal("9000000")
+
+
+def test_command_months(agent_activity, capsys):
+    call_command("compute_agent_performance", months=3)
+
+    agents = CustomUser.objects.filter(user_type="agent").count()
+    out = capsys.readouterr().out
+    assert out.count(f"{agents} created") == 3
+    assert AgentPerformance.objects.values("period").distinct().count() == 3
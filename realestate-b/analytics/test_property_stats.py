@@ -0,0 +1,99 @@
+"""
+Tests for per-property analytics (analytics.property_stats).
+"""
+import zoneinfo
+from datetime import datetime, time, timedelta
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from analytics import rollups
+from analytics.models import PropertyView
+from analytics.property_stats import property_summary
+from leads.models import Lead
+from properties.view_counter import property_views
+
+pytestmark = [pytest.mark.integration]
+
+NAIROBI = zoneinfo.ZoneInfo("Africa/Nairobi")
+
+
+def view(prop, when, ip="10.0.0.1"):
+    row = PropertyView.objects.create(property=prop, ip_address=ip)
+    PropertyView.objects.filter(pk=row.pk).update(viewed_at=when)
+
+
+@pytest.fixture
+def viewed_property(property_factory):
+    prop = property_factory()
+    today = rollups.local_date()
+    view(prop, datetime.combine(today, time(12), NAIROBI))
+    view(prop, datetime.combine(today, time(13), NAIROBI), ip="10.0.0.2")
+    # 00:30 in Nairobi is still the previous day in UTC
+    view(prop, datetime.combine(today - timedelta(days=1), time(0, 30), NAIROBI))
+    view(prop, datetime.combine(today - timedelta(days=40), time(12), NAIROBI))
+    return prop
+
+
+class TestPropertySummary:
+    def test_buckets_by_local_date(self, viewed_property):
+        summary = property_summary(viewed_property)
+
+        today = rollups.local_date()
+        recent = summary["recent_views"]
+        assert len(recent) == 30
+        assert recent[-1] == {"date": today, "views": 2}
+        assert recent[-2] == {"date": today - timedelta(days=1), "views": 1}
+
+    def test_window_figures(self, viewed_property, lead_factory):
+        lead_factory(property=viewed_property)
+        old = lead_factory(property=viewed_property, email="old@test.com")
+        Lead.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=60))
+
+        metrics = property_summary(viewed_property)["performance_metrics"]
+
+        assert metrics["views_last_30_days"] == 3
+        assert metrics["unique_visitors"] == 2
+        assert metrics["leads_last_30_days"] == 1
+        assert metrics["conversion_rate"] == 50.0
+        assert metrics["average_daily_views"] == 0.1
+
+    def test_reads_rollups_for_past_days(self, viewed_property):
+        rollups.rollup()
+        PropertyView.objects.filter(viewed_at__lt=rollups.day_start(rollups.local_date())).delete()
+
+        summary = property_summary(viewed_property)
+
+        assert summary["performance_metrics"]["views_last_30_days"] == 3
+
+
+class TestCache:
+    def test_cached_until_views_flushed(
+        self, viewed_property, rf, django_assert_num_queries
+    ):
+        property_summary(viewed_property)
+        with django_assert_num_queries(0):
+            property_summary(viewed_property)
+
+        request = rf.get("/")
+        request.user = AnonymousUser()
+        property_views.record(viewed_property, request)
+        property_views.flush()
+
+        viewed_property.refresh_from_db()
+        summary = property_summary(viewed_property)
+        assert summary["recent_views"][-1]["views"] == 3
+
+    def test_endpoint(self, api_client, viewed_property):
+        api_client.force_authenticate(user=viewed_property.agent)
+
+        response = api_client.get(
+            reverse("property-analytics", kwargs={"property_id": viewed_property.pk})
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["recent_views"][-1]["views"] == 2
+        assert response.data["performance_metrics"]["unique_visitors"] == 2
@@ -0,0 +1,92 @@
+"""
+Tests for first-response latency (analytics.response_times).
+"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from analytics import response_times
+from leads.models import Lead, LeadStatusLog, Message
+
+pytestmark = [pytest.mark.integration]
+
+NOW = timezone.now()
+
+
+def backdate(model, obj, hours):
+    model.objects.filter(pk=obj.pk).update(created_at=NOW - timedelta(hours=hours))
+
+
+@pytest.fixture
+def agent(agent_user_factory):
+    return agent_user_factory()
+
+
+@pytest.fixture
+def make_lead(agent, lead_factory):
+    def make(hours_ago, **kwargs):
+        lead = lead_factory(agent=agent, email=f"lead{Lead.objects.count()}@test.com", **kwargs)
+        backdate(Lead, lead, hours_ago)
+        return lead
+
+    return make
+
+
+def log(lead, hours_ago):
+    entry = LeadStatusLog.objects.create(lead=lead, from_status="new", to_status="contacted")
+    backdate(LeadStatusLog, entry, hours_ago)
+
+
+class TestFirstResponses:
+    def test_earliest_source_wins(
+        self, agent, make_lead, conversation_factory, message_factory, client_user_factory
+    ):
+        by_log = make_lead(10)
+        log(by_log, 8)
+        log(by_log, 2)
+        by_message = make_lead(10)
+        log(by_message, 4)
+        conversation = conversation_factory(lead=by_message, agent=agent)
+        message_factory(conversation=conversation, sender=client_user_factory())
+        reply = message_factory(conversation=conversation, sender=agent)
+        backdate(Message, reply, 9)
+        by_contact = make_lead(10, last_contacted=NOW - timedelta(hours=7))
+        make_lead(10)  # not responded to
+
+        responses = response_times.first_responses(Lead.objects.all())
+
+        assert responses == {
+            by_log.pk: (agent.pk, timedelta(hours=2)),
+            by_message.pk: (agent.pk, timedelta(hours=1)),
+            by_contact.pk: (agent.pk, timedelta(hours=3)),
+        }
+
+    def test_ignores_auto_messages_and_earlier_events(
+        self, agent, make_lead, conversation_factory, message_factory
+    ):
+        lead = make_lead(10)
+        conversation = conversation_factory(lead=lead, agent=agent)
+        auto = message_factory(conversation=conversation, sender=agent, is_auto=True)
+        backdate(Message, auto, 9)
+        log(lead, 11)
+
+        assert response_times.first_responses(Lead.objects.all()) == {}
+
+    def test_one_query_per_table(self, make_lead, django_assert_num_queries):
+        for hours in range(5):
+            log(make_lead(10), hours)
+
+        with django_assert_num_queries(3):
+            response_times.first_responses(Lead.objects.all())
+
+
+def test_percentiles_by_agent(agent, make_lead):
+    for hours in range(1, 11):
+        log(make_lead(20), 20 - hours)
+
+    stats = response_times.by_agent(Lead.objects.all())[agent.pk]
+
+    assert stats["median"] == timedelta(hours=5, minutes=30)
+    assert stats["p90"] == timedelta(hours=9)
+    assert stats["average"] == timedelta(hours=5, minutes=30)
@@ -0,0 +1,191 @@
+"""
+Tests for the daily analytics rollups (analytics.rollups) and the
+dashboards that read them.
+"""
+from datetime import datetime, time, timedelta
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from analytics import rollups
+from analytics.models import (
+    DailyLeadStats,
+    DailyPropertyStats,
+    DailySearchStats,
+    PropertyView,
+    RollupState,
+    SearchAnalytics,
+)
+from leads.models import Lead, LeadStatusLog
+
+pytestmark = [pytest.mark.integration]
+
+
+def days_ago(n):
+    return timezone.localdate() - timedelta(days=n)
+
+
+def at(day):
+    return timezone.make_aware(datetime.combine(day, time(12)))
+
+
+@pytest.fixture
+def activity(agent_user_factory, property_factory, lead_factory):
+    """Views, leads and searches spread over the last three days."""
+    agent = agent_user_factory()
+    prop = property_factory(agent=agent)
+    for n, count in ((2, 3), (1, 2), (0, 1)):
+        for _ in range(count):
+            view = PropertyView.objects.create(property=prop, ip_address="10.0.0.1")
+            PropertyView.objects.filter(pk=view.pk).update(viewed_at=at(days_ago(n)))
+
+    def lead(n, **kwargs):
+        lead = lead_factory(agent=agent, property=prop, **kwargs)
+        Lead.objects.filter(pk=lead.pk).update(created_at=at(days_ago(n)))
+        return lead
+
+    lead(2, source="website")
+    won = lead(2, source="whatsapp")
+    lead(1, source="website", status="closed_lost")
+    lead(0, source="website")
+    log = LeadStatusLog.objects.create(lead=won, from_status="new", to_status="closed_won")
+    LeadStatusLog.objects.filter(pk=log.pk).update(created_at=at(days_ago(1)))
+
+    for n, results in ((1, 5), (1, 0), (0, 2)):
+        search = SearchAnalytics.objects.create(
+            search_query="Villa" if results else "villa",
+            results_count=results,
+            ip_address="10.0.0.2",
+        )
+        SearchAnalytics.objects.filter(pk=search.pk).update(searched_at=at(days_ago(n)))
+    return agent, prop
+
+
+class TestRollup:
+    def test_rolls_up_to_yesterday(self, activity):
+        agent, prop = activity
+
+        start, end, written = rollups.rollup()
+
+        assert (start, end) == (days_ago(2), days_ago(1))
+        assert RollupState.objects.get().rolled_through == days_ago(1)
+        assert dict(
+            DailyPropertyStats.objects.filter(property=prop).values_list("date", "views")
+        ) == {days_ago(2): 3, days_ago(1): 2}
+        yesterday = DailyLeadStats.objects.get(date=days_ago(1), source="website")
+        assert (yesterday.created, yesterday.won, yesterday.lost) == (1, 0, 1)
+        assert DailyLeadStats.objects.get(date=days_ago(1), source="whatsapp").won == 1
+        search = DailySearchStats.objects.get(date=days_ago(1))
+        assert (search.normalized_query, search.searches, search.zero_result_searches) == (
+            "villa",
+            2,
+            1,
+        )
+
+    def test_rerunning_is_idempotent(self, activity):
+        fields = ("date", "source", "created", "won", "lost")
+        rollups.rollup()
+        rows = sorted(DailyLeadStats.objects.values_list(*fields))
+
+        rollups.rollup(start=days_ago(2))
+
+        assert sorted(DailyLeadStats.objects.values_list(*fields)) == rows
+        assert DailyPropertyStats.objects.count() == 2
+
+    def test_carries_on_from_last_day(self, activity):
+        rollups.rollup(end=days_ago(2))
+
+        start, end, _ = rollups.rollup()
+
+        assert (start, end) == (days_ago(1), days_ago(1))
+        assert RollupState.objects.get().rolled_through == days_ago(1)
+        assert rollups.rollup()[2] == {}
+
+    def test_partial_backfill_does_not_move_watermark(self, activity):
+        rollups.rollup(start=days_ago(1))
+
+        assert not RollupState.objects.exists()
+
+
+class TestTotals:
+    def test_rollup_and_live_rows_add_up(self, activity):
+        agent, prop = activity
+        rollups.rollup()
+        # Rolled-up raw rows are no longer read
+        PropertyView.objects.filter(viewed_at__lt=at(days_ago(0))).delete()
+
+        assert rollups.PROPERTIES.total(None, days_ago(0))["views"] == 6
+        assert rollups.PROPERTIES.total(days_ago(1), days_ago(0), property__agent=agent)[
+            "views"
+        ] == 3
+
+    def test_without_rollups_reads_raw_rows(self, activity):
+        agent, _ = activity
+
+        totals = rollups.LEADS.totals(days_ago(2), days_ago(0), by=("date",), agent=agent)
+
+        assert [totals[(days_ago(n),)]["created"] for n in (2, 1, 0)] == [2, 1, 1]
+
+    def test_grouped_like_raw(self, activity):
+        agent, _ = activity
+        raw = rollups.LEADS.totals(None, days_ago(0), by=("source",))
+        rollups.rollup()
+
+        assert rollups.LEADS.totals(None, days_ago(0), by=("source",)) == raw
+
+
+class TestDashboards:
+    def test_management_metrics(self, management_client, activity):
+        if days_ago(2).month != days_ago(0).month:
+            pytest.skip("activity spans two months")
+        rollups.rollup()
+        Lead.objects.all().delete()  # only today's raw rows are read
+
+        response = management_client.get(reverse("management-metrics"))
+
+        assert response.status_code == status.HTTP_200_OK
+        this_month = response.data["this_month"]
+        assert (this_month["won_leads"], this_month["lost_leads"]) == (1, 1)
+        assert this_month["conversion_rate"] == 50.0
+
+    def test_management_lead_trends(self, management_client, activity):
+        rollups.rollup()
+
+        response = management_client.get(reverse("management-analytics"), {"days": 3})
+
+        assert [point["count"] for point in response.data["lead_trends"]] == [2, 1, 1]
+
+    def test_property_views_summary(self, api_client, activity):
+        agent, _ = activity
+        rollups.rollup()
+        api_client.force_authenticate(user=agent)
+
+        response = api_client.get(reverse("property-views-summary"))
+
+        assert response.data["total_views"] == 6
+        assert response.data["unique_visitors"] == 1
+
+    def test_agent_dashboard(self, api_client, activity):
+        agent, _ = activity
+        rollups.rollup()
+        api_client.force_authenticate(user=agent)
+
+        response = api_client.get(reverse("dashboard-analytics"))
+
+        assert response.data["property_views"] == 6
+        assert response.data["recent_leads"] == 4
+        assert response.data["total_leads"] == 4
+
+
+def test_command(activity, capsys):
+    call_command("rollup_analytics")
+    assert "Rolled up" in capsys.readouterr().out
+
+    call_command("rollup_analytics")
+    assert "Nothing to roll up" in capsys.readouterr().out
+
+    call_command("rollup_analytics", days=2)
+    assert str(days_ago(2)) in capsys.readouterr().out
@@ -6,6 +6,7 @@ urlpatterns = [
     path("property/<int:property_id>/", views.property_analytics, name="property-analytics"),
     path("agent-performance/", views.agent_performance, name="agent-performance"),
     path("management/", views.management_analytics, name="management-analytics"),
+    path("management/summary/", views.management_summary, name="management-summary"),
     # New endpoints for real data
     path("lead-score-distribution/", views.lead_score_distribution, name="lead-score-distribution"),
     path("lead-trends/", views.lead_trends_agent, name="lead-trends"),
@@ -37,3 +37,25 @@ class Booking(models.Model):
 
     def __str__(self):
         return f"Booking for {self.property.title} on {self.date}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Status and agent as loaded, so agents.signals can move the agent's
+        # open-booking count without a re-read
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get("status")
+        instance._loaded_agent_id = instance.__dict__.get("agent_id")
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_status = self.__dict__.get("status")
+        self._loaded_agent_id = self.__dict__.get("agent_id")
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "status" in update_fields:
+            self._loaded_status = self.status
+        if update_fields is None or "agent" in update_fields:
+            self._loaded_agent_id = self.agent_id
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 from django.db import models
 from .models import Booking
 from .serializers import BookingSerializer, BookingCreateSerializer
+from agents.assignment import assign_agent
 from leads.models import Lead
 
 
@@ -59,18 +60,9 @@ class BookingListView(generics.ListCreateAPIView):
             if property_obj and hasattr(property_obj, "agent") and property_obj.agent:
                 agent = property_obj.agent
         
-        # If still no agent, get least-busy agent
+        # If still no agent, let the assignment strategy pick one
         if not agent:
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            from django.db.models import Count
-            
-            agent = (
-                User.objects.filter(user_type="agent")
-                .annotate(booking_count=Count("agent_bookings"))
-                .order_by("booking_count")
-                .first()
-            )
+            agent = assign_agent("open_bookings")
 
         if not agent:
             raise ValidationError({"agent": "No available agent found for this booking."})
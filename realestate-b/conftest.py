@@ -23,6 +23,49 @@ import uuid
 User = get_user_model()
 
 
+# ============================================================
+# TEST ISOLATION
+# ============================================================
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Reset the cache so throttle history does not leak between tests."""
+    from django.core.cache import cache
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def property_view_buffer(settings):
+    """Flush buffered property views at the end of every request."""
+    from properties.view_counter import property_views
+    settings.PROPERTY_VIEW_FLUSH_INTERVAL = 0
+    property_views.clear()
+    yield property_views
+    property_views.clear()
+
+
+@pytest.fixture(autouse=True)
+def search_log_buffer(settings):
+    """Flush buffered searches at the end of every request."""
+    from properties.search_log import searches
+    settings.SEARCH_LOG_FLUSH_INTERVAL = 0
+    searches.clear()
+    yield searches
+    searches.clear()
+
+
+@pytest.fixture(autouse=True)
+def chat_message_buffer(settings):
+    """Write chat messages as soon as they are sent."""
+    from leads.message_buffer import chat_messages
+    settings.CHAT_MESSAGE_FLUSH_MS = 0
+    chat_messages.clear()
+    yield chat_messages
+    chat_messages.clear()
+
+
 # ============================================================
 # MODEL FACTORIES (Manual factories to avoid external deps)
 # ============================================================
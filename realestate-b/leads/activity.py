@@ -0,0 +1,85 @@
+"""
+Deferred capture of lead activity from property detail views.
+
+Authenticated detail-page hits are collected by the property view buffer
+(``properties.view_counter``) and handed over here in batches when it is
+flushed, after the response has been sent. A whole batch costs a fixed number
+of queries.
+
+This is deliberately a best-effort, in-process buffer rather than a job table
+with a worker: a job table would put an insert back on the detail endpoint,
+and these activities only feed lead scoring and the agent's timeline. View
+events share the fate of the view counts they are buffered with, so they are
+lost when a worker is killed or recycled before it flushes, and a batch that
+fails is logged and dropped. Under WSGI the flush runs on the thread that
+served the request, once the response has been sent: it holds the worker,
+not the client.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from properties.models import Property
+
+from .models import Lead, LeadActivity
+from .scoring import VIEWING_POINTS, apply_delta
+
+# A lead gets at most one property_viewing activity per window
+VIEWING_DEDUPE_WINDOW = timedelta(hours=1)
+
+
+def capture_property_views(views):
+    """
+    Log a ``property_viewing`` activity for each ``(property_id, user_id)``
+    view made by a user who is a lead, and bump those leads' scores.
+
+    A view is attributed to the user's lead for that property, falling back
+    to the user's top lead. Returns the number of activities created.
+    """
+    views = list(views)
+    if not views:
+        return 0
+
+    leads_by_user = {}
+    for lead in Lead.objects.filter(
+        user_id__in={user_id for _, user_id in views}, agent__isnull=False
+    ):
+        leads_by_user.setdefault(lead.user_id, []).append(lead)
+    if not leads_by_user:
+        return 0
+
+    titles = dict(
+        Property.objects.filter(pk__in={pk for pk, _ in views}).values_list("pk", "title")
+    )
+
+    viewed = {}
+    for property_id, user_id in views:
+        leads = leads_by_user.get(user_id)
+        if not leads or property_id not in titles:
+            continue
+        lead = next((l for l in leads if l.property_id == property_id), leads[0])
+        viewed.setdefault(lead.pk, (lead, property_id))
+
+    recent = set(
+        LeadActivity.objects.filter(
+            lead_id__in=viewed,
+            activity_type="property_viewing",
+            created_at__gte=timezone.now() - VIEWING_DEDUPE_WINDOW,
+        ).values_list("lead_id", flat=True)
+    )
+    activities = LeadActivity.objects.bulk_create(
+        [
+            LeadActivity(
+                lead=lead,
+                activity_type="property_viewing",
+                description=f"Viewed property: {titles[property_id]}",
+                agent_id=lead.agent_id,
+            )
+            for lead_id, (lead, property_id) in viewed.items()
+            if lead_id not in recent
+        ]
+    )
+
+    # bulk_create skips the scoring receivers; each lead gained one viewing
+    apply_delta([a.lead_id for a in activities], "viewing_count", VIEWING_POINTS)
+    return len(activities)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Lead, LeadActivity, WhatsAppMessage
+from .scoring import delete_rows
 
 
 class LeadActivityInline(admin.TabularInline):
@@ -78,6 +79,10 @@ class LeadActivityAdmin(admin.ModelAdmin):
     search_fields = ("lead__first_name", "lead__last_name", "agent__username")
     raw_id_fields = ("lead", "agent")
 
+    def delete_queryset(self, request, queryset):
+        # Keep the leads' scoring counters
+        delete_rows(queryset)
+
 
 @admin.register(WhatsAppMessage)
 class WhatsAppMessageAdmin(admin.ModelAdmin):
@@ -85,3 +90,7 @@ class WhatsAppMessageAdmin(admin.ModelAdmin):
     list_filter = ("direction", "timestamp")
     search_fields = ("lead__first_name", "lead__last_name", "message_text")
     raw_id_fields = ("lead",)
+
+    def delete_queryset(self, request, queryset):
+        # Keep the leads' scoring counters
+        delete_rows(queryset)
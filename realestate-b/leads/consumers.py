@@ -1,7 +1,11 @@
 import json
+import uuid
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .models import Conversation, Message
+from django.utils import timezone
+from . import inbox
+from .message_buffer import chat_messages
+from .models import Conversation
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
@@ -13,6 +17,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
+        # Rooms joined, as {conversation_id: (client_id, agent_id)}; access
+        # is checked once per room for the life of the connection
+        self._joined_rooms = {}
+
         # Accept the connection
         await self.accept()
 
@@ -36,55 +44,72 @@ class ChatConsumer(AsyncWebsocketConsumer):
         conversation_id = text_data_json.get("conversation_id")
 
         # Validate conversation_id
-        if not conversation_id:
+        try:
+            conversation_id = int(conversation_id)
+        except (TypeError, ValueError):
             await self.send_error("conversation_id is required")
             return
 
-        # Check access to conversation
-        has_access = await self.check_conversation_access(conversation_id)
-        if not has_access:
-            await self.send_error("Access denied to this conversation")
-            return
-
-        # Initialize joined rooms set if needed
-        if not hasattr(self, "_joined_rooms"):
-            self._joined_rooms = set()
-
         room_group_name = f"chat_{conversation_id}"
 
-        # Join room group if not already joined
+        # Check access and join the room group the first time only
         if conversation_id not in self._joined_rooms:
+            participants = await self.check_conversation_access(conversation_id)
+            if participants is None:
+                await self.send_error("Access denied to this conversation")
+                return
             await self.channel_layer.group_add(room_group_name, self.channel_name)
-            self._joined_rooms.add(conversation_id)
+            self._joined_rooms[conversation_id] = participants
 
         if message_type == "message":
             content = text_data_json.get("content", "").strip()
             if content:
-                # Save message to database
-                message = await self.save_message(conversation_id, content)
+                # Sender's own id for the message until it is saved (chat_saved)
+                client_id = str(text_data_json.get("client_id") or uuid.uuid4().hex)[:64]
 
-                # Send message to room group
+                # Send message to room group at once
                 await self.channel_layer.group_send(
                     room_group_name,
                     {
                         "type": "chat_message",
                         "conversation_id": conversation_id,
                         "message": {
-                            "id": message.id,
-                            "content": message.content,
-                            "sender": message.sender.id,
-                            "sender_name": message.sender.username,
-                            "sender_type": (
-                                "agent"
-                                if hasattr(message.sender, "agentprofile")
-                                else "client"
-                            ),
-                            "created_at": message.created_at.isoformat(),
-                            "is_read": message.is_read,
+                            "id": None,
+                            "client_id": client_id,
+                            "content": content,
+                            "sender": self.user.id,
+                            "sender_name": self.user.username,
+                            "sender_type": self.user.user_type,
+                            "created_at": timezone.now().isoformat(),
+                            "is_read": False,
                         },
                     },
                 )
 
+                # Saved in the next batch (leads.message_buffer)
+                await chat_messages.add(conversation_id, self.user.id, content, client_id)
+
+        elif message_type == "read":
+            up_to = text_data_json.get("message_id")
+            if up_to is not None and (isinstance(up_to, bool) or not isinstance(up_to, int)):
+                await self.send_error("message_id must be a message id")
+                return
+            try:
+                last_read_id, _ = await self.mark_read(conversation_id, up_to)
+            except ValueError:
+                await self.send_error("message_id is not a message in this conversation")
+                return
+            # Tell the other participant how far this user has read
+            await self.channel_layer.group_send(
+                room_group_name,
+                {
+                    "type": "read_receipt",
+                    "conversation_id": conversation_id,
+                    "user_id": self.user.id,
+                    "last_read_id": last_read_id,
+                },
+            )
+
         elif message_type == "typing":
             is_typing = text_data_json.get("is_typing", False)
             # Broadcast typing status to room group
@@ -111,6 +136,30 @@ class ChatConsumer(AsyncWebsocketConsumer):
             )
         )
 
+    async def chat_saved(self, event):
+        # Send the ids a batch of messages was saved with to WebSocket
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": "saved",
+                    "conversation_id": event["conversation_id"],
+                    "messages": event["messages"],
+                }
+            )
+        )
+
+    async def chat_failed(self, event):
+        # Send the messages a failed batch dropped to WebSocket, to be resent
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": "failed",
+                    "conversation_id": event["conversation_id"],
+                    "client_ids": event["client_ids"],
+                }
+            )
+        )
+
     async def typing_status(self, event):
         # Send typing status to WebSocket
         await self.send(
@@ -125,22 +174,37 @@ class ChatConsumer(AsyncWebsocketConsumer):
             )
         )
 
+    async def read_receipt(self, event):
+        # Send read receipt to WebSocket
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": "read",
+                    "conversation_id": event.get("conversation_id"),
+                    "user_id": event["user_id"],
+                    "last_read_id": event["last_read_id"],
+                }
+            )
+        )
+
     async def send_error(self, message):
         """Send error message to client"""
         await self.send(text_data=json.dumps({"type": "error", "message": message}))
 
     @database_sync_to_async
     def check_conversation_access(self, conversation_id):
-        try:
-            conversation = Conversation.objects.get(id=conversation_id)
-            return conversation.agent == self.user or conversation.client == self.user
-        except Conversation.DoesNotExist:
-            return False
+        """The conversation's ``(client_id, agent_id)`` if the user takes part in it, else None."""
+        participants = (
+            Conversation.objects.filter(id=conversation_id)
+            .values_list("client_id", "agent_id")
+            .first()
+        )
+        if participants is None or self.user.id not in participants:
+            return None
+        return participants
 
     @database_sync_to_async
-    def save_message(self, conversation_id, content):
-        conversation = Conversation.objects.get(id=conversation_id)
-        message = Message.objects.create(
-            conversation=conversation, sender=self.user, content=content
-        )
-        return message
+    def mark_read(self, conversation_id, up_to):
+        client_id, agent_id = self._joined_rooms[conversation_id]
+        conversation = Conversation(id=conversation_id, client_id=client_id, agent_id=agent_id)
+        return inbox.mark_read(conversation, self.user, up_to)
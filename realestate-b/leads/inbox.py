@@ -0,0 +1,204 @@
+"""
+Conversation summaries.
+
+Every conversation carries its last message (``last_message``,
+``last_message_at`` and a ``last_message_preview``), a read cursor per
+participant (``client_last_read_id`` and ``agent_last_read_id``: the last
+message id they have read) and how many messages each participant has not
+read (``client_unread_count`` and ``agent_unread_count``), so the inbox
+never aggregates over ``Message``.
+
+``add_message``, or ``message_added``/``messages_added`` for messages
+created elsewhere (a serializer, the chat write buffer), updates them in
+the transaction that inserts the message, with ``UPDATE`` statements that
+are safe against concurrent writers.
+``mark_read`` moves a participant's read cursor forward and recounts what
+is left after it, in a single-row ``UPDATE``; the messages themselves are
+not touched. ``mark_replied`` moves a sender's cursor to the message they
+just sent, since replying means having read what came before. A message
+is read once its id is at most the recipient's cursor (``Message.is_read`` is kept for messages marked read before the
+cursors existed).
+
+Writes that bypass these (``bulk_create``, ``QuerySet.update``/``delete``)
+must be followed by ``summarize`` on the conversations touched, or by
+``python manage.py repair_conversations``, which recomputes every summary.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Least, Substr
+
+from .models import Conversation, Message
+
+PREVIEW_LENGTH = Conversation._meta.get_field("last_message_preview").max_length
+
+# Columns that Conversation.save() leaves alone
+SUMMARY_FIELDS = (
+    "last_message",
+    "last_message_at",
+    "last_message_preview",
+    "client_unread_count",
+    "agent_unread_count",
+    "client_last_read_id",
+    "agent_last_read_id",
+)
+
+
+def messages_added(messages):
+    """
+    Account for the new ``messages`` in their conversations' summaries: one
+    ``UPDATE`` per conversation for its last message, and one per distinct
+    unread increment for the counters, however many messages there are. Call
+    it in the transaction that created them; each message's ``conversation``
+    must be loaded.
+    """
+    by_conversation = defaultdict(list)
+    for message in messages:
+        by_conversation[message.conversation_id].append(message)
+
+    # Conversations that got the same number of unread messages per participant
+    by_increment = defaultdict(list)
+    for conversation_id, new in by_conversation.items():
+        conversation = new[0].conversation
+        increment = tuple(
+            sum(1 for message in new if message.sender_id != participant_id and not message.is_read)
+            for participant_id in (conversation.client_id, conversation.agent_id)
+        )
+        if any(increment):
+            by_increment[increment].append(conversation_id)
+    for (client_unread, agent_unread), conversation_ids in by_increment.items():
+        Conversation.objects.filter(pk__in=conversation_ids).update(
+            client_unread_count=F("client_unread_count") + client_unread,
+            agent_unread_count=F("agent_unread_count") + agent_unread,
+        )
+
+    for conversation_id, new in by_conversation.items():
+        last = max(new, key=lambda message: (message.created_at, message.pk))
+        # Skip it if a later message got there first
+        Conversation.objects.filter(
+            Q(last_message_at__isnull=True) | Q(last_message_at__lte=last.created_at),
+            pk=conversation_id,
+        ).update(
+            last_message=last,
+            last_message_at=last.created_at,
+            last_message_preview=last.content[:PREVIEW_LENGTH],
+        )
+
+
+def message_added(message):
+    """
+    Account for the new ``message`` in its conversation's summary. Call it
+    in the transaction that created the message.
+    """
+    messages_added([message])
+
+
+def add_message(conversation, sender, content, **fields):
+    """Create a message in ``conversation`` and update its summary."""
+    with transaction.atomic():
+        message = Message.objects.create(
+            conversation=conversation, sender=sender, content=content, **fields
+        )
+        message_added(message)
+    return message
+
+
+def mark_read(conversation, user, up_to=None):
+    """
+    Mark the messages ``user`` received in ``conversation`` read, up to the
+    message with id ``up_to`` (default: the last message). The cursor never
+    moves back, nor past the last message. Returns the new cursor and unread
+    count, or None if ``user`` is not a participant. Raises ``ValueError``
+    if ``up_to`` is not the id of a message in ``conversation``.
+    """
+    if user.pk == conversation.client_id:
+        role = "client"
+    elif user.pk == conversation.agent_id:
+        role = "agent"
+    else:
+        return None
+    if up_to is not None and (
+        up_to < 1 or not Message.objects.filter(pk=up_to, conversation_id=conversation.pk).exists()
+    ):
+        raise ValueError(f"{up_to} is not a message in this conversation")
+    cursor = f"{role}_last_read_id"
+    target = Coalesce(F("last_message_id"), Value(0))
+    if up_to is not None:
+        target = Least(Value(up_to), target)
+    conversations = Conversation.objects.filter(pk=conversation.pk)
+    with transaction.atomic():
+        conversations.update(**{cursor: Greatest(F(cursor), target)})
+        # An indexed range count of what arrived after the cursor
+        conversations.update(**{f"{role}_unread_count": _unread(Message, role)})
+    return conversations.values_list(cursor, f"{role}_unread_count").first()
+
+
+def mark_replied(messages):
+    """
+    Move each sender's read cursor in ``messages`` to the last message they
+    sent there, with one single-row ``UPDATE`` per conversation and sender.
+    Call it in the transaction that created them; each message's
+    ``conversation`` must be loaded.
+    """
+    last_sent = {}
+    for message in messages:
+        conversation = message.conversation
+        if message.sender_id == conversation.client_id:
+            role = "client"
+        elif message.sender_id == conversation.agent_id:
+            role = "agent"
+        else:
+            continue
+        key = (conversation.pk, role)
+        last_sent[key] = max(last_sent.get(key, 0), message.pk)
+    for (conversation_id, role), message_id in last_sent.items():
+        cursor = f"{role}_last_read_id"
+        Conversation.objects.filter(pk=conversation_id).update(
+            **{
+                cursor: Greatest(F(cursor), Value(message_id)),
+                # Counted past the new cursor, as the UPDATE sees the old one
+                f"{role}_unread_count": _unread(
+                    Message, role, after=Greatest(OuterRef(cursor), Value(message_id))
+                ),
+            }
+        )
+
+
+def _unread(message_model, role, after=None):
+    """
+    The messages to the ``role`` participant past their read cursor, or
+    past ``after``.
+    """
+    if after is None:
+        after = OuterRef(f"{role}_last_read_id")
+    rows = (
+        message_model.objects.filter(conversation=OuterRef("pk"), id__gt=after, is_read=False)
+        .exclude(sender=OuterRef(role))
+        .order_by()
+        .values("conversation")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def summarize(conversations=None):
+    """
+    Recompute the summary of ``conversations`` (default: all of them) from
+    their messages and read cursors in one ``UPDATE`` statement. Returns the
+    number of conversations updated.
+    """
+    if conversations is None:
+        conversations = Conversation.objects.all()
+    latest = Message.objects.filter(conversation=OuterRef("pk")).order_by("-created_at", "-pk")
+    return conversations.update(
+        last_message=Subquery(latest.values("pk")[:1]),
+        last_message_at=Subquery(latest.values("created_at")[:1]),
+        last_message_preview=Coalesce(
+            Subquery(latest.annotate(preview=Substr("content", 1, PREVIEW_LENGTH)).values("preview")[:1]),
+            Value(""),
+        ),
+        client_unread_count=_unread(Message, "client"),
+        agent_unread_count=_unread(Message, "agent"),
+    )
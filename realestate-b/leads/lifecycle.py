@@ -0,0 +1,174 @@
+"""
+Lead lifecycle service.
+
+Saving a lead records what happened to it (created, status moved) in a unit
+of work for the current transaction; the follow-up work then runs exactly
+once per lead when the transaction commits, however many times the lead was
+saved in between:
+
+* new leads without an agent are assigned to the property's agent, or one
+  chosen by ``agents.assignment``, and get a Conversation with their registered user;
+* a status move is logged once, from the status the lead was loaded (or
+  created) with to the status it was committed with;
+* the score is moved by the difference in status bonus (the counters are
+  maintained by ``leads.scoring``).
+
+Outside ``transaction.atomic`` the work runs straight after the save. The
+work for one lead failing after the commit is logged; it does not fail the
+request that committed, nor the work for the other leads.
+
+The previous status comes from the snapshot ``Lead.from_db`` takes, so no
+extra read is needed. Leads saved without having been loaded (an unsaved
+instance given an existing pk) have no snapshot and their status moves are
+not logged.
+"""
+import logging
+import threading
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from agents.assignment import assign_agent
+from agents.workload import adjust, lead_is_open
+
+from .models import Conversation, Lead, LeadActivity, LeadStatusLog
+from .scoring import STATUS_BONUS
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class LeadChange:
+    """What happened to one lead within a transaction."""
+
+    def __init__(self, lead, created, from_status):
+        self.lead = lead
+        self.created = created
+        self.from_status = from_status
+        self.changed_by = None
+
+
+class LeadUnitOfWork:
+    def __init__(self):
+        self.changes = {}
+
+    def record(self, lead, created, from_status):
+        change = self.changes.get(lead.pk)
+        if change is None:
+            change = self.changes[lead.pk] = LeadChange(lead, created, from_status)
+        # The last saved instance carries the status that gets committed
+        change.lead = lead
+        change.changed_by = getattr(lead, "_changed_by", None) or change.changed_by
+
+    def commit(self):
+        """The on_commit callback: run the follow-up work of every lead."""
+        if getattr(_local, "uow", None) is self:
+            _local.uow = None
+        changes, self.changes = self.changes, {}
+        for change in changes.values():
+            try:
+                if change.created:
+                    _on_created(change.lead)
+                _on_status_change(change)
+            except Exception:
+                logger.exception("Follow-up work for lead %s failed", change.lead.pk)
+
+
+def _current_unit_of_work():
+    """
+    The unit of work for the transaction in progress. A unit of work lasts
+    while one of its on_commit callbacks is pending: Django drops them when
+    the transaction, or the savepoints they were registered in, roll back,
+    and the recorded work goes with them. (An atomic block is no marker: a
+    reused ``transaction.atomic`` decorator enters the same one every time.)
+    """
+    uow = getattr(_local, "uow", None)
+    if (
+        uow is None
+        or not connection.in_atomic_block
+        # Newest first: the last save's callback is nearly always still there
+        or not any(func == uow.commit for _, func, _ in reversed(connection.run_on_commit))
+    ):
+        uow = _local.uow = LeadUnitOfWork()
+    return uow
+
+
+def lead_saved(lead, created):
+    """Record a save of ``lead``; called from its post_save signal."""
+    from_status = lead.status if created else getattr(lead, "_loaded_status", None)
+    uow = _current_unit_of_work()
+    uow.record(lead, created, from_status)
+    # Registered on every save so the work survives a rolled-back savepoint;
+    # only the first callback to run finds anything to do.
+    transaction.on_commit(uow.commit, robust=True)
+
+
+def _on_created(lead):
+    if lead.agent_id is None:
+        agent = pick_agent(lead.property if lead.property_id else None)
+        if agent is not None:
+            Lead.objects.filter(pk=lead.pk).update(agent=agent)
+            lead.agent = agent
+            lead._loaded_agent_id = agent.pk
+            if lead_is_open(lead.status):
+                # The update above bypasses the workload receivers
+                adjust(agent.pk, "open_leads", 1)
+
+    if lead.agent_id and lead.user_id:
+        Conversation.objects.get_or_create(
+            client_id=lead.user_id,
+            agent_id=lead.agent_id,
+            property_id=lead.property_id,
+            defaults={"lead": lead},
+        )
+
+    try:
+        from notifications.utils import notify_agent_new_lead
+
+        notify_agent_new_lead(lead)
+    except ImportError:
+        pass
+
+
+def pick_agent(property_obj=None):
+    """The property's own agent, else the one the assignment strategy picks."""
+    if property_obj is not None and property_obj.agent_id:
+        return property_obj.agent
+    return assign_agent("open_leads")
+
+
+def _on_status_change(change):
+    lead = change.lead
+    from_status = change.from_status
+    if change.created:
+        # A new lead has not been given any status bonus yet
+        _add_to_score(lead, STATUS_BONUS.get(lead.status, 0))
+    elif from_status is not None:
+        _add_to_score(
+            lead, STATUS_BONUS.get(lead.status, 0) - STATUS_BONUS.get(from_status, 0)
+        )
+
+    if from_status is None or from_status == lead.status:
+        return
+
+    LeadStatusLog.objects.create(
+        lead=lead,
+        from_status=from_status,
+        to_status=lead.status,
+        changed_by=change.changed_by,
+    )
+    agent_id = change.changed_by.pk if change.changed_by else lead.agent_id
+    if agent_id is not None:
+        LeadActivity.objects.create(
+            lead=lead,
+            activity_type="status_change",
+            description=f"Status changed from {from_status} to {lead.status}",
+            agent_id=agent_id,
+        )
+
+
+def _add_to_score(lead, points):
+    if points:
+        Lead.objects.filter(pk=lead.pk).update(score=F("score") + points)
+        lead.score += points
@@ -0,0 +1,165 @@
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from leads.consumers import ChatConsumer
+from leads.message_buffer import chat_messages
+from leads.models import Conversation, Message
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests ChatConsumer with concurrent simulated sockets "
+        "(channels.testing.WebsocketCommunicator): pairs of client and agent "
+        "sockets share a conversation and all send at once. Reports broadcast "
+        "latency and how long the buffered writes take to be saved. Seeded "
+        "users, conversations and messages are deleted afterwards. Without "
+        "REDIS_URL the in-memory channel layer scans every channel on each "
+        "send, so latencies grow with the square of --sockets; set REDIS_URL "
+        "to measure what production would see."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sockets", type=int, default=1_000)
+        parser.add_argument("--messages", type=int, default=5, help="Messages per socket")
+        parser.add_argument("--flush-ms", type=int, default=settings.CHAT_MESSAGE_FLUSH_MS)
+        parser.add_argument("--buffer-size", type=int, default=settings.CHAT_MESSAGE_BUFFER_SIZE)
+        parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait per event")
+
+    def handle(self, *args, **options):
+        settings.CHAT_MESSAGE_FLUSH_MS = options["flush_ms"]
+        settings.CHAT_MESSAGE_BUFFER_SIZE = options["buffer_size"]
+        # The consumer reads and writes from other threads, so the seeded rows
+        # are committed and deleted at the end rather than rolled back.
+        users = self._seed(options["sockets"] // 2)
+        try:
+            conversations = list(
+                Conversation.objects.filter(client__in=users).select_related("client", "agent")
+            )
+            results = async_to_sync(self._run)(conversations, options)
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+        self._report(results, options)
+
+    def _seed(self, pairs):
+        users = User.objects.bulk_create(
+            [
+                User(username=f"bench-chat-{role}-{i}", email=f"bench-chat-{role}-{i}@example.com",
+                     user_type=role)
+                for i in range(pairs)
+                for role in ("client", "agent")
+            ]
+        )
+        Conversation.objects.bulk_create(
+            [Conversation(client=users[i], agent=users[i + 1]) for i in range(0, len(users), 2)]
+        )
+        return users
+
+    async def _run(self, conversations, options):
+        sockets = []
+        for conversation in conversations:
+            for user in (conversation.client, conversation.agent):
+                communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), "/ws/chat/")
+                communicator.scope["user"] = user
+                sockets.append((communicator, conversation.pk))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(communicator.connect() for communicator, _ in sockets))
+        connected = time.perf_counter() - started
+
+        async def join(communicator, conversation_id):
+            # Joined once the socket's own typing event comes back
+            await communicator.send_json_to({"type": "typing", "conversation_id": conversation_id})
+            while True:
+                event = await communicator.receive_json_from(timeout=options["timeout"])
+                if event["type"] == "typing" and event["user_id"] == communicator.scope["user"].pk:
+                    return
+
+        await asyncio.gather(*(join(communicator, pk) for communicator, pk in sockets))
+
+        sent_at = {}
+        latencies = []
+        saved_at = {}
+        failed = set()
+        count = options["messages"]
+        timeout = options["timeout"]
+
+        async def talk(index, communicator, conversation_id):
+            for n in range(count):
+                client_id = f"{index}-{n}"
+                sent_at[client_id] = time.perf_counter()
+                await communicator.send_json_to(
+                    {"conversation_id": conversation_id, "content": f"Message {n}", "client_id": client_id}
+                )
+            # Every socket sees its own and its peer's messages and their saves
+            messages = saved = 0
+            while messages < 2 * count or saved < 2 * count:
+                event = await communicator.receive_json_from(timeout=timeout)
+                if event["type"] == "message":
+                    messages += 1
+                    latencies.append(time.perf_counter() - sent_at[event["message"]["client_id"]])
+                elif event["type"] == "saved":
+                    saved += len(event["messages"])
+                    for message in event["messages"]:
+                        saved_at.setdefault(message["client_id"], time.perf_counter())
+                elif event["type"] == "failed":
+                    saved += len(event["client_ids"])
+                    failed.update(event["client_ids"])
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(talk(index, communicator, pk) for index, (communicator, pk) in enumerate(sockets))
+        )
+        elapsed = time.perf_counter() - started
+        await chat_messages.flush()
+        await asyncio.gather(*(communicator.disconnect() for communicator, _ in sockets))
+
+        stored = await Message.objects.filter(
+            conversation_id__in=[conversation.pk for conversation in conversations]
+        ).acount()
+        return {
+            "sockets": len(sockets),
+            "connected": connected,
+            "elapsed": elapsed,
+            "sent": len(sent_at),
+            "stored": stored,
+            "failed": len(failed),
+            "latencies": sorted(latencies),
+            "save_latencies": sorted(saved_at[key] - sent_at[key] for key in saved_at),
+        }
+
+    def _report(self, results, options):
+        sent = results["sent"]
+        self.stdout.write(
+            f"{results['sockets']} sockets connected in {results['connected']:.2f}s; "
+            f"{sent} messages sent, {results['stored']} stored, {results['failed']} failed "
+            f"(flush {options['flush_ms']} ms, buffer {options['buffer_size']})"
+        )
+        self.stdout.write(f"{'':<12}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for label, values in (("broadcast", results["latencies"]), ("saved", results["save_latencies"])):
+            if not values:
+                continue
+            self.stdout.write(
+                f"{label:<12}"
+                + "".join(
+                    f"{value * 1000:>9.1f}"
+                    for value in (
+                        statistics.median(values),
+                        values[int(len(values) * 0.9) - 1],
+                        values[int(len(values) * 0.99) - 1],
+                        values[-1],
+                    )
+                )
+            )
+        self.stdout.write(
+            f"{sent / results['elapsed']:.0f} messages/s "
+            f"({results['elapsed']:.2f}s until every socket had every broadcast and save)"
+        )
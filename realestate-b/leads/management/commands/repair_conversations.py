@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from leads.inbox import summarize
+from leads.models import Conversation
+
+
+class Command(BaseCommand):
+    help = "Recomputes every conversation's last message and unread counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Conversations updated per statement (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pks = list(Conversation.objects.order_by("pk").values_list("pk", flat=True))
+        count = 0
+        for i in range(0, len(pks), batch_size):
+            batch = pks[i:i + batch_size]
+            with transaction.atomic():
+                count += summarize(
+                    Conversation.objects.filter(pk__gte=batch[0], pk__lte=batch[-1])
+                )
+        self.stdout.write(self.style.SUCCESS(f"Repaired {count} conversations."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from leads.scoring import rescore
+
+
+class Command(BaseCommand):
+    help = "Recounts lead scoring counters and recomputes every lead's score"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rescore()
+        self.stdout.write(self.style.SUCCESS(f"Rescored {count} leads."))
@@ -0,0 +1,146 @@
+"""
+Buffered persistence of chat messages.
+
+``ChatConsumer`` broadcasts a message to its room as soon as it arrives,
+identified by the ``client_id`` its sender generated, and hands it to this
+per-process buffer. The buffer bulk-inserts what it holds, with one thread
+hop for the whole batch, once ``CHAT_MESSAGE_FLUSH_MS`` milliseconds have
+passed since its first message or it holds ``CHAT_MESSAGE_BUFFER_SIZE``
+messages. It then updates the conversation summaries (``leads.inbox``),
+moving each sender's read cursor to their message, and tells each room the ids its messages were saved with (a ``chat_saved``
+event), so clients can swap their ``client_id`` for the real id. If the
+write fails, each room is told which ``client_id``s were dropped instead (a
+``chat_failed`` event), so their senders can send them again.
+
+Like ``properties.search_log``, messages still in the buffer when a process
+is killed are lost; the buffer is written once more when the process exits.
+Messages to conversations deleted in the meantime are dropped, and
+``created_at`` is the flush time.
+"""
+import asyncio
+import atexit
+import logging
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBuffer:
+    def __init__(self):
+        self._rows = []
+        self._timer = None
+        self._lock = None
+        self._lock_loop = None
+
+    def _write_lock(self):
+        """One batch is written at a time, so batches are saved in order."""
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    async def add(self, conversation_id, sender_id, content, client_id):
+        """Buffer one message; flushes the buffer when it is due."""
+        self._rows.append((conversation_id, sender_id, content, client_id))
+        if (
+            len(self._rows) >= settings.CHAT_MESSAGE_BUFFER_SIZE
+            or settings.CHAT_MESSAGE_FLUSH_MS <= 0
+        ):
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(settings.CHAT_MESSAGE_FLUSH_MS / 1000)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Write all buffered messages and announce their ids. Returns the number written."""
+        rows, self._rows = self._rows, []
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()  # Flushed early, when full
+        self._timer = None
+        if not rows:
+            return 0
+
+        channel_layer = get_channel_layer()
+        try:
+            async with self._write_lock():
+                saved = await database_sync_to_async(self.write)(rows)
+        except Exception:
+            logger.exception("Dropped %d buffered chat messages", len(rows))
+            dropped = {}
+            for conversation_id, _, _, client_id in rows:
+                dropped.setdefault(conversation_id, []).append(client_id)
+            for conversation_id, client_ids in dropped.items():
+                await channel_layer.group_send(
+                    f"chat_{conversation_id}",
+                    {
+                        "type": "chat_failed",
+                        "conversation_id": conversation_id,
+                        "client_ids": client_ids,
+                    },
+                )
+            return 0
+
+        by_conversation = {}
+        for message, client_id in saved:
+            by_conversation.setdefault(message.conversation_id, []).append(
+                {
+                    "client_id": client_id,
+                    "id": message.pk,
+                    "created_at": message.created_at.isoformat(),
+                }
+            )
+        for conversation_id, messages in by_conversation.items():
+            await channel_layer.group_send(
+                f"chat_{conversation_id}",
+                {"type": "chat_saved", "conversation_id": conversation_id, "messages": messages},
+            )
+        return len(saved)
+
+    def write(self, rows):
+        """Insert ``rows`` and update their conversations. Returns ``[(message, client_id)]``."""
+        from .inbox import mark_replied, messages_added
+        from .models import Conversation, Message
+
+        conversations = Conversation.objects.only("client_id", "agent_id").in_bulk(
+            {conversation_id for conversation_id, *_ in rows}
+        )
+        kept = [row for row in rows if row[0] in conversations]
+        if len(kept) < len(rows):
+            logger.warning("Dropped %d chat messages to deleted conversations", len(rows) - len(kept))
+        messages = [
+            Message(conversation=conversations[conversation_id], sender_id=sender_id, content=content)
+            for conversation_id, sender_id, content, _ in kept
+        ]
+        with transaction.atomic():
+            Message.objects.bulk_create(messages, batch_size=500)
+            messages_added(messages)
+            mark_replied(messages)
+        return [(message, client_id) for message, (*_, client_id) in zip(messages, kept)]
+
+    def flush_sync(self):
+        """Write what is left without announcing it, e.g. at exit."""
+        rows, self._rows = self._rows, []
+        if rows:
+            try:
+                self.write(rows)
+            except Exception:
+                logger.exception("Dropped %d buffered chat messages", len(rows))
+
+    def clear(self):
+        self._rows = []
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        self._timer = None
+
+
+chat_messages = MessageBuffer()
+
+atexit.register(chat_messages.flush_sync)
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:06
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+
+# As leads.scoring.rescore at the time of this migration
+def _row_count(model, **filters):
+    rows = (
+        model.objects.filter(lead=OuterRef("pk"), **filters)
+        .order_by()
+        .values("lead")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    Lead = apps.get_model("leads", "Lead")
+    Lead.objects.update(
+        interaction_count=_row_count(apps.get_model("leads", "LeadInteraction")),
+        whatsapp_message_count=_row_count(apps.get_model("leads", "WhatsAppMessage")),
+        viewing_count=_row_count(
+            apps.get_model("leads", "LeadActivity"), activity_type="property_viewing"
+        ),
+    )
+    Lead.objects.update(
+        score=F("interaction_count") * 5
+        + F("whatsapp_message_count") * 10
+        + F("viewing_count") * 15
+        + Case(
+            When(status="qualified", then=Value(50)),
+            When(status="proposal", then=Value(100)),
+            When(status="negotiation", then=Value(200)),
+            default=Value(0),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0007_add_message_is_auto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='interaction_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='viewing_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='whatsapp_message_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0008_lead_scoring_counters'),
+        ('properties', '0011_property_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['created_at'], name='lead_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['agent', 'created_at'], name='lead_agent_created_idx'),
+        ),
+    ]
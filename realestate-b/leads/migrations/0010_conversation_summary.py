@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+
+# As leads.inbox.summarize at the time of this migration
+def _unread(Message, participant):
+    rows = (
+        Message.objects.filter(conversation=OuterRef("pk"), is_read=False)
+        .exclude(sender=OuterRef(participant))
+        .order_by()
+        .values("conversation")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def backfill_summaries(apps, schema_editor):
+    Conversation = apps.get_model("leads", "Conversation")
+    Message = apps.get_model("leads", "Message")
+    latest = Message.objects.filter(conversation=OuterRef("pk")).order_by("-created_at", "-pk")
+    Conversation.objects.update(
+        last_message=Subquery(latest.values("pk")[:1]),
+        last_message_at=Subquery(latest.values("created_at")[:1]),
+        last_message_preview=Coalesce(
+            Subquery(latest.annotate(preview=Substr("content", 1, 120)).values("preview")[:1]),
+            Value(""),
+        ),
+        client_unread_count=_unread(Message, "client"),
+        agent_unread_count=_unread(Message, "agent"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0009_lead_created_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='agent_unread_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='client_unread_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='leads.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, editable=False, max_length=120),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
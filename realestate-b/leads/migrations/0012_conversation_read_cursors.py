@@ -0,0 +1,82 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+
+def _last_read(Message, participant):
+    rows = (
+        Message.objects.filter(conversation=OuterRef("pk"), is_read=True)
+        .exclude(sender=OuterRef(participant))
+        .order_by()
+        .values("conversation")
+        .annotate(last=Max("pk"))
+        .values("last")
+    )
+    return Coalesce(Subquery(rows), Value(0))
+
+
+# As leads.inbox.summarize at the time of this migration
+def _unread(Message, participant):
+    rows = (
+        Message.objects.filter(
+            conversation=OuterRef("pk"),
+            id__gt=OuterRef(f"{participant}_last_read_id"),
+            is_read=False,
+        )
+        .exclude(sender=OuterRef(participant))
+        .order_by()
+        .values("conversation")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def backfill_cursors(apps, schema_editor):
+    """Start each cursor at the last message the participant had marked read."""
+    Conversation = apps.get_model("leads", "Conversation")
+    Message = apps.get_model("leads", "Message")
+    Conversation.objects.update(
+        client_last_read_id=_last_read(Message, "client"),
+        agent_last_read_id=_last_read(Message, "agent"),
+    )
+    latest = Message.objects.filter(conversation=OuterRef("pk")).order_by("-created_at", "-pk")
+    Conversation.objects.update(
+        last_message=Subquery(latest.values("pk")[:1]),
+        last_message_at=Subquery(latest.values("created_at")[:1]),
+        last_message_preview=Coalesce(
+            Subquery(latest.annotate(preview=Substr("content", 1, 120)).values("preview")[:1]),
+            Value(""),
+        ),
+        client_unread_count=_unread(Message, "client"),
+        agent_unread_count=_unread(Message, "agent"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0011_message_conversation_created_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='agent_last_read_id',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='client_last_read_id',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'id'], name='message_conv_id_idx'),
+        ),
+        migrations.RunPython(backfill_cursors, migrations.RunPython.noop),
+    ]
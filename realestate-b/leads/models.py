@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Prefetch, Q
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from properties.models import Property
@@ -53,6 +54,11 @@ class Lead(models.Model):
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default="low")
     score = models.IntegerField(default=0)
 
+    # Scoring counters, kept current by leads.scoring
+    interaction_count = models.PositiveIntegerField(default=0, editable=False)
+    whatsapp_message_count = models.PositiveIntegerField(default=0, editable=False)
+    viewing_count = models.PositiveIntegerField(default=0, editable=False)
+
     # Buyer preferences
     budget_min = models.DecimalField(
         max_digits=12, decimal_places=2, null=True, blank=True
@@ -88,32 +94,71 @@ class Lead(models.Model):
 
     class Meta:
         ordering = ["-score", "-created_at"]
+        indexes = [
+            # Date-range scans for the analytics time series
+            models.Index(fields=["created_at"], name="lead_created_idx"),
+            models.Index(fields=["agent", "created_at"], name="lead_agent_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} (score: {self.score})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Status and agent as loaded, so leads.lifecycle and agents.signals
+        # can see a change without a re-read
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get("status")
+        instance._loaded_agent_id = instance.__dict__.get("agent_id")
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_status = self.__dict__.get("status")
+        self._loaded_agent_id = self.__dict__.get("agent_id")
+
+    def save(self, *args, **kwargs):
+        """
+        The score and its counters are maintained in SQL by leads.scoring, so
+        a plain save of an existing lead must not write back stale copies.
+        """
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            from .scoring import SCORING_FIELDS
+
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in SCORING_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "status" in update_fields:
+            self._loaded_status = self.status
+        if update_fields is None or "agent" in update_fields:
+            self._loaded_agent_id = self.agent_id
+
     def update_score(self):
         """
-        Recalculate lead score from interactions and status.
-        FIX: use update_fields to avoid recursive save() loops in signals.
+        Recalculate lead score from the scoring counters and status.
+        The counters are re-read first since they are bumped in SQL.
         """
-        total = 0
-        total += self.interactions.count() * 5
-        total += self.whatsapp_messages.count() * 10
-        total += self.activities.filter(activity_type="property_viewing").count() * 15
-
-        # Status multipliers
-        status_bonus = {
-            "qualified": 50,
-            "proposal": 100,
-            "negotiation": 200,
-        }
-        total += status_bonus.get(self.status, 0)
-
-        # FIX: update_fields prevents triggering auto_now on updated_at
-        # and avoids infinite loops when called from signals
-        Lead.objects.filter(pk=self.pk).update(score=total)
-        self.score = total
+        from .scoring import COUNTER_FIELDS, calculate_score
+
+        row = (
+            Lead.objects.filter(pk=self.pk)
+            .values_list("score", *COUNTER_FIELDS)
+            .first()
+        )
+        if row is None:
+            return
+        self.score, *counters = row
+        for field, value in zip(COUNTER_FIELDS, counters):
+            setattr(self, field, value)
+
+        total = calculate_score(self)
+        if total != self.score:
+            Lead.objects.filter(pk=self.pk).update(score=total)
+            self.score = total
 
     def mark_contacted(self):
         """Call whenever agent sends a message or logs a call."""
@@ -143,7 +188,19 @@ class LeadStatusLog(models.Model):
         return f"{self.lead} | {self.from_status} → {self.to_status}"
 
 
-class LeadInteraction(models.Model):
+class ScoredRow:
+    """A row that earns its lead points (see leads.scoring)."""
+
+    def delete(self, *args, **kwargs):
+        from .scoring import uncount_row
+
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            uncount_row(self)
+        return result
+
+
+class LeadInteraction(ScoredRow, models.Model):
     INTERACTION_TYPES = (
         ("page_view", "Page View"),
         ("property_click", "Property Click"),
@@ -167,7 +224,7 @@ class LeadInteraction(models.Model):
         return f"{self.interaction_type} by {self.lead}"
 
 
-class LeadActivity(models.Model):
+class LeadActivity(ScoredRow, models.Model):
     ACTIVITY_TYPES = (
         ("call", "Phone Call"),
         ("email", "Email"),
@@ -219,7 +276,7 @@ class Task(models.Model):
         return f"Task for {self.lead.first_name}: {self.title}"
 
 
-class WhatsAppMessage(models.Model):
+class WhatsAppMessage(ScoredRow, models.Model):
     lead = models.ForeignKey(
         Lead, on_delete=models.CASCADE, related_name="whatsapp_messages"
     )
@@ -235,6 +292,26 @@ class WhatsAppMessage(models.Model):
         return f"WhatsApp {self.direction} - {self.lead}"
 
 
+class ConversationQuerySet(models.QuerySet):
+    def for_inbox(self):
+        """
+        Load what ConversationSerializer shows, so a page of conversations
+        costs a fixed number of queries: the last message and the unread
+        counters are columns of the conversation (see leads.inbox), and the
+        lead is prefetched with its inquiry count.
+        """
+        return self.select_related("property", "client", "agent", "last_message").prefetch_related(
+            Prefetch(
+                "lead",
+                queryset=Lead.objects.annotate(
+                    inquiries_count=Count(
+                        "interactions", filter=Q(interactions__interaction_type="inquiry")
+                    )
+                ),
+            )
+        )
+
+
 class Conversation(models.Model):
     lead = models.ForeignKey(
         Lead,
@@ -260,6 +337,20 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Summary of the messages, maintained by leads.inbox
+    last_message = models.ForeignKey(
+        "Message", on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="+"
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_message_preview = models.CharField(max_length=120, blank=True, editable=False)
+    client_unread_count = models.PositiveIntegerField(default=0, editable=False)
+    agent_unread_count = models.PositiveIntegerField(default=0, editable=False)
+    # Read cursors: the id of the last message each participant has read
+    client_last_read_id = models.PositiveBigIntegerField(default=0, editable=False)
+    agent_last_read_id = models.PositiveBigIntegerField(default=0, editable=False)
+
+    objects = ConversationQuerySet.as_manager()
+
     class Meta:
         ordering = ["-updated_at"]
         # FIX: prevent duplicate conversations for the same client/property pair
@@ -275,6 +366,37 @@ class Conversation(models.Model):
         title = self.property.title if self.property else "General"
         return f"Conversation: {title} — {self.client.username}"
 
+    def save(self, *args, **kwargs):
+        """
+        The message summary is maintained in SQL by leads.inbox, so a plain
+        save of an existing conversation must not write back stale copies.
+        """
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            from .inbox import SUMMARY_FIELDS
+
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in SUMMARY_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    def unread_count_for(self, user):
+        """Messages from the other participant that ``user`` has not read."""
+        if user.pk == self.client_id:
+            return self.client_unread_count
+        if user.pk == self.agent_id:
+            return self.agent_unread_count
+        return 0
+
+    def is_read(self, message):
+        """Whether the participant ``message`` was sent to has read it."""
+        if message.is_read:
+            return True
+        if message.sender_id == self.client_id:
+            return message.pk <= self.agent_last_read_id
+        return message.pk <= self.client_last_read_id
+
 
 class Message(models.Model):
     conversation = models.ForeignKey(
@@ -288,6 +410,10 @@ class Message(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["conversation", "created_at"], name="message_conv_created_idx"),
+            models.Index(fields=["conversation", "id"], name="message_conv_id_idx"),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender.username}"
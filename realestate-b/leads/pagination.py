@@ -0,0 +1,103 @@
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class MessageHistoryPagination(BasePagination):
+    """
+    Keyset pagination of a conversation's messages over ``(created_at, id)``.
+
+    With no anchor a page holds the latest ``limit`` messages. ``?before=<id>``
+    gives the ``limit`` messages just older than message ``id`` (scrolling
+    back), ``?after=<id>`` the ones just newer (catching up after a
+    reconnect). Pages are always in chronological order; ``previous`` and
+    ``next`` link to the older and newer pages, and are null when there is
+    nothing more on that side. No ``OFFSET`` or ``COUNT(*)`` is run, so any
+    page costs the same as the latest one.
+    """
+
+    before_query_param = "before"
+    after_query_param = "after"
+    limit_query_param = "limit"
+    default_limit = 50
+    max_limit = 200
+    invalid_anchor_message = "Invalid anchor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        limit = self.get_limit(request)
+        before = request.query_params.get(self.before_query_param)
+        after = request.query_params.get(self.after_query_param)
+        if before and after:
+            raise ValidationError(
+                f"Use either {self.before_query_param} or {self.after_query_param}, not both"
+            )
+
+        newest_first = not after
+        if newest_first:
+            queryset = queryset.order_by("-created_at", "-id")
+        else:
+            queryset = queryset.order_by("created_at", "id")
+        anchor = before or after
+        if anchor:
+            created_at, pk = self.get_anchor(queryset, anchor)
+            lookup = "lt" if before else "gt"
+            queryset = queryset.filter(
+                Q(**{f"created_at__{lookup}": created_at})
+                | Q(created_at=created_at, **{f"id__{lookup}": pk})
+            )
+
+        # One extra row tells us whether there is more beyond this page
+        rows = list(queryset[: limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if newest_first:
+            rows.reverse()
+
+        self.page = rows
+        self.has_older = has_more if newest_first else True
+        self.has_newer = bool(before) if newest_first else has_more
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_next_link(self):
+        if not self.has_newer or not self.page:
+            return None
+        return self.link(self.after_query_param, self.page[-1].pk)
+
+    def get_previous_link(self):
+        if not self.has_older or not self.page:
+            return None
+        return self.link(self.before_query_param, self.page[0].pk)
+
+    def link(self, param, pk):
+        url = remove_query_param(self.base_url, self.before_query_param)
+        url = remove_query_param(url, self.after_query_param)
+        return replace_query_param(url, param, pk)
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return min(max(limit, 1), self.max_limit)
+
+    def get_anchor(self, queryset, anchor):
+        """``(created_at, id)`` of the anchor message, which must be in ``queryset``."""
+        try:
+            position = queryset.filter(pk=int(anchor)).values_list("created_at", "pk").first()
+        except ValueError:
+            position = None
+        if position is None:
+            raise NotFound(self.invalid_anchor_message)
+        return position
@@ -0,0 +1,173 @@
+"""
+Incremental lead scoring.
+
+Every lead carries counters of the rows that earn it points (interactions,
+WhatsApp messages and property viewings). The counters and the score move
+by deltas as those rows are created (the receivers below) or deleted (the
+rows' ``delete()``, see ``models.ScoredRow``), so a score never needs
+``COUNT`` queries; ``calculate_score`` derives it in memory.
+
+Deletes are not ``post_delete`` receivers: a receiver would make every
+cascade from a lead load and delete its rows one by one, to update a lead
+that is going away. Deleting a lead, or a property, stays one ``DELETE`` per
+table. The one cascade that removes rows from leads that stay, deleting an
+agent with their activities, is accounted for before it runs.
+
+Other writes that bypass these (``bulk_create``, ``QuerySet.update``, a
+``QuerySet.delete`` other than ``delete_rows``) must apply the deltas
+themselves, or be followed by ``python manage.py rescore_leads``, which
+rebuilds every counter and score with aggregate queries.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Lead, LeadActivity, LeadInteraction, WhatsAppMessage
+
+INTERACTION_POINTS = 5
+WHATSAPP_POINTS = 10
+VIEWING_POINTS = 15
+
+STATUS_BONUS = {
+    "qualified": 50,
+    "proposal": 100,
+    "negotiation": 200,
+}
+
+COUNTER_FIELDS = ("interaction_count", "whatsapp_message_count", "viewing_count")
+
+# Columns that Lead.save() leaves alone
+SCORING_FIELDS = ("score", *COUNTER_FIELDS)
+
+# The counter each scored model feeds, its points, and which of its rows count
+SCORED_ROWS = {
+    LeadInteraction: ("interaction_count", INTERACTION_POINTS, {}),
+    WhatsAppMessage: ("whatsapp_message_count", WHATSAPP_POINTS, {}),
+    LeadActivity: ("viewing_count", VIEWING_POINTS, {"activity_type": "property_viewing"}),
+}
+
+
+def calculate_score(lead):
+    """Score ``lead`` from its counters and status."""
+    return (
+        lead.interaction_count * INTERACTION_POINTS
+        + lead.whatsapp_message_count * WHATSAPP_POINTS
+        + lead.viewing_count * VIEWING_POINTS
+        + STATUS_BONUS.get(lead.status, 0)
+    )
+
+
+def apply_delta(lead_ids, counter, points, delta=1):
+    """Bump ``counter`` and the score of ``lead_ids`` by ``delta`` rows."""
+    count = F(counter) + delta
+    if delta < 0:
+        # Never below zero, even if rows were removed without a delta
+        count = Greatest(count, Value(0))
+    Lead.objects.filter(pk__in=lead_ids).update(
+        **{counter: count},
+        score=F("score") + points * delta,
+    )
+
+
+# ─── Delta receivers ─────────────────────────────────────────────────────────
+
+
+@receiver(post_save, sender=LeadInteraction)
+def count_interaction(sender, instance, created, **kwargs):
+    if created:
+        apply_delta([instance.lead_id], "interaction_count", INTERACTION_POINTS)
+
+
+@receiver(post_save, sender=WhatsAppMessage)
+def count_whatsapp_message(sender, instance, created, **kwargs):
+    if created:
+        apply_delta([instance.lead_id], "whatsapp_message_count", WHATSAPP_POINTS)
+
+
+@receiver(post_save, sender=LeadActivity)
+def count_viewing(sender, instance, created, **kwargs):
+    if created and instance.activity_type == "property_viewing":
+        apply_delta([instance.lead_id], "viewing_count", VIEWING_POINTS)
+
+
+# ─── Deletes ─────────────────────────────────────────────────────────────────
+
+
+def uncount_row(row):
+    """Take one deleted interaction, WhatsApp message or viewing off its lead."""
+    counter, points, filters = SCORED_ROWS[type(row)]
+    if all(getattr(row, field) == value for field, value in filters.items()):
+        apply_delta([row.lead_id], counter, points, -1)
+
+
+def uncount(rows):
+    """
+    Take ``rows``, a queryset of one scored model about to be deleted, off
+    their leads: one aggregate query, then one ``UPDATE`` per distinct number
+    of rows a lead loses.
+    """
+    counter, points, filters = SCORED_ROWS[rows.model]
+    leads_by_total = defaultdict(list)
+    per_lead = (
+        rows.filter(**filters).order_by().values("lead").annotate(total=Count("pk"))
+    )
+    for row in per_lead:
+        leads_by_total[row["total"]].append(row["lead"])
+    for total, lead_ids in leads_by_total.items():
+        apply_delta(lead_ids, counter, points, -total)
+
+
+def delete_rows(rows):
+    """``rows.delete()``, keeping their leads' counters and scores."""
+    with transaction.atomic():
+        uncount(rows)
+        return rows.delete()
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def uncount_agent_viewings(sender, instance, **kwargs):
+    """
+    Deleting a user cascades to the activities they logged as agent, on
+    leads that stay (``Lead.agent`` is ``SET_NULL``).
+    """
+    uncount(LeadActivity.objects.filter(agent=instance))
+
+
+# ─── Full recompute ──────────────────────────────────────────────────────────
+
+
+def _row_count(model, **filters):
+    rows = (
+        model.objects.filter(lead=OuterRef("pk"), **filters)
+        .order_by()
+        .values("lead")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def rescore():
+    """
+    Recount every lead's counters and recompute its score in two ``UPDATE``
+    statements. Returns the number of leads rescored.
+    """
+    Lead.objects.update(
+        interaction_count=_row_count(LeadInteraction),
+        whatsapp_message_count=_row_count(WhatsAppMessage),
+        viewing_count=_row_count(LeadActivity, activity_type="property_viewing"),
+    )
+    return Lead.objects.update(
+        score=F("interaction_count") * INTERACTION_POINTS
+        + F("whatsapp_message_count") * WHATSAPP_POINTS
+        + F("viewing_count") * VIEWING_POINTS
+        + Case(
+            *[When(status=status, then=Value(bonus)) for status, bonus in STATUS_BONUS.items()],
+            default=Value(0),
+        )
+    )
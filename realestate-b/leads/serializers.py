@@ -217,6 +217,14 @@ class MessageSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["sender", "conversation", "created_at"]
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Given the conversation, is_read follows the recipient's read cursor
+        conversation = self.context.get("conversation")
+        if conversation is not None and conversation.pk == instance.conversation_id:
+            data["is_read"] = conversation.is_read(instance)
+        return data
+
 
 class ConversationSerializer(serializers.ModelSerializer):
     property_title = serializers.CharField(
@@ -240,6 +248,8 @@ class ConversationSerializer(serializers.ModelSerializer):
             "lead",
             "lead_details",
             "last_message",
+            "last_message_at",
+            "last_message_preview",
             "unread_count",
             "other_user",
             "is_active",
@@ -254,15 +264,20 @@ class ConversationSerializer(serializers.ModelSerializer):
         return None
 
     def get_last_message(self, obj):
-        last = obj.messages.last()
-        return MessageSerializer(last).data if last else None
+        last = obj.last_message
+        if last is None:
+            return None
+        # The sender is always a participant, who is already loaded
+        if last.sender_id == obj.client_id:
+            last.sender = obj.client
+        elif last.sender_id == obj.agent_id:
+            last.sender = obj.agent
+        return MessageSerializer(last, context={"conversation": obj}).data
 
     def get_unread_count(self, obj):
         request = self.context.get("request")
         if request and request.user.is_authenticated:
-            return (
-                obj.messages.filter(is_read=False).exclude(sender=request.user).count()
-            )
+            return obj.unread_count_for(request.user)
         return 0
 
     def get_other_user(self, obj):
@@ -280,14 +295,17 @@ class ConversationSerializer(serializers.ModelSerializer):
     def get_lead_details(self, obj):
         if not obj.lead:
             return None
+        inquiries_count = getattr(obj.lead, "inquiries_count", None)
+        if inquiries_count is None:
+            inquiries_count = obj.lead.interactions.filter(
+                interaction_type="inquiry"
+            ).count()
         return {
             "id": obj.lead.id,
             "score": obj.lead.score,
             "priority": obj.lead.priority,
             "status": obj.lead.status,
-            "inquiries_count": obj.lead.interactions.filter(
-                interaction_type="inquiry"
-            ).count(),
+            "inquiries_count": inquiries_count,
             "is_hot": obj.lead.score >= 50,
             # FIX: added status so frontend can show badge in conversation list
         }
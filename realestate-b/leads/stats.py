@@ -0,0 +1,82 @@
+"""
+Lead figures for the CRM dashboard (``CRMStatsView``).
+
+Every figure comes from one conditional-aggregation query over the agent's
+leads (or all leads, for admins). The result is cached per agent for
+``CRM_STATS_CACHE_TTL`` seconds and dropped by the receivers in
+``leads.signals`` whenever one of that agent's leads is saved or deleted.
+Score changes made in SQL by ``leads.scoring`` do not drop it, so
+``avg_score`` and ``hot_leads`` may lag by up to the TTL. The cache is
+shared between processes through Redis when ``REDIS_URL`` is set; without
+it, each process has its own and drops only its own copy, so the others
+may lag by up to the TTL too.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
+
+from .models import Lead
+
+HOT_LEAD_SCORE = 50
+
+# Response key for each status count
+STATUS_KEYS = {
+    "new": "new_leads",
+    "contacted": "contacted",
+    "viewing": "viewing",
+    "qualified": "qualified_leads",
+    "proposal": "proposal",
+    "negotiation": "negotiation",
+    "closed_won": "closed_won",
+    "closed_lost": "closed_lost",
+}
+
+
+def _cache_key(agent_id):
+    return f"leads:stats:{agent_id or 'all'}"
+
+
+def lead_stats(agent_id=None):
+    """
+    Lead counts by status, the average score and the number of hot leads,
+    for ``agent_id``'s leads or, when None, every lead.
+    """
+    ttl = settings.CRM_STATS_CACHE_TTL
+    key = _cache_key(agent_id)
+    if ttl:
+        stats = cache.get(key)
+        if stats is not None:
+            return stats
+
+    leads = Lead.objects.all() if agent_id is None else Lead.objects.filter(agent_id=agent_id)
+    totals = leads.aggregate(
+        total_leads=Count("pk"),
+        avg_score=Avg("score"),
+        hot_leads=Count("pk", filter=Q(score__gte=HOT_LEAD_SCORE)),
+        **{
+            status: Count("pk", filter=Q(status=status))
+            for status, _ in Lead.STATUS_CHOICES
+        },
+    )
+
+    stats = {"total_leads": totals["total_leads"]}
+    for status, _ in Lead.STATUS_CHOICES:
+        stats[STATUS_KEYS[status]] = totals[status]
+    stats["avg_score"] = round(totals["avg_score"] or 0, 1)
+    stats["hot_leads"] = totals["hot_leads"]
+    stats["status_distribution"] = [
+        {"status": status, "count": totals[status]}
+        for status, _ in Lead.STATUS_CHOICES
+        if totals[status]
+    ]
+
+    if ttl:
+        cache.set(key, stats, ttl)
+    return stats
+
+
+def invalidate_lead_stats(*agent_ids):
+    """Drop the cached stats of ``agent_ids`` and the platform-wide stats."""
+    cache.delete_many(
+        [_cache_key(None)] + [_cache_key(agent_id) for agent_id in set(agent_ids) if agent_id]
+    )
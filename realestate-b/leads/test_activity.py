@@ -0,0 +1,103 @@
+"""
+Tests for deferred lead-activity capture (leads.activity).
+"""
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from leads.activity import capture_property_views
+from leads.models import LeadActivity
+
+pytestmark = [pytest.mark.integration]
+
+
+def _viewings(lead):
+    return LeadActivity.objects.filter(lead=lead, activity_type="property_viewing")
+
+
+class TestCapturePropertyViews:
+    def test_logs_one_activity_per_lead_per_batch(
+        self, lead_factory, client_user_factory, property_factory
+    ):
+        user = client_user_factory()
+        first, second = property_factory(title="First"), property_factory(title="Second")
+        lead = lead_factory(user=user, property=first)
+
+        created = capture_property_views(
+            [(first.pk, user.pk), (second.pk, user.pk), (first.pk, user.pk)]
+        )
+
+        assert created == 1
+        activity = _viewings(lead).get()
+        assert activity.description == "Viewed property: First"
+        assert activity.agent == lead.agent
+        lead.refresh_from_db()
+        assert lead.score == 15
+
+    def test_prefers_the_lead_for_the_viewed_property(
+        self, lead_factory, client_user_factory, property_factory
+    ):
+        user = client_user_factory()
+        viewed = property_factory(title="Viewed")
+        other_lead = lead_factory(user=user, score=99)
+        lead = lead_factory(user=user, property=viewed)
+
+        capture_property_views([(viewed.pk, user.pk)])
+
+        assert _viewings(lead).count() == 1
+        assert _viewings(other_lead).count() == 0
+
+    def test_skips_leads_with_a_recent_viewing(
+        self, lead_factory, client_user_factory
+    ):
+        user = client_user_factory()
+        lead = lead_factory(user=user)
+        capture_property_views([(lead.property_id, user.pk)])
+
+        assert capture_property_views([(lead.property_id, user.pk)]) == 0
+
+        _viewings(lead).update(created_at=timezone.now() - timedelta(hours=2))
+        assert capture_property_views([(lead.property_id, user.pk)]) == 1
+
+    def test_ignores_users_without_leads(
+        self, client_user_factory, property_factory, django_assert_num_queries
+    ):
+        user = client_user_factory()
+        prop = property_factory()
+
+        with django_assert_num_queries(1):
+            assert capture_property_views([(prop.pk, user.pk)]) == 0
+
+    def test_batch_query_count_is_bounded(
+        self, lead_factory, client_user_factory, django_assert_max_num_queries
+    ):
+        views = []
+        for _ in range(10):
+            user = client_user_factory()
+            lead = lead_factory(user=user)
+            views.append((lead.property_id, user.pk))
+
+        # Lead, property and recent-activity lookups, insert, score update
+        with django_assert_max_num_queries(5):
+            assert capture_property_views(views) == len(views)
+
+
+class TestPropertyDetailCapture:
+    def test_detail_view_defers_capture(
+        self, settings, api_client, lead_factory, client_user_factory,
+        property_view_buffer,
+    ):
+        settings.PROPERTY_VIEW_FLUSH_INTERVAL = 3600
+        user = client_user_factory()
+        lead = lead_factory(user=user)
+        api_client.force_authenticate(user=user)
+        url = reverse("property-detail", args=[lead.property.slug])
+
+        response = api_client.get(url)
+
+        assert response.status_code == 200
+        assert not _viewings(lead).exists()
+        property_view_buffer.flush()
+        assert _viewings(lead).count() == 1
@@ -0,0 +1,219 @@
+"""
+Tests for the chat WebSocket consumer (leads.consumers.ChatConsumer).
+"""
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+
+from leads import inbox
+from leads.consumers import ChatConsumer
+from leads.message_buffer import chat_messages
+from leads.models import Conversation, Message
+
+# The consumer reads the database from another thread
+pytestmark = [pytest.mark.integration, pytest.mark.django_db(transaction=True)]
+
+
+def connect(user):
+    communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), "/ws/chat/")
+    communicator.scope["user"] = user
+    return communicator
+
+
+@pytest.fixture
+def conversation(agent_user_factory, client_user_factory):
+    return Conversation.objects.create(agent=agent_user_factory(), client=client_user_factory())
+
+
+def test_read_receipt(conversation):
+    message = inbox.add_message(conversation, conversation.client, "Hello")
+
+    async def run():
+        client = connect(conversation.client)
+        agent = connect(conversation.agent)
+        await client.connect()
+        await agent.connect()
+        # Join the room, then read it
+        await client.send_json_to({"type": "typing", "conversation_id": conversation.pk})
+        await client.receive_json_from()
+        await agent.send_json_to({"type": "read", "conversation_id": conversation.pk})
+        receipts = [await client.receive_json_from(), await agent.receive_json_from()]
+        await client.disconnect()
+        await agent.disconnect()
+        return receipts
+
+    receipts = async_to_sync(run)()
+
+    expected = {
+        "type": "read",
+        "conversation_id": conversation.pk,
+        "user_id": conversation.agent_id,
+        "last_read_id": message.pk,
+    }
+    assert receipts == [expected, expected]
+    conversation.refresh_from_db()
+    assert conversation.agent_last_read_id == message.pk
+    assert conversation.agent_unread_count == 0
+
+
+def test_invalid_read(conversation):
+    async def run():
+        agent = connect(conversation.agent)
+        await agent.connect()
+        await agent.send_json_to(
+            {"type": "read", "conversation_id": conversation.pk, "message_id": "last"}
+        )
+        response = await agent.receive_json_from()
+        await agent.disconnect()
+        return response
+
+    assert async_to_sync(run)()["type"] == "error"
+
+
+def test_message_broadcast_then_saved(conversation):
+    async def run():
+        client = connect(conversation.client)
+        agent = connect(conversation.agent)
+        await client.connect()
+        await agent.connect()
+        await agent.send_json_to({"type": "typing", "conversation_id": conversation.pk})
+        await agent.receive_json_from()
+        await client.send_json_to(
+            {"conversation_id": str(conversation.pk), "content": "Hi!", "client_id": "c1"}
+        )
+        events = [await agent.receive_json_from(), await agent.receive_json_from()]
+        await client.disconnect()
+        await agent.disconnect()
+        return events
+
+    broadcast, saved = async_to_sync(run)()
+
+    message = Message.objects.get()
+    assert broadcast["type"] == "message"
+    assert broadcast["message"]["id"] is None
+    assert broadcast["message"]["client_id"] == "c1"
+    assert broadcast["message"]["sender_type"] == "client"
+    assert saved == {
+        "type": "saved",
+        "conversation_id": conversation.pk,
+        "messages": [
+            {"client_id": "c1", "id": message.pk, "created_at": message.created_at.isoformat()}
+        ],
+    }
+    conversation.refresh_from_db()
+    assert conversation.last_message_id == message.pk
+    assert conversation.agent_unread_count == 1
+
+
+def test_failed_write_is_announced(conversation, monkeypatch):
+    def fail(rows):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(chat_messages, "write", fail)
+
+    async def run():
+        agent = connect(conversation.agent)
+        await agent.connect()
+        await agent.send_json_to(
+            {"conversation_id": conversation.pk, "content": "Hi!", "client_id": "c1"}
+        )
+        events = [await agent.receive_json_from(), await agent.receive_json_from()]
+        await agent.disconnect()
+        return events
+
+    broadcast, failed = async_to_sync(run)()
+
+    assert broadcast["message"]["client_id"] == "c1"
+    assert failed == {"type": "failed", "conversation_id": conversation.pk, "client_ids": ["c1"]}
+    assert not Message.objects.exists()
+
+
+def test_access_checked_once_per_room(conversation, monkeypatch):
+    checks = []
+    check = ChatConsumer.__dict__["check_conversation_access"].func
+
+    @database_sync_to_async
+    def counted(self, conversation_id):
+        checks.append(conversation_id)
+        return check(self, conversation_id)
+
+    monkeypatch.setattr(ChatConsumer, "check_conversation_access", counted)
+
+    async def run():
+        agent = connect(conversation.agent)
+        await agent.connect()
+        for is_typing in (True, False, True):
+            await agent.send_json_to(
+                {"type": "typing", "conversation_id": conversation.pk, "is_typing": is_typing}
+            )
+            await agent.receive_json_from()
+        await agent.disconnect()
+
+    async_to_sync(run)()
+
+    assert checks == [conversation.pk]
+
+
+def test_outsider_denied(conversation, client_user_factory):
+    user = client_user_factory()
+
+    async def run():
+        outsider = connect(user)
+        await outsider.connect()
+        await outsider.send_json_to({"conversation_id": conversation.pk, "content": "Hi"})
+        response = await outsider.receive_json_from()
+        await outsider.disconnect()
+        return response
+
+    assert async_to_sync(run)()["type"] == "error"
+    assert not Message.objects.exists()
+
+
+class TestMessageBuffer:
+    def test_writes_when_full(self, conversation, settings):
+        settings.CHAT_MESSAGE_FLUSH_MS = 60_000
+        settings.CHAT_MESSAGE_BUFFER_SIZE = 3
+
+        async def run():
+            for i in range(2):
+                await chat_messages.add(conversation.pk, conversation.client_id, str(i), f"c{i}")
+            pending = await Message.objects.acount()
+            await chat_messages.add(conversation.pk, conversation.agent_id, "2", "c2")
+            return pending
+
+        assert async_to_sync(run)() == 0
+        assert list(Message.objects.order_by("pk").values_list("content", flat=True)) == ["0", "1", "2"]
+        conversation.refresh_from_db()
+        # The agent's reply reads the client's messages; the client has not read it
+        assert conversation.agent_unread_count == 0
+        assert conversation.client_unread_count == 1
+        assert conversation.client_last_read_id == Message.objects.get(content="1").pk
+        assert conversation.last_message_preview == "2"
+
+    def test_writes_after_interval(self, conversation, settings):
+        settings.CHAT_MESSAGE_FLUSH_MS = 10
+
+        async def run():
+            await chat_messages.add(conversation.pk, conversation.client_id, "Hi", "c1")
+            await asyncio.sleep(0.2)
+
+        async_to_sync(run)()
+
+        assert Message.objects.count() == 1
+
+    def test_drops_deleted_conversations(self, conversation, agent_user_factory, client_user_factory):
+        gone = Conversation.objects.create(agent=agent_user_factory(), client=client_user_factory())
+        gone_id = gone.pk
+        gone.delete()
+
+        saved = chat_messages.write(
+            [
+                (gone_id, conversation.client_id, "lost", "c1"),
+                (conversation.pk, conversation.client_id, "kept", "c2"),
+            ]
+        )
+
+        assert [(message.content, client_id) for message, client_id in saved] == [("kept", "c2")]
@@ -0,0 +1,293 @@
+"""
+Tests for the conversation inbox: the summaries kept by leads.inbox and
+ConversationSerializer over Conversation.objects.for_inbox.
+"""
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from leads import inbox
+from leads.models import Conversation, Lead, LeadInteraction, Message
+from leads.serializers import ConversationSerializer
+
+pytestmark = [pytest.mark.integration]
+
+NOW = timezone.now()
+
+
+def serialize(queryset, user):
+    return ConversationSerializer(
+        queryset.order_by("pk"), many=True, context={"request": SimpleNamespace(user=user)}
+    ).data
+
+
+def summary(conversation):
+    return Conversation.objects.values(*inbox.SUMMARY_FIELDS).get(pk=conversation.pk)
+
+
+@pytest.fixture
+def agent(agent_client):
+    return agent_client.user
+
+
+@pytest.fixture
+def client_user(client_user_factory):
+    return client_user_factory()
+
+
+@pytest.fixture
+def conversation(agent, client_user):
+    return Conversation.objects.create(agent=agent, client=client_user)
+
+
+@pytest.fixture
+def busy(agent, client_user, conversation_factory, lead_factory):
+    """A conversation with a mix of read, unread, own and auto messages."""
+    lead = lead_factory(agent=agent)
+    LeadInteraction.objects.create(lead=lead, interaction_type="inquiry")
+    LeadInteraction.objects.create(lead=lead, interaction_type="inquiry")
+    conversation = conversation_factory(agent=agent, client=client_user, lead=lead)
+    for minutes, sender, is_read, is_auto in (
+        (30, client_user, True, True),
+        (20, client_user, False, False),
+        (10, agent, False, False),
+        (5, client_user, False, False),
+    ):
+        message = inbox.add_message(
+            conversation, sender, f"{minutes}m ago", is_read=is_read, is_auto=is_auto
+        )
+        Message.objects.filter(pk=message.pk).update(created_at=NOW - timedelta(minutes=minutes))
+    Conversation.objects.filter(pk=conversation.pk).update(last_message_at=NOW - timedelta(minutes=5))
+    return conversation
+
+
+class TestSummary:
+    def test_add_message(self, agent, client_user, conversation):
+        inbox.add_message(conversation, client_user, "Is it still available?")
+        reply = inbox.add_message(conversation, agent, "Yes! " + "x" * 200)
+
+        assert summary(conversation) == {
+            "last_message": reply.pk,
+            "last_message_at": reply.created_at,
+            "last_message_preview": reply.content[:inbox.PREVIEW_LENGTH],
+            "client_unread_count": 1,
+            "agent_unread_count": 1,
+            "client_last_read_id": 0,
+            "agent_last_read_id": 0,
+        }
+
+    def test_earlier_message_keeps_the_last(self, agent, client_user, conversation):
+        last = inbox.add_message(conversation, client_user, "later")
+        earlier = Message.objects.create(conversation=conversation, sender=agent, content="earlier")
+        Message.objects.filter(pk=earlier.pk).update(created_at=NOW - timedelta(hours=1))
+        earlier.created_at = NOW - timedelta(hours=1)
+
+        inbox.message_added(earlier)
+
+        assert summary(conversation)["last_message"] == last.pk
+        assert summary(conversation)["client_unread_count"] == 1
+
+    def test_mark_read(self, agent, client_user, busy):
+        last = Message.objects.get(content="5m ago")
+
+        assert inbox.mark_read(busy, agent) == (last.pk, 0)
+
+        assert summary(busy)["agent_last_read_id"] == last.pk
+        assert summary(busy)["client_unread_count"] == 1
+        # The messages themselves are left alone
+        assert busy.messages.filter(is_read=False).count() == 3
+
+    def test_mark_read_up_to(self, agent, client_user, busy):
+        middle = Message.objects.get(content="20m ago")
+
+        assert inbox.mark_read(busy, agent, middle.pk) == (middle.pk, 1)
+        # The cursor never moves back
+        assert inbox.mark_read(busy, agent, middle.pk - 1) == (middle.pk, 1)
+
+    def test_mark_read_only_own_messages(self, agent, busy, conversation):
+        elsewhere = inbox.add_message(conversation, conversation.client, "Elsewhere")
+
+        for up_to in (0, -1, elsewhere.pk, 10**15, 10**20):
+            with pytest.raises(ValueError):
+                inbox.mark_read(busy, agent, up_to)
+
+        assert summary(busy)["agent_last_read_id"] == 0
+
+    def test_mark_read_outsider(self, busy, client_user_factory):
+        assert inbox.mark_read(busy, client_user_factory()) is None
+
+    def test_mark_replied(self, agent, client_user, busy):
+        reply = inbox.add_message(busy, agent, "On my way")
+        later = inbox.add_message(busy, client_user, "Thanks")
+
+        inbox.mark_replied([reply])
+
+        # Messages after the reply stay unread
+        assert summary(busy)["agent_last_read_id"] == reply.pk
+        assert summary(busy)["agent_unread_count"] == 1
+        assert summary(busy)["client_last_read_id"] == 0
+        inbox.mark_replied([later])
+        assert summary(busy)["client_unread_count"] == 0
+
+    def test_new_message_after_cursor(self, agent, client_user, busy):
+        inbox.mark_read(busy, agent)
+        inbox.add_message(busy, client_user, "Still there?")
+
+        assert summary(busy)["agent_unread_count"] == 1
+
+    def test_summarize_matches_incremental(self, busy, conversation):
+        expected = {c.pk: summary(c) for c in (busy, conversation)}
+        Conversation.objects.update(
+            last_message=None, last_message_preview="", client_unread_count=7, agent_unread_count=7
+        )
+
+        assert inbox.summarize() == 2
+
+        assert {c.pk: summary(c) for c in (busy, conversation)} == expected
+
+    def test_save_leaves_summary_alone(self, agent, client_user, conversation):
+        stale = Conversation.objects.get(pk=conversation.pk)
+        inbox.add_message(conversation, client_user, "Hello")
+
+        stale.is_active = False
+        stale.save()
+
+        assert summary(conversation)["agent_unread_count"] == 1
+
+    def test_repair_command(self, agent, busy):
+        inbox.mark_read(busy, agent, Message.objects.get(content="20m ago").pk)
+        expected = summary(busy)
+        Conversation.objects.update(agent_unread_count=0, last_message=None)
+
+        call_command("repair_conversations", "--batch-size", "1")
+
+        assert summary(busy) == expected
+
+
+class TestMessageEndpoints:
+    def test_send(self, agent_client, agent, client_user, busy):
+        url = reverse("message-list", kwargs={"pk": busy.pk})
+
+        response = agent_client.post(url, {"content": "On my way"}, format="json")
+
+        assert response.status_code == 201
+        # Replying reads the conversation for the sender only
+        assert summary(busy)["agent_unread_count"] == 0
+        assert summary(busy)["agent_last_read_id"] == response.data["id"]
+        assert summary(busy)["client_unread_count"] == 2
+        assert summary(busy)["last_message"] == response.data["id"]
+
+    def test_send_outsider(self, api_client, busy, client_user_factory):
+        api_client.force_authenticate(user=client_user_factory())
+        url = reverse("message-list", kwargs={"pk": busy.pk})
+
+        assert api_client.post(url, {"content": "Hi"}, format="json").status_code == 403
+
+    def test_read(self, agent_client, agent, busy, django_assert_num_queries):
+        middle = Message.objects.get(content="20m ago")
+        url = reverse("conversation-read", kwargs={"pk": busy.pk})
+
+        response = agent_client.post(url, {"message_id": middle.pk}, format="json")
+
+        assert response.data == {"last_read_id": middle.pk, "unread_count": 1}
+        # The conversation, then in a savepoint the cursor, the count and the result
+        with django_assert_num_queries(6):
+            response = agent_client.post(url)
+        assert response.data["unread_count"] == 0
+
+        history = agent_client.get(reverse("message-list", kwargs={"pk": busy.pk}))
+        assert {m["content"]: m["is_read"] for m in history.data["results"]} == {
+            "30m ago": True, "20m ago": True, "10m ago": False, "5m ago": True,
+        }
+
+    def test_read_invalid(self, agent_client, busy):
+        url = reverse("conversation-read", kwargs={"pk": busy.pk})
+
+        assert agent_client.post(url, {"message_id": "x"}, format="json").status_code == 400
+        assert agent_client.post(url, {"message_id": 10**20}, format="json").status_code == 400
+
+    def test_create(self, api_client, client_user, conversation):
+        api_client.force_authenticate(user=client_user)
+
+        response = api_client.post(
+            reverse("message-create"),
+            {"conversation": conversation.pk, "content": "Hi"},
+            format="json",
+        )
+
+        assert response.status_code == 201
+        assert summary(conversation)["agent_unread_count"] == 1
+        assert summary(conversation)["client_last_read_id"] == response.data["id"]
+
+    def test_delete_resummarizes(self, api_client, client_user, busy):
+        api_client.force_authenticate(user=client_user)
+        last = Message.objects.get(content="5m ago")
+
+        response = api_client.delete(
+            reverse("message-delete", kwargs={"conversation_id": busy.pk, "pk": last.pk})
+        )
+
+        assert response.status_code == 204
+        assert summary(busy)["last_message_preview"] == "10m ago"
+        assert summary(busy)["agent_unread_count"] == 1
+
+
+def test_inbox_serializer(agent, client_user, busy):
+    busy_row, = serialize(Conversation.objects.for_inbox(), agent)
+
+    assert busy_row["last_message"]["content"] == "5m ago"
+    assert busy_row["last_message"]["sender_type"] == "client"
+    assert busy_row["last_message_preview"] == "5m ago"
+    assert busy_row["unread_count"] == 2
+    assert busy_row["lead_details"]["inquiries_count"] == 2
+    assert serialize(Conversation.objects.all(), agent) == [busy_row]
+    assert serialize(Conversation.objects.for_inbox(), client_user)[0]["unread_count"] == 1
+
+
+class TestInboxQueries:
+    @pytest.fixture
+    def conversations(self, agent, client_user, lead_factory):
+        """200 conversations of ``agent``, each with a lead and two messages."""
+        template = lead_factory(agent=agent)
+        leads = Lead.objects.bulk_create(
+            Lead(
+                first_name="Lead", last_name=str(i), email=f"lead{i}@test.com",
+                phone=template.phone, property=template.property, agent=agent,
+            )
+            for i in range(200)
+        )
+        conversations = Conversation.objects.bulk_create(
+            Conversation(client=client_user, agent=agent, lead=lead) for lead in leads
+        )
+        Message.objects.bulk_create(
+            Message(conversation=conversation, sender=sender, content="Hello")
+            for conversation in conversations
+            for sender in (client_user, agent)
+        )
+        LeadInteraction.objects.bulk_create(
+            LeadInteraction(lead=lead, interaction_type="inquiry") for lead in leads
+        )
+        inbox.summarize()
+        return conversations
+
+    def test_serializer(self, agent, conversations, django_assert_num_queries):
+        # The conversations with their last messages, then the leads
+        with django_assert_num_queries(2):
+            data = serialize(Conversation.objects.for_inbox(), agent)
+
+        assert len(data) == 200
+        assert all(row["unread_count"] == 1 for row in data)
+        assert all(row["last_message"]["content"] == "Hello" for row in data)
+        assert all(row["lead_details"]["inquiries_count"] == 1 for row in data)
+
+    def test_list_endpoint(self, agent_client, conversations, django_assert_num_queries):
+        # The page count, the page and its leads
+        with django_assert_num_queries(3):
+            response = agent_client.get(reverse("conversation-list"))
+
+        assert response.status_code == 200
+        assert response.data["count"] == 200
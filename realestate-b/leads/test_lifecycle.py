@@ -0,0 +1,215 @@
+"""
+Tests for the lead lifecycle service (leads.lifecycle).
+"""
+import pytest
+from django.db import transaction
+from django.urls import reverse
+from rest_framework import status
+
+from leads import lifecycle
+from leads.models import Conversation, Lead, LeadActivity, LeadStatusLog
+
+pytestmark = [pytest.mark.integration]
+
+
+class TestLeadCreated:
+    def test_assigns_property_agent_and_opens_conversation(
+        self, property_factory, client_user_factory, django_capture_on_commit_callbacks
+    ):
+        prop = property_factory()
+        user = client_user_factory()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            lead = Lead.objects.create(email="buyer@test.com", user=user, property=prop)
+
+        lead.refresh_from_db()
+        assert lead.agent == prop.agent
+        conversation = Conversation.objects.get(client=user, property=prop)
+        assert conversation.lead == lead
+
+    def test_falls_back_to_least_busy_agent(
+        self, agent_user_factory, lead_factory, django_capture_on_commit_callbacks
+    ):
+        busy = agent_user_factory()
+        lead_factory(agent=busy)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            lead = Lead.objects.create(email="guest@test.com")
+
+        lead.refresh_from_db()
+        assert lead.agent is not None
+        assert lead.agent != busy
+
+    def test_adds_status_bonus(self, agent_user_factory, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            lead = Lead.objects.create(
+                email="hot@test.com", agent=agent_user_factory(), status="qualified"
+            )
+
+        lead.refresh_from_db()
+        assert lead.score == 50
+        assert not LeadStatusLog.objects.filter(lead=lead).exists()
+
+
+class TestStatusChanges:
+    def test_saving_reads_no_previous_state(
+        self, lead_factory, django_assert_num_queries, django_capture_on_commit_callbacks
+    ):
+        lead = Lead.objects.get(pk=lead_factory().pk)
+        lead.notes = "Call back on Monday"
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            with django_assert_num_queries(1):
+                lead.save()
+
+        with django_assert_num_queries(0):
+            for callback in callbacks:
+                callback()
+
+    def test_logs_once_per_transaction(
+        self, lead_factory, agent_user_factory, django_capture_on_commit_callbacks
+    ):
+        manager = agent_user_factory()
+        lead = Lead.objects.get(pk=lead_factory(status="new").pk)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            with transaction.atomic():
+                lead._changed_by = manager
+                lead.status = "contacted"
+                lead.save()
+                lead.status = "qualified"
+                lead.save()
+
+        log = LeadStatusLog.objects.get(lead=lead)
+        assert (log.from_status, log.to_status, log.changed_by) == ("new", "qualified", manager)
+        activity = LeadActivity.objects.get(lead=lead, activity_type="status_change")
+        assert activity.agent == manager
+        lead.refresh_from_db()
+        assert lead.score == 50
+
+    def test_round_trip_within_transaction_is_not_logged(
+        self, lead_factory, django_capture_on_commit_callbacks
+    ):
+        lead = Lead.objects.get(pk=lead_factory(status="new").pk)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            lead.status = "negotiation"
+            lead.save()
+            lead.status = "new"
+            lead.save()
+
+        assert not LeadStatusLog.objects.filter(lead=lead).exists()
+        lead.refresh_from_db()
+        assert lead.score == 0
+
+    def test_consecutive_transactions_log_each_move(
+        self, lead_factory, django_capture_on_commit_callbacks
+    ):
+        lead = Lead.objects.get(pk=lead_factory(status="new").pk)
+
+        for next_status in ("qualified", "proposal"):
+            with django_capture_on_commit_callbacks(execute=True):
+                lead.status = next_status
+                lead.save()
+
+        moves = list(
+            LeadStatusLog.objects.filter(lead=lead)
+            .order_by("created_at", "id")
+            .values_list("from_status", "to_status")
+        )
+        assert moves == [("new", "qualified"), ("qualified", "proposal")]
+        lead.refresh_from_db()
+        assert lead.score == 100
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRolledBackTransactions:
+    def test_rolled_back_work_is_dropped(self, lead_factory):
+        lead = Lead.objects.get(pk=lead_factory(status="new").pk)
+
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                lead.status = "qualified"
+                lead.save()
+                raise RuntimeError
+
+        lead = Lead.objects.get(pk=lead.pk)
+        assert not LeadStatusLog.objects.filter(lead=lead).exists()
+
+        with transaction.atomic():
+            lead.status = "contacted"
+            lead.save()
+
+        log = LeadStatusLog.objects.get(lead=lead)
+        assert (log.from_status, log.to_status) == ("new", "contacted")
+
+    def test_reused_atomic_starts_afresh(self, lead_factory):
+        rolled_back = Lead.objects.get(pk=lead_factory(status="new").pk)
+        committed = Lead.objects.get(pk=lead_factory(status="new").pk)
+        atomic = transaction.atomic()
+
+        with pytest.raises(RuntimeError):
+            with atomic:
+                rolled_back.status = "qualified"
+                rolled_back.save()
+                raise RuntimeError
+        with atomic:
+            committed.status = "contacted"
+            committed.save()
+
+        assert list(LeadStatusLog.objects.values_list("lead", "to_status")) == [
+            (committed.pk, "contacted")
+        ]
+
+    def test_failed_follow_up_is_logged(self, lead_factory, monkeypatch, caplog):
+        lead = Lead.objects.get(pk=lead_factory(status="new").pk)
+
+        def fail(change):
+            raise RuntimeError("notification service down")
+
+        monkeypatch.setattr(lifecycle, "_on_status_change", fail)
+
+        with transaction.atomic():
+            lead.status = "qualified"
+            lead.save()
+
+        assert Lead.objects.get(pk=lead.pk).status == "qualified"
+        assert f"Follow-up work for lead {lead.pk} failed" in caplog.text
+
+
+class TestLeadEndpoints:
+    def test_create_query_count(
+        self, management_client, property_factory, django_assert_max_num_queries,
+        django_capture_on_commit_callbacks,
+    ):
+        prop = property_factory()
+
+        # Property and its agent, the insert and the agent's workload counter
+        with django_assert_max_num_queries(4):
+            with django_capture_on_commit_callbacks(execute=True):
+                response = management_client.post(
+                    reverse("lead-list"),
+                    {"first_name": "Ann", "email": "ann@test.com", "property": prop.pk},
+                    format="json",
+                )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Lead.objects.get().agent == prop.agent
+
+    def test_status_update_is_logged(
+        self, agent_client, lead_factory, django_capture_on_commit_callbacks
+    ):
+        lead = lead_factory(agent=agent_client.user, status="new")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = agent_client.patch(
+                reverse("lead-status-update", args=[lead.pk]),
+                {"status": "contacted"},
+                format="json",
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        log = LeadStatusLog.objects.get(lead=lead)
+        assert (log.from_status, log.to_status, log.changed_by) == (
+            "new", "contacted", agent_client.user
+        )
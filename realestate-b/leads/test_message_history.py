@@ -0,0 +1,103 @@
+"""
+Tests for the paginated message history (leads.pagination).
+"""
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from leads.models import Conversation, Message
+
+pytestmark = [pytest.mark.integration]
+
+NOW = timezone.now()
+
+
+@pytest.fixture
+def conversation(agent_client, client_user_factory):
+    return Conversation.objects.create(agent=agent_client.user, client=client_user_factory())
+
+
+@pytest.fixture
+def messages(conversation):
+    """Ten messages a minute apart, oldest first; the middle two share a timestamp."""
+    messages = Message.objects.bulk_create(
+        Message(conversation=conversation, sender=conversation.client, content=str(i))
+        for i in range(10)
+    )
+    for message, minutes_ago in zip(messages, (10, 9, 8, 7, 5, 5, 4, 3, 2, 1)):
+        message.created_at = NOW - timedelta(minutes=minutes_ago)
+    Message.objects.bulk_update(messages, ["created_at"])
+    return messages
+
+
+@pytest.fixture
+def url(conversation):
+    return reverse("message-list", kwargs={"pk": conversation.pk})
+
+
+def ids(response):
+    return [message["id"] for message in response.data["results"]]
+
+
+def test_latest_page(agent_client, messages, url):
+    response = agent_client.get(url, {"limit": 3})
+
+    assert response.status_code == 200
+    assert ids(response) == [m.pk for m in messages[7:]]
+    assert response.data["next"] is None
+    assert f"before={messages[7].pk}" in response.data["previous"]
+
+
+def test_scroll_back(agent_client, messages, url):
+    seen = []
+    link = agent_client.get(url, {"limit": 3}).data["previous"]
+    while link:
+        response = agent_client.get(link)
+        seen = ids(response) + seen
+        link = response.data["previous"]
+
+    assert seen == [m.pk for m in messages[:7]]
+
+
+def test_after(agent_client, messages, url):
+    response = agent_client.get(url, {"after": messages[3].pk, "limit": 4})
+
+    assert ids(response) == [m.pk for m in messages[4:8]]
+    assert f"after={messages[7].pk}" in response.data["next"]
+    assert f"before={messages[4].pk}" in response.data["previous"]
+
+    response = agent_client.get(response.data["next"])
+
+    assert ids(response) == [m.pk for m in messages[8:]]
+    assert response.data["next"] is None
+
+
+def test_before(agent_client, messages, url):
+    response = agent_client.get(url, {"before": messages[5].pk, "limit": 2})
+
+    assert ids(response) == [messages[3].pk, messages[4].pk]
+    assert f"after={messages[4].pk}" in response.data["next"]
+
+
+def test_invalid_anchors(agent_client, messages, url, conversation_factory, message_factory):
+    other = message_factory(conversation=conversation_factory())
+
+    assert agent_client.get(url, {"after": other.pk}).status_code == 404
+    assert agent_client.get(url, {"before": "x"}).status_code == 404
+    assert agent_client.get(url, {"before": 1, "after": 2}).status_code == 400
+
+
+def test_participants_only(messages, url, client_user_factory):
+    outsider = APIClient()
+    outsider.force_authenticate(user=client_user_factory())
+
+    assert outsider.get(url).status_code == 403
+
+
+def test_query_count(agent_client, messages, url, django_assert_num_queries):
+    # The conversation, the anchor and the page
+    with django_assert_num_queries(3):
+        agent_client.get(url, {"before": messages[9].pk})
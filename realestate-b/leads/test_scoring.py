@@ -0,0 +1,164 @@
+"""
+Tests for incremental lead scoring (leads.scoring).
+"""
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from leads.models import Lead, LeadActivity, LeadInteraction, WhatsAppMessage
+from leads.scoring import delete_rows, rescore
+
+pytestmark = [pytest.mark.integration]
+
+
+def _add_rows(lead, interactions=0, messages=0, viewings=0):
+    for _ in range(interactions):
+        LeadInteraction.objects.create(lead=lead, interaction_type="page_view")
+    for i in range(messages):
+        WhatsAppMessage.objects.create(
+            lead=lead,
+            message_id=f"wa-{lead.pk}-{i}",
+            direction="inbound",
+            message_text="Hi",
+            timestamp=timezone.now(),
+        )
+    for _ in range(viewings):
+        LeadActivity.objects.create(
+            lead=lead,
+            activity_type="property_viewing",
+            description="Viewed",
+            agent=lead.agent,
+        )
+
+
+class TestScoringCounters:
+    def test_counters_and_score_follow_inserts(self, lead_factory):
+        lead = lead_factory()
+
+        _add_rows(lead, interactions=2, messages=1, viewings=1)
+
+        lead.refresh_from_db()
+        assert (lead.interaction_count, lead.whatsapp_message_count, lead.viewing_count) == (2, 1, 1)
+        assert lead.score == 2 * 5 + 10 + 15
+
+    def test_counters_follow_deletes(self, lead_factory):
+        lead = lead_factory()
+        _add_rows(lead, interactions=2, viewings=1)
+
+        LeadInteraction.objects.filter(lead=lead).first().delete()
+        LeadActivity.objects.get(lead=lead).delete()
+
+        lead.refresh_from_db()
+        assert (lead.interaction_count, lead.viewing_count, lead.score) == (1, 0, 5)
+
+    def test_queryset_delete_through_delete_rows(self, lead_factory):
+        lead = lead_factory()
+        _add_rows(lead, interactions=3, viewings=2)
+        LeadActivity.objects.create(
+            lead=lead, activity_type="call", description="Called", agent=lead.agent
+        )
+
+        first_two = list(LeadInteraction.objects.filter(lead=lead).values_list("pk", flat=True)[:2])
+        delete_rows(LeadInteraction.objects.filter(pk__in=first_two))
+        delete_rows(LeadActivity.objects.filter(lead=lead))
+
+        lead.refresh_from_db()
+        assert (lead.interaction_count, lead.viewing_count, lead.score) == (1, 0, 5)
+
+    def test_deleting_agent_uncounts_their_viewings(self, lead_factory, agent_user_factory):
+        lead = lead_factory()
+        _add_rows(lead, interactions=1, viewings=1)
+        other = agent_user_factory()
+        LeadActivity.objects.create(
+            lead=lead, activity_type="property_viewing", description="Viewed", agent=other
+        )
+
+        other.delete()
+
+        lead.refresh_from_db()
+        assert (lead.viewing_count, lead.score) == (1, 5 + 15)
+
+    def test_lead_delete_cascades_in_bulk(self, lead_factory, django_assert_max_num_queries):
+        lead = lead_factory()
+        _add_rows(lead, interactions=5, messages=5, viewings=5)
+
+        with django_assert_max_num_queries(30) as captured:
+            lead.delete()
+
+        sql = [q["sql"] for q in captured.captured_queries]
+        # Children go in one DELETE each, without being loaded or uncounted
+        assert not any(q.startswith('UPDATE "leads_lead"') for q in sql)
+        assert not any('FROM "leads_leadinteraction"' in q and q.startswith("SELECT") for q in sql)
+        assert not LeadInteraction.objects.exists()
+
+    def test_other_activity_types_do_not_score(self, lead_factory):
+        lead = lead_factory()
+        LeadActivity.objects.create(
+            lead=lead, activity_type="call", description="Called", agent=lead.agent
+        )
+
+        lead.refresh_from_db()
+        assert lead.score == 0
+
+    def test_stale_instance_save_keeps_counters(self, lead_factory):
+        lead = lead_factory()
+        _add_rows(lead, interactions=3)
+
+        lead.notes = "Prefers evenings"
+        lead.save()
+
+        lead.refresh_from_db()
+        assert (lead.interaction_count, lead.score) == (3, 15)
+        assert lead.notes == "Prefers evenings"
+
+    def test_update_score_applies_status_bonus_without_counting(
+        self, lead_factory, django_assert_max_num_queries
+    ):
+        lead = lead_factory()
+        _add_rows(lead, interactions=1, messages=1)
+        lead.status = "negotiation"
+        lead.save()
+
+        with django_assert_max_num_queries(2) as captured:
+            lead.update_score()
+
+        assert not any("COUNT(" in q["sql"] for q in captured.captured_queries)
+        assert lead.score == 5 + 10 + 200
+        lead.refresh_from_db()
+        assert lead.score == 215
+
+
+class TestRescore:
+    def test_rebuilds_counters_and_scores(self, lead_factory):
+        first = lead_factory(status="qualified")
+        second = lead_factory()
+        _add_rows(first, interactions=1, viewings=2)
+        _add_rows(second, messages=3)
+        Lead.objects.update(
+            interaction_count=0, whatsapp_message_count=0, viewing_count=0, score=0
+        )
+
+        assert rescore() == 2
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.interaction_count, first.viewing_count, first.score) == (1, 2, 5 + 30 + 50)
+        assert (second.whatsapp_message_count, second.score) == (3, 30)
+
+    def test_runs_in_constant_queries(self, lead_factory, django_assert_num_queries):
+        for _ in range(5):
+            _add_rows(lead_factory(), interactions=1)
+
+        with django_assert_num_queries(2):
+            rescore()
+
+    def test_management_command(self, lead_factory, capsys):
+        lead = lead_factory()
+        _add_rows(lead, viewings=1)
+        Lead.objects.update(viewing_count=0, score=0)
+
+        call_command("rescore_leads")
+
+        lead.refresh_from_db()
+        assert lead.score == 15
+        assert "Rescored 1 leads." in capsys.readouterr().out
@@ -0,0 +1,117 @@
+"""
+Tests for the CRM stats endpoint and its cached lead figures (leads.stats).
+"""
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from leads.models import Lead, Task
+from leads.stats import lead_stats
+
+pytestmark = [pytest.mark.integration]
+
+RESPONSE_KEYS = [
+    "total_leads",
+    "new_leads",
+    "contacted",
+    "viewing",
+    "qualified_leads",
+    "proposal",
+    "negotiation",
+    "closed_won",
+    "closed_lost",
+    "avg_score",
+    "hot_leads",
+    "overdue_tasks",
+    "status_distribution",
+    "recent_tasks",
+]
+
+
+@pytest.fixture
+def agent_leads(agent_client, lead_factory):
+    agent = agent_client.user
+    for lead_status, score in (("new", 10), ("new", 60), ("qualified", 0), ("closed_won", 0)):
+        lead = lead_factory(agent=agent, status=lead_status)
+        Lead.objects.filter(pk=lead.pk).update(score=score)
+    lead_factory(status="contacted")  # another agent's lead
+    Task.objects.create(
+        agent=agent,
+        lead=lead,
+        title="Call back",
+        due_date=timezone.now() - timedelta(days=1),
+    )
+    return agent
+
+
+class TestCRMStats:
+    def test_response_shape_and_figures(self, agent_client, agent_leads):
+        response = agent_client.get(reverse("crm-stats"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert list(response.data) == RESPONSE_KEYS
+        assert response.data["total_leads"] == 4
+        assert response.data["new_leads"] == 2
+        assert response.data["qualified_leads"] == 1
+        assert response.data["closed_won"] == 1
+        assert response.data["contacted"] == 0
+        assert response.data["avg_score"] == 17.5
+        assert response.data["hot_leads"] == 1
+        assert response.data["overdue_tasks"] == 1
+        assert len(response.data["recent_tasks"]) == 1
+        assert sorted(
+            (row["status"], row["count"]) for row in response.data["status_distribution"]
+        ) == [("closed_won", 1), ("new", 2), ("qualified", 1)]
+
+    def test_platform_wide_figures(self, agent_leads):
+        stats = lead_stats()
+
+        assert stats["total_leads"] == 5
+        assert stats["contacted"] == 1
+
+    def test_query_count(self, agent_client, agent_leads, django_assert_max_num_queries):
+        # Lead aggregate, overdue task count, recent tasks
+        with django_assert_max_num_queries(3):
+            agent_client.get(reverse("crm-stats"))
+
+        # The lead aggregate is cached
+        with django_assert_max_num_queries(2):
+            agent_client.get(reverse("crm-stats"))
+
+    def test_lead_changes_drop_the_cache(self, agent_client, agent_leads, lead_factory):
+        url = reverse("crm-stats")
+        assert agent_client.get(url).data["total_leads"] == 4
+
+        lead = lead_factory(agent=agent_leads, status="proposal")
+        assert agent_client.get(url).data["proposal"] == 1
+
+        lead = Lead.objects.get(pk=lead.pk)
+        lead.status = "negotiation"
+        lead.save()
+        data = agent_client.get(url).data
+        assert (data["proposal"], data["negotiation"]) == (0, 1)
+
+        lead.delete()
+        assert agent_client.get(url).data["total_leads"] == 4
+
+    def test_reassigned_lead_leaves_previous_agent(
+        self, agent_client, agent_leads, agent_user_factory
+    ):
+        url = reverse("crm-stats")
+        assert agent_client.get(url).data["total_leads"] == 4
+
+        lead = Lead.objects.filter(agent=agent_leads).first()
+        lead.agent = agent_user_factory()
+        lead.save()
+        assert agent_client.get(url).data["total_leads"] == 3
+
+    def test_cache_can_be_disabled(self, agent_client, agent_leads, settings, django_assert_max_num_queries):
+        settings.CRM_STATS_CACHE_TTL = 0
+        agent_client.get(reverse("crm-stats"))
+
+        with django_assert_max_num_queries(3) as queries:
+            agent_client.get(reverse("crm-stats"))
+        assert len(queries) == 3
@@ -56,6 +56,11 @@ urlpatterns = [
         views.MessageListView.as_view(),
         name="message-list"
     ),
+    path(
+        "conversations/<int:pk>/read/",
+        views.ConversationReadView.as_view(),
+        name="conversation-read"
+    ),
     path(
         "conversations/<int:conversation_id>/messages/<int:pk>/delete/",
         views.MessageDeleteView.as_view(),
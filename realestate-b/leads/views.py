@@ -2,7 +2,8 @@ from rest_framework import generics, permissions, status, views
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Avg, Q
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 import logging
 
@@ -17,6 +18,10 @@ from .models import (
     Conversation,
     Message,
 )
+from . import inbox
+from .lifecycle import pick_agent
+from .pagination import MessageHistoryPagination
+from .stats import lead_stats
 from .serializers import (
     LeadListSerializer,
     LeadDetailSerializer,
@@ -105,28 +110,11 @@ class LeadListView(generics.ListCreateAPIView):
         Auto-assign to property's agent first, then least-busy agent.
         Logs creation for debugging.
         """
-        from django.contrib.auth import get_user_model
-
-        User = get_user_model()
-
         try:
-            agent = serializer.validated_data.get("agent")
-            prop = serializer.validated_data.get("property")
-
-            if not agent:
-                if prop and hasattr(prop, "agent") and prop.agent:
-                    agent = getattr(prop.agent, "user", prop.agent)
-                else:
-                    least_busy = (
-                        User.objects.filter(user_type="agent")
-                        .annotate(lead_count=Count("assigned_leads"))
-                        .order_by("lead_count")
-                        .first()
-                    )
-                    agent = least_busy
-
+            agent = serializer.validated_data.get("agent") or pick_agent(
+                serializer.validated_data.get("property")
+            )
             lead = serializer.save(agent=agent)
-            lead.update_score()
 
             logger.info(
                 f"Lead created: {lead.id} - {lead.first_name} {lead.last_name} ({lead.source})"
@@ -189,8 +177,7 @@ class LeadDetailView(generics.RetrieveUpdateAPIView):
     def perform_update(self, serializer):
         # Attach who made the change for the status log signal
         serializer.instance._changed_by = self.request.user
-        lead = serializer.save()
-        lead.update_score()
+        serializer.save()
 
 
 class LeadStatusUpdateView(generics.UpdateAPIView):
@@ -225,7 +212,6 @@ class LeadActivityView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         lead = get_object_or_404(Lead, pk=self.kwargs["pk"])
         serializer.save(agent=self.request.user, lead=lead)
-        lead.update_score()
         # Mark lead as contacted when agent logs a call or message
         if serializer.validated_data.get("activity_type") in (
             "call",
@@ -245,7 +231,6 @@ class LeadInteractionListView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         lead = get_object_or_404(Lead, pk=self.kwargs["pk"])
         serializer.save(lead=lead)
-        lead.update_score()
 
 
 class LeadStatusLogView(generics.ListAPIView):
@@ -278,11 +263,7 @@ class CRMStatsView(views.APIView):
 
     def get(self, request):
         user = request.user
-        qs = (
-            Lead.objects.filter(agent=user)
-            if user.user_type == "agent"
-            else Lead.objects.all()
-        )
+        lead_figures = lead_stats(user.pk if user.user_type == "agent" else None)
 
         overdue_tasks = Task.objects.filter(
             agent=user,
@@ -291,25 +272,13 @@ class CRMStatsView(views.APIView):
         ).count()
 
         stats = {
-            "total_leads": qs.count(),
-            "new_leads": qs.filter(status="new").count(),
-            "contacted": qs.filter(status="contacted").count(),
-            "viewing": qs.filter(status="viewing").count(),
-            "qualified_leads": qs.filter(status="qualified").count(),
-            "proposal": qs.filter(status="proposal").count(),
-            "negotiation": qs.filter(status="negotiation").count(),
-            "closed_won": qs.filter(status="closed_won").count(),
-            "closed_lost": qs.filter(status="closed_lost").count(),
-            "avg_score": round(qs.aggregate(Avg("score"))["score__avg"] or 0, 1),
-            "hot_leads": qs.filter(score__gte=50).count(),
+            **{key: value for key, value in lead_figures.items() if key != "status_distribution"},
             "overdue_tasks": overdue_tasks,
-            "status_distribution": list(
-                qs.values("status").annotate(count=Count("id"))
-            ),
+            "status_distribution": lead_figures["status_distribution"],
             "recent_tasks": TaskSerializer(
-                Task.objects.filter(agent=user, is_completed=False).order_by(
-                    "due_date"
-                )[:5],
+                Task.objects.filter(agent=user, is_completed=False)
+                .select_related("agent")
+                .order_by("due_date")[:5],
                 many=True,
             ).data,
         }
@@ -350,9 +319,7 @@ class ConversationListView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return Conversation.objects.filter(
-            Q(client=user) | Q(agent=user)
-        ).select_related("property", "client", "agent", "lead")
+        return Conversation.objects.filter(Q(client=user) | Q(agent=user)).for_inbox()
 
     def create(self, request, *args, **kwargs):
         property_id = request.data.get("property")
@@ -443,14 +410,15 @@ class ConversationByAgentView(generics.CreateAPIView):
                 ).exists()
 
                 if not existing_auto:
-                    Message.objects.create(
-                        conversation=existing,
-                        sender=client,
-                        content=auto_message,
+                    inbox.add_message(
+                        existing,
+                        client,
+                        auto_message,
                         is_auto=True,  # Mark as auto-generated message
                     )
 
-            serializer = self.get_serializer(existing)
+            # Re-read with the summary the auto-message updated
+            serializer = self.get_serializer(Conversation.objects.for_inbox().get(pk=existing.pk))
             return Response(serializer.data)
 
         # Create new conversation
@@ -469,14 +437,9 @@ class ConversationByAgentView(generics.CreateAPIView):
                 auto_message += f" at {property_location}"
             auto_message += ". I look forward to hearing from you!"
 
-            Message.objects.create(
-                conversation=conversation,
-                sender=client,
-                content=auto_message,
-                is_auto=True,
-            )
+            inbox.add_message(conversation, client, auto_message, is_auto=True)
 
-        serializer = self.get_serializer(conversation)
+        serializer = self.get_serializer(Conversation.objects.for_inbox().get(pk=conversation.pk))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def get_serializer_context(self):
@@ -491,7 +454,7 @@ class ConversationDetailView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return Conversation.objects.filter(Q(client=user) | Q(agent=user))
+        return Conversation.objects.filter(Q(client=user) | Q(agent=user)).for_inbox()
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -514,29 +477,67 @@ class ConversationDeleteView(generics.DestroyAPIView):
 class MessageListView(generics.ListCreateAPIView):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MessageHistoryPagination
 
-    def get_queryset(self):
-        return Message.objects.filter(conversation_id=self.kwargs["pk"])
+    def get_conversation(self):
+        if not hasattr(self, "_conversation"):
+            conversation = get_object_or_404(Conversation, pk=self.kwargs["pk"])
+            # FIX: verify the user belongs to this conversation
+            if self.request.user.pk not in (conversation.client_id, conversation.agent_id):
+                raise PermissionDenied("You are not part of this conversation.")
+            self._conversation = conversation
+        return self._conversation
 
-    def perform_create(self, serializer):
-        conversation = get_object_or_404(Conversation, pk=self.kwargs["pk"])
+    def get_queryset(self):
+        return Message.objects.filter(conversation=self.get_conversation()).select_related(
+            "sender"
+        )
 
-        # FIX: verify the user belongs to this conversation before allowing message
-        if self.request.user not in (conversation.client, conversation.agent):
-            raise PermissionDenied("You are not part of this conversation.")
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["conversation"] = self.get_conversation()
+        return context
 
-        # Mark incoming messages as read
-        Message.objects.filter(conversation=conversation, is_read=False).exclude(
-            sender=self.request.user
-        ).update(is_read=True)
+    def perform_create(self, serializer):
+        conversation = self.get_conversation()
 
-        serializer.save(sender=self.request.user, conversation=conversation)
+        with transaction.atomic():
+            message = serializer.save(sender=self.request.user, conversation=conversation)
+            inbox.message_added(message)
+            # Replying reads the conversation; ConversationReadView reads without replying
+            inbox.mark_replied([message])
 
         # Update lead last_contacted if agent is sending
         if self.request.user == conversation.agent and conversation.lead:
             conversation.lead.mark_contacted()
 
 
+class ConversationReadView(views.APIView):
+    """
+    Move the user's read cursor to ``message_id`` (default: the last
+    message), and return it with what is still unread.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        user = request.user
+        conversation = get_object_or_404(
+            Conversation.objects.filter(Q(client=user) | Q(agent=user)), pk=pk
+        )
+        up_to = request.data.get("message_id")
+        if up_to is not None:
+            try:
+                up_to = int(up_to)
+            except (TypeError, ValueError):
+                raise ValidationError({"message_id": "A message id is required."})
+        try:
+            last_read_id, unread_count = inbox.mark_read(conversation, user, up_to)
+        except ValueError:
+            raise ValidationError({"message_id": "Not a message in this conversation."})
+        return Response({"last_read_id": last_read_id, "unread_count": unread_count})
+
+
 class MessageCreateView(generics.CreateAPIView):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -548,7 +549,10 @@ class MessageCreateView(generics.CreateAPIView):
         if self.request.user not in (conversation.client, conversation.agent):
             raise PermissionDenied("You are not part of this conversation.")
 
-        serializer.save(sender=self.request.user, conversation=conversation)
+        with transaction.atomic():
+            message = serializer.save(sender=self.request.user, conversation=conversation)
+            inbox.message_added(message)
+            inbox.mark_replied([message])
 
 
 class MessageDeleteView(generics.DestroyAPIView):
@@ -559,3 +563,8 @@ class MessageDeleteView(generics.DestroyAPIView):
             conversation_id=self.kwargs["conversation_id"],
             sender=self.request.user,
         )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            inbox.summarize(Conversation.objects.filter(pk=instance.conversation_id))
@@ -0,0 +1,107 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from properties.models import Location, Property
+from properties.search import get_backend, rebuild_index, search_properties
+
+WORDS = (
+    "spacious modern apartment villa bungalow garden pool balcony view ocean "
+    "gated estate secure parking gym elevator furnished master ensuite kitchen "
+    "borehole solar backup generator quiet serene family compound rooftop "
+    "terrace fibre cctv playground school mall hospital highway access"
+).split()
+
+PLACES = (
+    "Westlands Kilimani Karen Runda Lavington Kileleshwa Kasarani Syokimau "
+    "Ruaka Kitengela Nyali Diani Malindi Nakuru Kisumu Eldoret Thika Limuru"
+).split()
+
+QUERIES = ["apartment", "villa pool", "karen", "ocean view", "solar borehole", "nyal"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks full-text property search against the previous icontains "
+        "search on seeded data. Seeded rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._seed(options["count"])
+            self.stdout.write(f"Backend: {get_backend()}")
+            self.stdout.write(
+                f"{'query':<18}{'matches':>9}{'icontains ms':>15}{'search ms':>12}"
+            )
+            for query in QUERIES:
+                matches, baseline = self._time(self._icontains, query, options["repeat"])
+                _, ranked = self._time(self._ranked, query, options["repeat"])
+                self.stdout.write(
+                    f"{query:<18}{matches:>9}{baseline:>15.1f}{ranked:>12.1f}"
+                )
+            transaction.set_rollback(True)
+
+    def _seed(self, count):
+        rng = random.Random(42)
+        locations = [
+            Location.objects.create(name=name, county="Bench", slug=f"bench-{name.lower()}")
+            for name in PLACES
+        ]
+        started = time.perf_counter()
+        batch = []
+        for i in range(count):
+            batch.append(
+                Property(
+                    title=" ".join(rng.sample(WORDS, 3)).title(),
+                    slug=f"bench-{i}",
+                    description=" ".join(rng.choices(WORDS, k=40)),
+                    price=rng.randint(1, 500) * 100_000,
+                    price_display="",
+                    location=rng.choice(locations),
+                    status="available",
+                    is_verified=True,
+                )
+            )
+            if len(batch) == 5000:
+                Property.objects.bulk_create(batch)
+                batch = []
+        Property.objects.bulk_create(batch)
+        rebuild_index()
+        self.stdout.write(
+            f"Seeded and indexed {count} properties in "
+            f"{time.perf_counter() - started:.1f}s"
+        )
+
+    def _time(self, search, query, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            matches, page = search(query)
+            list(page)
+            timings.append((time.perf_counter() - started) * 1000)
+        return matches, statistics.median(timings)
+
+    def _base(self):
+        return Property.objects.filter(status="available", is_verified=True)
+
+    def _icontains(self, query):
+        queryset = self._base().filter(
+            Q(title__icontains=query)
+            | Q(description__icontains=query)
+            | Q(location__name__icontains=query)
+        ).order_by("-created_at")
+        return queryset.count(), queryset[:12]
+
+    def _ranked(self, query):
+        queryset = search_properties(self._base(), query).order_by(
+            "-search_rank", "-created_at"
+        )
+        return queryset.count(), queryset[:12]
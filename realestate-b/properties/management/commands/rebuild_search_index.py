@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from properties.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index for all properties"
+
+    def handle(self, *args, **options):
+        backend = rebuild_index()
+        if backend == "basic":
+            self.stdout.write(
+                self.style.WARNING("No full-text index on this database; nothing to do.")
+            )
+            return
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {backend} search index."))
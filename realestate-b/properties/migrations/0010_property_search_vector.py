@@ -0,0 +1,109 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:12
+
+import sqlite3
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+# As properties.search at the time of this migration
+FTS_TABLE = "properties_property_fts"
+
+PG_BACKFILL_SQL = """
+    UPDATE properties_property p SET search_vector =
+        setweight(to_tsvector('english', coalesce(p.title, '')), 'A')
+        || setweight(to_tsvector('english', concat_ws(' ',
+            (SELECT concat_ws(' ', l.name, l.county)
+               FROM properties_location l WHERE l.id = p.location_id),
+            p.location_name)), 'B')
+        || setweight(to_tsvector('english', coalesce(p.description, '')), 'C')
+"""
+
+FTS_BACKFILL_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, title, location, description)
+    SELECT p.id,
+           coalesce(p.title, ''),
+           trim(coalesce(l.name, '') || ' ' || coalesce(l.county, '') || ' '
+                || coalesce(p.location_name, '')),
+           coalesce(p.description, '')
+      FROM properties_property p
+      LEFT JOIN properties_location l ON l.id = p.location_id
+"""
+
+
+def _fts5_available():
+    try:
+        probe = sqlite3.connect(":memory:")
+        try:
+            probe.execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+        finally:
+            probe.close()
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the backend-specific search index and backfill it.
+
+    The GIN index is not declared in ``Property.Meta.indexes`` because it is
+    PostgreSQL-only; SQLite gets an FTS5 virtual table instead.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS properties_property_search_gin "
+            "ON properties_property USING gin (search_vector)"
+        )
+        schema_editor.execute(PG_BACKFILL_SQL)
+    elif vendor == "sqlite" and _fts5_available():
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "title, location, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', %s)",
+            ["bm25(10.0, 5.0, 1.0)"],
+        )
+        schema_editor.execute(f"DELETE FROM {FTS_TABLE}")
+        schema_editor.execute(FTS_BACKFILL_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS properties_property_search_gin")
+    elif vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0009_alter_property_agent_alter_property_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='PropertySearchDocument',
+            fields=[
+                ('property', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='properties.property')),
+                ('title', models.TextField()),
+                ('location', models.TextField()),
+                ('description', models.TextField()),
+                ('document', models.TextField(db_column='properties_property_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'properties_property_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
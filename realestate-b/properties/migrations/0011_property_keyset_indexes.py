@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0010_property_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['created_at', 'id'], name='property_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['price', 'id'], name='property_price_id_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 # realestate_backend/properties/models.py
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.text import slugify
+from .search import FTS_TABLE, FullTextMatch
 
 User = get_user_model()
 
@@ -26,6 +28,50 @@ class Location(models.Model):
         return f"{self.name}, {self.county}"
 
 
+class PropertyQuerySet(models.QuerySet):
+    # Columns read by PropertyListSerializer / PropertySearchSerializer
+    # (including AgentCompactSerializer for the nested agent). Keep in sync
+    # with those serializers so listing rows never lazy-load a deferred field.
+    LISTING_FIELDS = (
+        "id",
+        "title",
+        "slug",
+        "property_type",
+        "status",
+        "listing_type",
+        "is_development",
+        "price",
+        "currency",
+        "price_display",
+        "location",
+        "location_name",
+        "latitude",
+        "longitude",
+        "bedrooms",
+        "bathrooms",
+        "square_feet",
+        "main_image",
+        "is_featured",
+        "is_verified",
+        "created_at",
+        "agent",
+        "agent__id",
+        "agent__username",
+        "agent__first_name",
+        "agent__last_name",
+        "agent__email",
+        "agent__phone_number",
+        "agent__profile_picture",
+    )
+
+    def for_listing(self):
+        """
+        Eager-load location and agent and prune columns for listing endpoints,
+        so a page of results costs a fixed number of queries.
+        """
+        return self.select_related("location", "agent").only(*self.LISTING_FIELDS)
+
+
 class Property(models.Model):
     PROPERTY_TYPES = (
         ("townhouse", "Townhouse"),
@@ -143,9 +189,19 @@ class Property(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Full-text document (PostgreSQL only), maintained by properties.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PropertyQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = "Properties"
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination over the public feed orderings
+            models.Index(fields=["created_at", "id"], name="property_created_id_idx"),
+            models.Index(fields=["price", "id"], name="property_price_id_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -168,6 +224,36 @@ class Property(models.Model):
         return self.title
 
 
+class PropertySearchDocument(models.Model):
+    """
+    Read-only mapping of the SQLite FTS5 search table (see properties.search).
+    Lets the ORM join listings to the full-text index; it does not exist on
+    PostgreSQL, which searches ``Property.search_vector`` instead.
+    """
+
+    property = models.OneToOneField(
+        Property,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        related_name="search_document",
+    )
+    title = models.TextField()
+    location = models.TextField()
+    description = models.TextField()
+    # FTS5 hidden columns: the table-named column is the MATCH target and
+    # ``rank`` is the weighted bm25() score of the current match.
+    document = models.TextField(db_column=FTS_TABLE)
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = FTS_TABLE
+
+
+PropertySearchDocument._meta.get_field("document").register_lookup(FullTextMatch)
+
+
 class PropertyImage(models.Model):
     property = models.ForeignKey(
         Property, on_delete=models.CASCADE, related_name="property_images"
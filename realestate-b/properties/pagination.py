@@ -0,0 +1,138 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PropertyFeedPagination(PageNumberPagination):
+    """
+    The project's default page-number pagination with an opt-in keyset mode.
+
+    ``?pagination=cursor`` switches to keyset pagination over
+    ``(<ordering field>, id)``: pages are fetched with a ``WHERE`` on the last
+    row seen instead of ``OFFSET``, and no ``COUNT(*)`` is run, so deep pages
+    cost the same as the first one. The response then has ``next``/``previous``
+    links carrying an opaque ``cursor`` parameter instead of ``count``.
+
+    Keyset mode orders by the ``ordering`` query parameter (one of
+    ``orderings``, default ``-created_at``), which takes precedence over
+    search relevance.
+    """
+
+    mode_query_param = "pagination"
+    cursor_query_param = "cursor"
+    orderings = ("-created_at", "created_at", "-price", "price")
+    default_ordering = "-created_at"
+    invalid_cursor_message = "Invalid cursor"
+
+    keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = request.query_params.get(self.mode_query_param) == "cursor"
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        ordering = request.query_params.get("ordering")
+        if ordering not in self.orderings:
+            ordering = self.default_ordering
+        self.ordering = ordering
+        self.field = ordering.lstrip("-")
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+        descending = ordering.startswith("-") != reverse
+        if descending:
+            queryset = queryset.order_by(f"-{self.field}", "-id")
+        else:
+            queryset = queryset.order_by(self.field, "id")
+        if position is not None:
+            value, pk = position
+            lookup = "lt" if descending else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{self.field}__{lookup}": value})
+                | Q(**{self.field: value, f"id__{lookup}": pk})
+            )
+
+        # One extra row tells us whether there is a page beyond this one
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = position is not None if not reverse else has_more
+        return rows
+
+    def result_count(self):
+        """
+        The total number of results when known without another query: the
+        page-number count, or a keyset first page with nothing after it.
+        """
+        if not self.keyset:
+            page = getattr(self, "page", None)
+            return page.paginator.count if page is not None else None
+        if self.has_previous or self.has_next:
+            return None
+        return len(self.page)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        value = getattr(obj, self.field)
+        payload = {
+            "o": self.ordering,
+            "v": value.isoformat() if hasattr(value, "isoformat") else str(value),
+            "id": obj.pk,
+            "r": int(reverse),
+        }
+        token = urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        url = remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        """Return ``((value, id), reverse)``, or ``(None, False)`` on page one."""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(token.encode()))
+            # A cursor is only valid for the ordering it was issued for
+            if payload["o"] != self.ordering:
+                raise ValueError
+            value = model._meta.get_field(self.field).to_python(payload["v"])
+            return (value, int(payload["id"])), bool(payload["r"])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
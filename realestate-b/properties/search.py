@@ -0,0 +1,215 @@
+"""
+Full-text search for property listings.
+
+PostgreSQL keeps a weighted ``tsvector`` in ``Property.search_vector`` (GIN
+indexed by migration 0010). SQLite mirrors the searchable text into an FTS5
+virtual table keyed by property id. Any other backend falls back to the old
+``icontains`` matching so search keeps working, just without an index.
+
+The index is maintained by the signals in ``properties.signals``. Writes that
+bypass signals (``bulk_create``, ``QuerySet.update``, raw SQL) should be
+followed by ``python manage.py rebuild_search_index``.
+"""
+import re
+import sqlite3
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models import F, FloatField, Lookup, Q, Value
+
+FTS_TABLE = "properties_property_fts"
+SEARCH_CONFIG = "english"
+
+# Fields whose changes require the property to be re-indexed
+INDEXED_FIELDS = {"title", "description", "location", "location_id", "location_name"}
+
+# Upper bound on terms taken from a single query string
+MAX_TERMS = 8
+
+# bm25() column weights for title, location and description
+FTS_RANK_FUNCTION = "bm25(10.0, 5.0, 1.0)"
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+# Weighted document: title (A) > location (B) > description (C)
+_PG_DOCUMENT_SQL = f"""
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(p.title, '')), 'A')
+    || setweight(to_tsvector('{SEARCH_CONFIG}', concat_ws(' ',
+        (SELECT concat_ws(' ', l.name, l.county)
+           FROM properties_location l WHERE l.id = p.location_id),
+        p.location_name)), 'B')
+    || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(p.description, '')), 'C')
+"""
+
+_FTS_DOCUMENT_SELECT = """
+    SELECT p.id,
+           coalesce(p.title, ''),
+           trim(coalesce(l.name, '') || ' ' || coalesce(l.county, '') || ' '
+                || coalesce(p.location_name, '')),
+           coalesce(p.description, '')
+      FROM properties_property p
+      LEFT JOIN properties_location l ON l.id = p.location_id
+"""
+
+
+class FullTextMatch(Lookup):
+    """``document__match``: an FTS5 ``MATCH`` against the whole table."""
+
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+@lru_cache(maxsize=None)
+def fts5_available():
+    """Whether the sqlite3 library this process links against has FTS5."""
+    try:
+        probe = sqlite3.connect(":memory:")
+        try:
+            probe.execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+        finally:
+            probe.close()
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def get_backend():
+    """Return the search backend for the default connection."""
+    if connection.vendor == "postgresql":
+        return "postgres"
+    if connection.vendor == "sqlite" and fts5_available():
+        return "fts5"
+    return "basic"
+
+
+def search_terms(query):
+    """Split a user query into at most ``MAX_TERMS`` lower-cased word terms."""
+    return _TERM_RE.findall((query or "").lower())[:MAX_TERMS]
+
+
+def normalize_query(query):
+    """
+    The canonical form of a query for analytics: its word terms, lower-cased
+    and single-spaced, so "Villa,  Karen" and "villa karen" count together.
+    """
+    return " ".join(_TERM_RE.findall((query or "").casefold()))[:255]
+
+
+def search_properties(queryset, query, location=None):
+    """
+    Filter ``queryset`` to properties matching ``query`` and annotate each row
+    with ``search_rank`` (higher is more relevant). Every term must match,
+    and the last characters of a term may be omitted ("apart" matches
+    "apartment"). Terms of ``location`` must match the location part of the
+    document (location name, county and free-text location).
+    """
+    terms = search_terms(query)
+    location_terms = search_terms(location)
+    if not terms and not location_terms:
+        return queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        ).none()
+
+    backend = get_backend()
+    if backend == "postgres":
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        # Weight B is the location part of the document
+        tsquery = SearchQuery(
+            " & ".join(
+                [f"{term}:*" for term in terms] + [f"{term}:*B" for term in location_terms]
+            ),
+            search_type="raw",
+            config=SEARCH_CONFIG,
+        )
+        return queryset.filter(search_vector=tsquery).annotate(
+            search_rank=SearchRank(F("search_vector"), tsquery)
+        )
+
+    if backend == "fts5":
+        match = " ".join(
+            [f'"{term}"*' for term in terms]
+            + [f'location : "{term}"*' for term in location_terms]
+        )
+        # FTS5 ``rank`` is bm25() (lower is better), weighted per column by
+        # FTS_RANK_FUNCTION to mirror the Postgres A/B/C weights.
+        return queryset.filter(search_document__document__match=match).annotate(
+            search_rank=F("search_document__rank") * -1
+        )
+
+    condition = Q()
+    for term in terms:
+        condition &= (
+            Q(title__icontains=term)
+            | Q(description__icontains=term)
+            | Q(location__name__icontains=term)
+        )
+    for term in location_terms:
+        condition &= Q(location__name__icontains=term)
+    return queryset.filter(condition).annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    )
+
+
+def _batches(ids, size=500):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def index_properties(property_ids):
+    """(Re)build the search document for the given property ids."""
+    backend = get_backend()
+    if backend == "basic":
+        return
+    with connection.cursor() as cursor:
+        for batch in _batches(property_ids):
+            if backend == "postgres":
+                cursor.execute(
+                    f"UPDATE properties_property p SET search_vector = {_PG_DOCUMENT_SQL} "
+                    "WHERE p.id = ANY(%s)",
+                    [batch],
+                )
+                continue
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", batch
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, location, description) "
+                f"{_FTS_DOCUMENT_SELECT} WHERE p.id IN ({placeholders})",
+                batch,
+            )
+
+
+def remove_from_index(property_ids):
+    """Drop deleted properties from the FTS5 table (Postgres needs nothing)."""
+    if get_backend() != "fts5":
+        return
+    with connection.cursor() as cursor:
+        for batch in _batches(property_ids):
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", batch
+            )
+
+
+def rebuild_index():
+    """Re-index every property in a single set-based statement."""
+    backend = get_backend()
+    with connection.cursor() as cursor:
+        if backend == "postgres":
+            cursor.execute(
+                f"UPDATE properties_property p SET search_vector = {_PG_DOCUMENT_SQL}"
+            )
+        elif backend == "fts5":
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, location, description) "
+                f"{_FTS_DOCUMENT_SELECT}"
+            )
+    return backend
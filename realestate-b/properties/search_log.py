@@ -0,0 +1,107 @@
+"""
+Buffered search logging.
+
+``PropertyListView`` and ``PropertySearchView`` record the first page of
+every search or filtered listing in an in-process buffer, which is
+bulk-inserted into ``analytics.SearchAnalytics`` after a response has been
+sent (``request_finished``) once it is older than
+``SEARCH_LOG_FLUSH_INTERVAL`` seconds or holds ``SEARCH_LOG_BUFFER_SIZE``
+searches, and once more when the process exits. Like
+``properties.view_counter``, searches still in the buffer when a process is
+killed are lost, and ``searched_at`` is the flush time.
+
+Each search is stored with its query normalized by
+``properties.search.normalize_query``, so popular queries group on the
+indexed ``normalized_query`` column.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from accounts.views import get_client_ip
+
+from .search import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+class SearchBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = []
+        self._started = time.monotonic()
+
+    def record(self, request, query, filters, results_count):
+        """
+        Buffer one search by ``request`` for ``query`` with the ``filters``
+        applied; ``results_count`` is None when it is not known.
+        """
+        ip_address = get_client_ip(request)
+        if not ip_address:
+            return
+        user = request.user if request.user.is_authenticated else None
+        query = (query or "").strip()[:255]
+        row = (
+            query,
+            normalize_query(query),
+            filters,
+            results_count,
+            user.pk if user else None,
+            ip_address,
+        )
+        with self._lock:
+            if not self._rows:
+                self._started = time.monotonic()
+            self._rows.append(row)
+
+    def is_due(self):
+        if not self._rows:
+            return False
+        if len(self._rows) >= settings.SEARCH_LOG_BUFFER_SIZE:
+            return True
+        return time.monotonic() - self._started >= settings.SEARCH_LOG_FLUSH_INTERVAL
+
+    def flush_if_due(self):
+        if self.is_due():
+            self.flush()
+
+    def flush(self):
+        """Write all buffered searches. Returns the number written."""
+        from analytics.models import SearchAnalytics
+
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+
+        try:
+            SearchAnalytics.objects.bulk_create(
+                [
+                    SearchAnalytics(
+                        search_query=query,
+                        normalized_query=normalized,
+                        filters_used=filters,
+                        results_count=results_count,
+                        user_id=user_id,
+                        ip_address=ip_address,
+                    )
+                    for query, normalized, filters, results_count, user_id, ip_address in rows
+                ],
+                batch_size=500,
+            )
+        except Exception:
+            logger.exception("Dropped %d buffered searches", len(rows))
+            return 0
+        return len(rows)
+
+    def clear(self):
+        with self._lock:
+            self._rows = []
+
+
+searches = SearchBuffer()
+
+atexit.register(searches.flush)
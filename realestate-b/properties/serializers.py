@@ -6,6 +6,27 @@ from .models import Property, Location, PropertyImage, SavedProperty
 from agents.serializers import AgentCompactSerializer
 
 
+def get_saved_property_ids(request):
+    """
+    Return the ids of the properties saved by the requesting user.
+
+    Loaded with a single query and cached on the request, so every serializer
+    rendering ``is_saved`` (including nested ones) shares the same lookup
+    instead of running one EXISTS query per property.
+    """
+    if not request or not request.user.is_authenticated:
+        return frozenset()
+    saved_ids = getattr(request, "_saved_property_ids", None)
+    if saved_ids is None:
+        saved_ids = frozenset(
+            SavedProperty.objects.filter(user=request.user)
+            .order_by()
+            .values_list("property_id", flat=True)
+        )
+        request._saved_property_ids = saved_ids
+    return saved_ids
+
+
 class LocationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Location
@@ -69,14 +90,7 @@ class PropertyListSerializer(serializers.ModelSerializer):
 
     def get_is_saved(self, obj):
         """Check if the current user has saved this property."""
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        from properties.models import SavedProperty
-        return SavedProperty.objects.filter(
-            user=request.user,
-            property=obj
-        ).exists()
+        return obj.pk in get_saved_property_ids(self.context.get("request"))
 
 
 class PropertyDetailSerializer(serializers.ModelSerializer):
@@ -93,7 +107,7 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Property
-        fields = "__all__"
+        exclude = ("search_vector",)
 
     def get_verification_status(self, obj):
         return "verified" if obj.is_verified else "pending"
@@ -101,14 +115,7 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
 
     def get_is_saved(self, obj):
         """Check if the current user has saved this property."""
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        from properties.models import SavedProperty
-        return SavedProperty.objects.filter(
-            user=request.user,
-            property=obj
-        ).exists()
+        return obj.pk in get_saved_property_ids(self.context.get("request"))
 
 
 class PropertyCreateSerializer(serializers.ModelSerializer):
@@ -134,7 +141,7 @@ class PropertyCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Property
-        exclude = ("slug", "price_display", "views", "is_verified")
+        exclude = ("slug", "price_display", "views", "is_verified", "search_vector")
         extra_kwargs = {
             "main_image": {"required": False, "allow_null": True},
             "images": {"required": False, "allow_null": True},
@@ -334,11 +341,4 @@ class PropertySearchSerializer(serializers.ModelSerializer):
 
     def get_is_saved(self, obj):
         """Check if the current user has saved this property."""
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        from properties.models import SavedProperty
-        return SavedProperty.objects.filter(
-            user=request.user,
-            property=obj
-        ).exists()
+        return obj.pk in get_saved_property_ids(self.context.get("request"))
@@ -0,0 +1,42 @@
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Location, Property
+from .search import INDEXED_FIELDS, index_properties, remove_from_index
+from .search_log import searches
+from .view_counter import property_views
+
+
+@receiver(post_save, sender=Property)
+def update_property_search_index(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the full-text search document in sync with the listing."""
+    if update_fields is not None and not INDEXED_FIELDS.intersection(update_fields):
+        return
+    index_properties([instance.pk])
+
+
+@receiver(post_delete, sender=Property)
+def remove_property_from_search_index(sender, instance, **kwargs):
+    remove_from_index([instance.pk])
+
+
+@receiver(post_save, sender=Location)
+def reindex_location_properties(sender, instance, created, **kwargs):
+    """A renamed location changes the search document of all its listings."""
+    if created:
+        return
+    index_properties(
+        Property.objects.filter(location=instance).values_list("pk", flat=True)
+    )
+
+
+@receiver(request_finished)
+def flush_property_views(sender, **kwargs):
+    """Write buffered detail-page hits once the response has been sent."""
+    property_views.flush_if_due()
+
+
+@receiver(request_finished)
+def flush_search_log(sender, **kwargs):
+    """Write buffered searches once the response has been sent."""
+    searches.flush_if_due()
@@ -0,0 +1,117 @@
+"""
+Tests for keyset pagination on the public property feeds.
+"""
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from properties.models import Property
+
+pytestmark = [pytest.mark.api, pytest.mark.integration]
+
+
+@pytest.fixture
+def feed(property_factory):
+    """30 listings with pairwise-equal created_at and price values."""
+    properties = [
+        property_factory(title=f"Listing {i}", price=1_000_000 * (1 + i // 3))
+        for i in range(30)
+    ]
+    now = timezone.now()
+    for i, prop in enumerate(properties):
+        Property.objects.filter(pk=prop.pk).update(
+            created_at=now - timedelta(hours=i // 2)
+        )
+    return properties
+
+
+def _cursor_params(url):
+    return {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
+
+
+def _walk(api_client, url_name, params, link="next"):
+    """Follow ``link`` from the first page, returning ids in page order."""
+    ids, pages = [], 0
+    response = api_client.get(reverse(url_name), params)
+    while True:
+        assert response.status_code == status.HTTP_200_OK
+        ids.extend(row["id"] for row in response.data["results"])
+        pages += 1
+        if not response.data[link]:
+            return ids, pages, response
+        response = api_client.get(reverse(url_name), _cursor_params(response.data[link]))
+
+
+class TestKeysetPagination:
+    @pytest.mark.parametrize("url_name", ["property-list", "property-search"])
+    @pytest.mark.parametrize("ordering", ["-created_at", "created_at", "-price", "price"])
+    def test_walks_every_row_once_in_order(self, api_client, feed, url_name, ordering):
+        ids, pages, _ = _walk(
+            api_client, url_name, {"pagination": "cursor", "ordering": ordering}
+        )
+
+        field = ordering.lstrip("-")
+        expected = list(
+            Property.objects.order_by(ordering, f"{ordering[:-len(field)]}id")
+            .values_list("id", flat=True)
+        )
+        assert ids == expected
+        assert pages == 3
+
+    def test_previous_links_walk_back(self, api_client, feed):
+        forward, _, last_page = _walk(
+            api_client, "property-list", {"pagination": "cursor", "ordering": "price"}
+        )
+        params = _cursor_params(last_page.data["previous"])
+        backward, _, first_page = _walk(api_client, "property-list", params, "previous")
+
+        # Walking back revisits the earlier pages in their original order
+        assert backward == forward[12:24] + forward[:12]
+        assert first_page.data["previous"] is None
+
+    def test_response_has_no_count(self, api_client, feed, django_assert_max_num_queries):
+        with django_assert_max_num_queries(1):
+            response = api_client.get(reverse("property-list"), {"pagination": "cursor"})
+
+        assert "count" not in response.data
+        assert response.data["previous"] is None
+        assert len(response.data["results"]) == 12
+
+    def test_filters_apply(self, api_client, feed):
+        ids, _, _ = _walk(
+            api_client, "property-list", {"pagination": "cursor", "min_price": 8_000_000}
+        )
+
+        assert sorted(ids) == sorted(
+            Property.objects.filter(price__gte=8_000_000).values_list("id", flat=True)
+        )
+
+    @pytest.mark.parametrize("cursor", ["garbage", "eyJ2IjogMX0="])
+    def test_invalid_cursor_is_404(self, api_client, feed, cursor):
+        response = api_client.get(
+            reverse("property-list"), {"pagination": "cursor", "cursor": cursor}
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_cursor_is_bound_to_its_ordering(self, api_client, feed):
+        response = api_client.get(
+            reverse("property-list"), {"pagination": "cursor", "ordering": "price"}
+        )
+        params = _cursor_params(response.data["next"])
+        params["ordering"] = "-created_at"
+
+        response = api_client.get(reverse("property-list"), params)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_page_numbers_remain_the_default(self, api_client, feed):
+        response = api_client.get(reverse("property-list"), {"page": 2})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 30
+        assert len(response.data["results"]) == 12
@@ -0,0 +1,165 @@
+"""
+Query-count regression tests for the property listing endpoints.
+"""
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from properties.models import SavedProperty
+
+pytestmark = [pytest.mark.api, pytest.mark.integration]
+
+
+def _saved_property_queries(captured):
+    """Return the captured queries that read from the SavedProperty table."""
+    queries = []
+    for query in captured.captured_queries:
+        match = re.search(r'FROM\s+"(\w+)"', query["sql"])
+        if match and match.group(1) == SavedProperty._meta.db_table:
+            queries.append(query["sql"])
+    return queries
+
+
+@pytest.fixture
+def saved_listings(client_client, property_factory):
+    """Six verified listings, half of them saved by the client user."""
+    properties = [
+        property_factory(title=f"Listing {i}", is_featured=True) for i in range(6)
+    ]
+    for prop in properties[::2]:
+        SavedProperty.objects.create(user=client_client.user, property=prop)
+    return properties
+
+
+class TestIsSavedQueryCount:
+    """``is_saved`` is resolved with one SavedProperty query per request."""
+
+    def _get(self, api_client, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        return response, _saved_property_queries(captured)
+
+    @staticmethod
+    def _rows(response):
+        data = response.data
+        return data["results"] if isinstance(data, dict) else data
+
+    @pytest.mark.parametrize(
+        "url_name",
+        ["property-list", "property-search", "featured-properties"],
+    )
+    def test_public_listing_endpoints(self, client_client, saved_listings, url_name):
+        response, queries = self._get(client_client, reverse(url_name))
+
+        assert len(queries) == 1
+        saved_ids = {p.id for p in saved_listings[::2]}
+        for row in self._rows(response):
+            assert row["is_saved"] == (row["id"] in saved_ids)
+
+    def test_recommendations_endpoint(self, client_client, saved_listings):
+        response, queries = self._get(client_client, reverse("user-recommendations"))
+
+        assert len(queries) == 1
+        assert self._rows(response)
+        assert all(not row["is_saved"] for row in self._rows(response))
+
+    def test_management_listing_endpoint(
+        self, api_client, management_user_factory, property_factory
+    ):
+        manager = management_user_factory()
+        properties = [property_factory(title=f"Listing {i}") for i in range(4)]
+        SavedProperty.objects.create(user=manager, property=properties[0])
+        api_client.force_authenticate(user=manager)
+
+        response, queries = self._get(api_client, reverse("management-properties"))
+
+        assert len(queries) == 1
+        saved = [row["id"] for row in self._rows(response) if row["is_saved"]]
+        assert saved == [properties[0].id]
+
+    def test_saved_properties_endpoint(self, client_client, saved_listings):
+        response, queries = self._get(client_client, reverse("saved-properties"))
+
+        # Page count and page rows, plus the single saved-id lookup
+        assert len(queries) == 3
+        assert all(row["property"]["is_saved"] for row in self._rows(response))
+
+    def test_anonymous_requests_skip_the_lookup(self, api_client, saved_listings):
+        api_client.force_authenticate(user=None)
+        response, queries = self._get(api_client, reverse("property-list"))
+
+        assert queries == []
+        assert all(not row["is_saved"] for row in self._rows(response))
+
+
+@pytest.fixture
+def listings(property_factory, agent_user_factory):
+    """Factory creating ``count`` featured, verified listings owned by ``agent``."""
+    def create_listings(count, agent=None):
+        agent = agent or agent_user_factory()
+        return [
+            property_factory(title=f"Listing {i}", agent=agent, is_featured=True)
+            for i in range(count)
+        ]
+    return create_listings
+
+
+class TestListingQueryPlans:
+    """Listing endpoints make a fixed number of queries regardless of page size."""
+
+    @pytest.mark.parametrize("count", [1, 12])
+    @pytest.mark.parametrize(
+        "url_name", ["property-list", "property-search", "featured-properties"]
+    )
+    def test_public_endpoints(
+        self, api_client, listings, django_assert_max_num_queries, url_name, count
+    ):
+        listings(count)
+        with django_assert_max_num_queries(2):
+            response = api_client.get(reverse(url_name))
+        assert response.status_code == status.HTTP_200_OK
+
+    @pytest.mark.parametrize("count", [1, 12])
+    def test_agent_properties(
+        self, agent_client, listings, django_assert_max_num_queries, count
+    ):
+        listings(count, agent=agent_client.user)
+        with django_assert_max_num_queries(3):
+            response = agent_client.get(reverse("agent-properties"))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == count
+
+    @pytest.mark.parametrize("count", [1, 12])
+    def test_management_properties(
+        self, management_client, listings, django_assert_max_num_queries, count
+    ):
+        listings(count)
+        with django_assert_max_num_queries(3):
+            response = management_client.get(reverse("management-properties"))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == count
+
+    @pytest.mark.parametrize("count", [1, 12])
+    def test_recommendations(
+        self, client_client, listings, django_assert_max_num_queries, count
+    ):
+        listings(count)
+        with django_assert_max_num_queries(6):
+            response = client_client.get(reverse("user-recommendations"))
+        assert response.status_code == status.HTTP_200_OK
+
+    @pytest.mark.parametrize("count", [1, 12])
+    def test_saved_properties(
+        self, client_client, listings, django_assert_max_num_queries, count
+    ):
+        for prop in listings(count):
+            SavedProperty.objects.create(user=client_client.user, property=prop)
+        with django_assert_max_num_queries(3):
+            response = client_client.get(reverse("saved-properties"))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == count
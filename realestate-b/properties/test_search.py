@@ -0,0 +1,131 @@
+"""
+Tests for full-text property search (properties.search).
+"""
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from properties.models import Property
+from properties.search import search_properties, search_terms
+
+pytestmark = [pytest.mark.integration]
+
+
+def _search(query):
+    return list(
+        search_properties(Property.objects.all(), query)
+        .order_by("-search_rank", "-created_at")
+        .values_list("title", flat=True)
+    )
+
+
+class TestSearchTerms:
+    def test_splits_words_and_drops_syntax(self):
+        assert search_terms('Villa "pool" OR -garden*') == ["villa", "pool", "or", "garden"]
+
+    def test_limits_number_of_terms(self):
+        assert len(search_terms(" ".join(["word"] * 50))) == 8
+
+
+class TestSearchIndex:
+    def test_title_match_ranks_above_description_match(self, property_factory):
+        property_factory(title="Quiet Bungalow", description="Close to the beach")
+        property_factory(title="Beach Villa", description="Sea views")
+
+        assert _search("beach") == ["Beach Villa", "Quiet Bungalow"]
+
+    def test_all_terms_must_match(self, property_factory):
+        property_factory(title="Garden Villa", description="Has a pool")
+        property_factory(title="Garden Flat", description="Ground floor")
+
+        assert _search("garden pool") == ["Garden Villa"]
+
+    def test_prefix_matching(self, property_factory):
+        property_factory(title="Modern Apartment", description="")
+
+        assert _search("apart") == ["Modern Apartment"]
+
+    def test_matches_location_name(self, property_factory, location_factory):
+        property_factory(title="Family Home", location=location_factory(name="Kileleshwa"))
+
+        assert _search("kileleshwa") == ["Family Home"]
+
+    def test_location_matches_only_the_location(self, property_factory, location_factory):
+        property_factory(title="Westlands Loft", location=location_factory(name="Kilimani"))
+        property_factory(title="Garden Villa", location=location_factory(name="Westlands"))
+
+        found = search_properties(Property.objects.all(), "", location="westl")
+
+        assert list(found.values_list("title", flat=True)) == ["Garden Villa"]
+        assert search_properties(Property.objects.all(), "loft", location="westlands").count() == 0
+
+    def test_index_follows_title_updates(self, property_factory):
+        prop = property_factory(title="Old Title", description="")
+        prop.title = "Renovated Maisonette"
+        prop.save()
+
+        assert _search("old") == []
+        assert _search("maisonette") == ["Renovated Maisonette"]
+
+    def test_index_follows_location_rename(self, property_factory, location_factory):
+        location = location_factory(name="Ruaka")
+        property_factory(title="Corner Plot", location=location)
+        location.name = "Ruaka Town"
+        location.save()
+
+        assert _search("town") == ["Corner Plot"]
+
+    def test_deleted_properties_are_not_returned(self, property_factory):
+        prop = property_factory(title="Sold Duplex", description="")
+        prop.delete()
+
+        assert _search("duplex") == []
+
+    def test_query_without_terms_returns_nothing(self, property_factory):
+        property_factory(title="Villa")
+
+        assert _search("!!!") == []
+
+
+class TestSearchEndpoints:
+    def test_property_list_search_is_ranked(self, api_client, property_factory):
+        property_factory(title="Cosy Flat", description="Near a pool")
+        property_factory(title="Pool Villa", description="Large garden")
+
+        response = api_client.get(reverse("property-list"), {"search": "pool"})
+
+        assert response.status_code == status.HTTP_200_OK
+        titles = [row["title"] for row in response.data["results"]]
+        assert titles == ["Pool Villa", "Cosy Flat"]
+
+    def test_explicit_ordering_overrides_rank(self, api_client, property_factory):
+        property_factory(title="Pool Villa", price=9_000_000)
+        property_factory(title="Cosy Flat", description="Near a pool", price=1_000_000)
+
+        response = api_client.get(
+            reverse("property-list"), {"search": "pool", "ordering": "price"}
+        )
+
+        titles = [row["title"] for row in response.data["results"]]
+        assert titles == ["Cosy Flat", "Pool Villa"]
+
+    def test_property_search_endpoint_accepts_search(self, api_client, property_factory):
+        property_factory(title="Ocean View Apartment")
+        property_factory(title="Garden Bungalow")
+
+        response = api_client.get(reverse("property-search"), {"search": "ocean"})
+
+        assert response.status_code == status.HTTP_200_OK
+        titles = [row["title"] for row in response.data["results"]]
+        assert titles == ["Ocean View Apartment"]
+
+    def test_property_search_endpoint_filters_location(
+        self, api_client, property_factory, location_factory
+    ):
+        property_factory(title="Ocean View Apartment", location=location_factory(name="Nyali"))
+        property_factory(title="Garden Bungalow", location=location_factory(name="Karen"))
+
+        response = api_client.get(reverse("property-search"), {"location": "Nyali"})
+
+        titles = [row["title"] for row in response.data["results"]]
+        assert titles == ["Ocean View Apartment"]
@@ -0,0 +1,122 @@
+"""
+Tests for buffered search logging (properties.search_log).
+"""
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+
+from analytics.models import SearchAnalytics
+from properties.search import normalize_query
+from properties.search_log import searches
+
+pytestmark = [pytest.mark.integration]
+
+
+def _request(ip="10.0.0.1"):
+    request = APIRequestFactory().get("/", REMOTE_ADDR=ip)
+    request.user = AnonymousUser()
+    return request
+
+
+@pytest.mark.parametrize(
+    "query, normalized",
+    [
+        ("Villa", "villa"),
+        ("  Villa,   KAREN!! ", "villa karen"),
+        ("3-bedroom", "3 bedroom"),
+        ("", ""),
+    ],
+)
+def test_normalize_query(query, normalized):
+    assert normalize_query(query) == normalized
+
+
+class TestSearchBuffer:
+    def test_flush_bulk_inserts(self, db, django_assert_num_queries, settings):
+        settings.SEARCH_LOG_FLUSH_INTERVAL = 60
+        searches.record(_request(), "Ocean  View", {"bedrooms": "3"}, 4)
+        searches.record(_request(ip="10.0.0.2"), "ocean view", {}, None)
+
+        assert not searches.is_due()
+        assert not SearchAnalytics.objects.exists()
+        with django_assert_num_queries(1):
+            assert searches.flush() == 2
+
+        rows = SearchAnalytics.objects.order_by("pk")
+        assert [row.normalized_query for row in rows] == ["ocean view", "ocean view"]
+        assert rows[0].search_query == "Ocean  View"
+        assert rows[0].filters_used == {"bedrooms": "3"}
+        assert [row.results_count for row in rows] == [4, None]
+
+    def test_due_when_full(self, settings):
+        settings.SEARCH_LOG_FLUSH_INTERVAL = 60
+        settings.SEARCH_LOG_BUFFER_SIZE = 2
+        searches.record(_request(), "villa", {}, 1)
+        assert not searches.is_due()
+
+        searches.record(_request(), "villa", {}, 1)
+
+        assert searches.is_due()
+
+
+class TestListingViews:
+    def test_search_is_logged_after_response(self, api_client, property_factory):
+        property_factory(title="Beach Villa")
+
+        response = api_client.get(
+            reverse("property-list"), {"search": "Beach  villa", "bedrooms": "2"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        search = SearchAnalytics.objects.get()
+        assert search.normalized_query == "beach villa"
+        assert search.filters_used == {"bedrooms": "2"}
+        assert search.results_count == response.data["count"]
+
+    def test_multiple_values_and_search_view(self, api_client, property_factory):
+        property_factory()
+
+        api_client.get(reverse("property-search"), {"location": "Karen", "type": "house"})
+        api_client.get(
+            reverse("property-list"), {"property_type": ["bungalow", "apartment"]}
+        )
+
+        filters = [row.filters_used for row in SearchAnalytics.objects.order_by("pk")]
+        assert filters == [
+            {"location": "Karen", "type": "house"},
+            {"property_type": ["bungalow", "apartment"]},
+        ]
+
+    def test_keyset_count_only_when_single_page(self, api_client, property_factory):
+        property_factory()
+
+        api_client.get(reverse("property-list"), {"search": "x", "pagination": "cursor"})
+
+        assert SearchAnalytics.objects.get().results_count == 0
+
+    def test_plain_browsing_and_later_pages_are_not_logged(
+        self, api_client, property_factory
+    ):
+        for i in range(13):
+            property_factory(title=f"Villa {i}")
+
+        api_client.get(reverse("property-list"))
+        response = api_client.get(reverse("property-list"), {"search": "villa", "page": 2})
+
+        assert len(response.data["results"]) == 1
+        assert not SearchAnalytics.objects.exists()
+
+
+def test_popular_queries_group_normalized(management_client):
+    for query in ("Villa Karen", "villa  karen", "apartment"):
+        SearchAnalytics.objects.create(search_query=query, ip_address="10.0.0.1")
+    SearchAnalytics.objects.create(search_query="", ip_address="10.0.0.1")
+
+    response = management_client.get(reverse("search-analytics"))
+
+    assert response.data == [
+        {"query": "villa karen", "count": 2},
+        {"query": "apartment", "count": 1},
+    ]
@@ -0,0 +1,100 @@
+"""
+Tests for buffered property view counting (properties.view_counter).
+"""
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+
+from analytics.models import PropertyView
+from properties.models import Property
+from properties.view_counter import property_views
+
+pytestmark = [pytest.mark.integration]
+
+
+def _request(user=None, ip="10.0.0.1"):
+    request = APIRequestFactory().get("/", REMOTE_ADDR=ip, HTTP_USER_AGENT="pytest")
+    request.user = user or AnonymousUser()
+    return request
+
+
+class TestViewBuffer:
+    def test_flush_applies_counts_and_rows(self, property_factory, client_user_factory):
+        first, second = property_factory(title="First"), property_factory(title="Second")
+        user = client_user_factory()
+        updated_at = first.updated_at
+        for _ in range(3):
+            property_views.record(first, _request())
+        property_views.record(second, _request(user=user, ip="10.0.0.2"))
+
+        with CaptureQueriesContext(connection) as captured:
+            applied = property_views.flush()
+
+        assert applied == 4
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.views, second.views) == (3, 1)
+        # Counters are bumped in place, without a model save
+        assert first.updated_at == updated_at
+        assert PropertyView.objects.filter(property=first).count() == 3
+        assert PropertyView.objects.get(property=second).user == user
+        writes = [q for q in captured.captured_queries if q["sql"].startswith("UPDATE")]
+        assert len(writes) == 2
+
+    def test_flush_adds_to_concurrent_increments(self, property_factory):
+        prop = property_factory()
+        property_views.record(prop, _request())
+        Property.objects.filter(pk=prop.pk).update(views=10)
+
+        property_views.flush()
+
+        prop.refresh_from_db()
+        assert prop.views == 11
+
+    def test_deleted_properties_are_skipped(self, property_factory):
+        kept, deleted = property_factory(title="Kept"), property_factory(title="Gone")
+        property_views.record(kept, _request())
+        property_views.record(deleted, _request())
+        deleted.delete()
+
+        assert property_views.flush() == 1
+        assert PropertyView.objects.count() == 1
+
+    def test_flushes_when_buffer_is_full(self, settings, property_factory):
+        settings.PROPERTY_VIEW_FLUSH_INTERVAL = 3600
+        settings.PROPERTY_VIEW_BUFFER_SIZE = 2
+        prop = property_factory()
+
+        property_views.record(prop, _request())
+        property_views.flush_if_due()
+        prop.refresh_from_db()
+        assert prop.views == 0
+
+        property_views.record(prop, _request())
+        property_views.flush_if_due()
+        prop.refresh_from_db()
+        assert prop.views == 2
+
+
+class TestPropertyDetailView:
+    def test_detail_does_not_write(self, settings, api_client, property_factory):
+        settings.PROPERTY_VIEW_FLUSH_INTERVAL = 3600
+        prop = property_factory()
+        api_client.force_authenticate(user=None)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = api_client.get(reverse("property-detail", args=[prop.slug]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not [
+            q for q in captured.captured_queries
+            if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+        property_views.flush()
+        prop.refresh_from_db()
+        assert prop.views == 1
+        assert PropertyView.objects.filter(property=prop).count() == 1
@@ -0,0 +1,139 @@
+"""
+Buffered property view counting.
+
+``PropertyDetailView`` only records a hit in an in-process buffer; nothing is
+written while the request is being served. The buffer is flushed after a
+response has been sent (``request_finished``) once it is older than
+``PROPERTY_VIEW_FLUSH_INTERVAL`` seconds or holds ``PROPERTY_VIEW_BUFFER_SIZE``
+hits, and once more when the process exits.
+
+A flush applies the counts with one ``UPDATE ... SET views = views + n`` per
+distinct ``n``, so concurrent workers never overwrite each other's increments,
+and bulk-inserts the buffered ``analytics.PropertyView`` rows (``viewed_at``
+is therefore the flush time, at most one interval after the hit). Hits still
+in the buffer when a process is killed are lost.
+
+Views by signed-in users are then passed to ``leads.activity`` to log lead
+activity in the same batch, on the same best-effort terms, and the cached
+analytics of the viewed properties are dropped.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from accounts.views import get_client_ip
+
+from .models import Property
+
+logger = logging.getLogger(__name__)
+
+
+class ViewBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._rows = []
+        self._viewers = []
+        self._started = time.monotonic()
+
+    def record(self, property_obj, request):
+        """Buffer one view of ``property_obj`` by ``request``."""
+        user = request.user if request.user.is_authenticated else None
+        ip_address = get_client_ip(request)
+        with self._lock:
+            if not self._counts:
+                self._started = time.monotonic()
+            self._counts[property_obj.pk] += 1
+            if user:
+                self._viewers.append((property_obj.pk, user.pk))
+            if ip_address:
+                self._rows.append(
+                    (
+                        property_obj.pk,
+                        user.pk if user else None,
+                        ip_address,
+                        request.META.get("HTTP_USER_AGENT", ""),
+                    )
+                )
+
+    def is_due(self):
+        if not self._counts:
+            return False
+        if sum(self._counts.values()) >= settings.PROPERTY_VIEW_BUFFER_SIZE:
+            return True
+        return time.monotonic() - self._started >= settings.PROPERTY_VIEW_FLUSH_INTERVAL
+
+    def flush_if_due(self):
+        if self.is_due():
+            self.flush()
+
+    def flush(self):
+        """Write all buffered hits. Returns the number of views applied."""
+        with self._lock:
+            counts, rows, viewers = self._counts, self._rows, self._viewers
+            self._counts, self._rows, self._viewers = Counter(), [], []
+        if not counts:
+            return 0
+
+        try:
+            applied = self._write(counts, rows)
+        except Exception:
+            logger.exception("Dropped %d buffered property views", sum(counts.values()))
+            return 0
+
+        from analytics.property_stats import invalidate
+
+        invalidate(counts)
+
+        try:
+            from leads.activity import capture_property_views
+
+            capture_property_views(viewers)
+        except Exception:
+            logger.exception("Dropped lead activity for %d property views", len(viewers))
+        return applied
+
+    def clear(self):
+        with self._lock:
+            self._counts, self._rows, self._viewers = Counter(), [], []
+
+    def _write(self, counts, rows):
+        from analytics.models import PropertyView
+
+        # Listings deleted since the hit was recorded are skipped
+        existing = set(
+            Property.objects.filter(pk__in=counts).values_list("pk", flat=True)
+        )
+        by_increment = defaultdict(list)
+        for pk, n in counts.items():
+            if pk in existing:
+                by_increment[n].append(pk)
+
+        with transaction.atomic():
+            for n, pks in by_increment.items():
+                Property.objects.filter(pk__in=pks).update(views=F("views") + n)
+            PropertyView.objects.bulk_create(
+                [
+                    PropertyView(
+                        property_id=pk,
+                        user_id=user_id,
+                        ip_address=ip_address,
+                        user_agent=user_agent,
+                    )
+                    for pk, user_id, ip_address, user_agent in rows
+                    if pk in existing
+                ],
+                batch_size=500,
+            )
+        return sum(counts[pk] for pk in existing)
+
+
+property_views = ViewBuffer()
+
+atexit.register(property_views.flush)
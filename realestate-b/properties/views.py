@@ -5,18 +5,52 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db import models
-from django.db.models import Q, Count
+from django.db.models import Count
 from django.db.models.functions import Coalesce, NullIf
 from .models import *
 from .serializers import *
 from .filters import PropertyFilter
+from .pagination import PropertyFeedPagination
+from .view_counter import property_views
+from .search import search_properties
+from .search_log import searches
 
 
-class PropertyListView(generics.ListAPIView):
+class SearchLoggingMixin:
+    """
+    Logs the first page of every search or filtered listing to the search
+    log (``properties.search_log``). ``logged_filters`` are the query
+    parameters recorded as the filters used.
+    """
+
+    logged_filters = ()
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        paginator = self.paginator
+        if request.query_params.get(paginator.page_query_param, "1") != "1" or (
+            request.query_params.get(paginator.cursor_query_param)
+        ):
+            return response
+
+        query = request.query_params.get("search", "")
+        filters = {}
+        for name in self.logged_filters:
+            values = [value for value in request.query_params.getlist(name) if value]
+            if values:
+                filters[name] = values if len(values) > 1 else values[0]
+        if query.strip() or filters:
+            searches.record(request, query, filters, paginator.result_count())
+        return response
+
+
+class PropertyListView(SearchLoggingMixin, generics.ListAPIView):
     serializer_class = PropertyListSerializer
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend]
     filterset_class = PropertyFilter
+    pagination_class = PropertyFeedPagination
+    logged_filters = tuple(PropertyFilter.base_filters)
 
     def get_serializer_context(self):
         """Pass request to serializer for is_saved check."""
@@ -25,21 +59,23 @@ class PropertyListView(generics.ListAPIView):
         return context
 
     def get_queryset(self):
-        queryset = Property.objects.filter(status="available", is_verified=True)
+        queryset = Property.objects.for_listing().filter(
+            status="available", is_verified=True
+        )
 
-        # Search functionality
+        # Search functionality (full-text, ranked by relevance)
         search_query = self.request.query_params.get("search", None)
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query)
-                | Q(description__icontains=search_query)
-                | Q(location__name__icontains=search_query)
-            )
+            queryset = search_properties(queryset, search_query)
 
-        # Ordering
-        ordering = self.request.query_params.get("ordering", "-created_at")
+        # Ordering: an explicit ordering wins, searches default to relevance
+        ordering = self.request.query_params.get("ordering")
         if ordering in ["price", "-price", "created_at", "-created_at"]:
             queryset = queryset.order_by(ordering)
+        elif search_query:
+            queryset = queryset.order_by("-search_rank", "-created_at")
+        else:
+            queryset = queryset.order_by("-created_at")
 
         return queryset
 
@@ -58,58 +94,10 @@ class PropertyDetailView(generics.RetrieveAPIView):
     def get_queryset(self):
         return Property.objects.filter(is_verified=True)
 
-    def _create_property_view_activity(self, property_obj, user):
-        """Create LeadActivity for property view if user has a lead."""
-        from leads.models import Lead, LeadActivity
-        from django.utils import timezone
-        from django.contrib.auth import get_user_model
-
-        if not user or not user.is_authenticated:
-            return None
-
-        # Find leads where user is the client (not agent) - prioritize leads with this property
-        # First try leads that have this specific property
-        leads = Lead.objects.filter(user=user, property=property_obj)
-        
-        # If no lead with this property, check for any lead where user is the client
-        if not leads.exists():
-            leads = Lead.objects.filter(user=user)
-        
-        if not leads.exists():
-            return None
-
-        lead = leads.first()
-
-        # Check for recent activity to avoid duplicates (within last hour)
-        recent_activity = LeadActivity.objects.filter(
-            lead=lead,
-            activity_type="property_viewing",
-            created_at__gte=timezone.now() - timezone.timedelta(hours=1)
-        ).exists()
-
-        if recent_activity:
-            return None
-
-        # Create activity for the lead
-        activity = LeadActivity.objects.create(
-            lead=lead,
-            activity_type="property_viewing",
-            description=f"Viewed property: {property_obj.title}",
-            agent=lead.agent if lead.agent else None
-        )
-
-        # Update lead score
-        lead.update_score()
-
-        return activity
-
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.views += 1
-        instance.save()
-
-        # Create lead activity for authenticated users
-        self._create_property_view_activity(instance, request.user)
+        # Counted, and logged as lead activity, after the response is sent
+        property_views.record(instance, request)
 
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -143,7 +131,7 @@ class AgentPropertyListView(generics.ListAPIView):
         return context
 
     def get_queryset(self):
-        return Property.objects.filter(agent=self.request.user)
+        return Property.objects.for_listing().filter(agent=self.request.user)
 
 
 class LocationListView(generics.ListAPIView):
@@ -245,7 +233,7 @@ class PropertyDetailModifyView(generics.RetrieveUpdateDestroyAPIView):
 @api_view(["GET"])
 @permission_classes([permissions.AllowAny])
 def featured_properties(request):
-    properties = Property.objects.filter(
+    properties = Property.objects.for_listing().filter(
         is_featured=True, is_verified=True, status="available"
     )[:6]
     serializer = PropertyListSerializer(properties, many=True, context={'request': request})
@@ -257,7 +245,9 @@ class SavedPropertyListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return SavedProperty.objects.filter(user=self.request.user)
+        return SavedProperty.objects.filter(user=self.request.user).select_related(
+            "property__location", "property__agent"
+        )
 
     def get_serializer_class(self):
         if self.request.method == "POST":
@@ -302,9 +292,11 @@ class SavedPropertyDestroyView(generics.DestroyAPIView):
         return SavedProperty.objects.filter(user=self.request.user)
 
 
-class PropertySearchView(generics.ListAPIView):
+class PropertySearchView(SearchLoggingMixin, generics.ListAPIView):
     serializer_class = PropertySearchSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = PropertyFeedPagination
+    logged_filters = ("location", "min_price", "max_price", "type", "bedrooms")
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -312,12 +304,15 @@ class PropertySearchView(generics.ListAPIView):
         return context
 
     def get_queryset(self):
-        queryset = Property.objects.filter(status="available", is_verified=True)
+        queryset = Property.objects.for_listing().filter(
+            status="available", is_verified=True
+        )
 
-        # Location filter
+        # Free-text search and location filter, both through the search index
+        search_query = self.request.query_params.get("search", None)
         location = self.request.query_params.get("location", None)
-        if location:
-            queryset = queryset.filter(location__name__icontains=location)
+        if search_query or location:
+            queryset = search_properties(queryset, search_query, location=location)
 
         # Price range filter
         min_price = self.request.query_params.get("min_price", None)
@@ -337,6 +332,8 @@ class PropertySearchView(generics.ListAPIView):
         if bedrooms:
             queryset = queryset.filter(bedrooms=bedrooms)
 
+        if search_query:
+            return queryset.order_by("-search_rank", "-created_at")
         return queryset.order_by("-created_at")
 
 
@@ -359,19 +356,17 @@ class UserRecommendationsView(generics.ListAPIView):
         user = self.request.user
         
         # Import models here to avoid circular imports
-        from properties.models import SavedProperty
         from leads.models import Lead
         
         # Start with all available and verified properties
-        base_qs = Property.objects.filter(
+        base_qs = Property.objects.for_listing().filter(
             is_verified=True,
             status="available"
         )
         
-        # Get IDs of properties user has already saved (exclude these)
-        saved_property_ids = SavedProperty.objects.filter(
-            user=user
-        ).values_list('property_id', flat=True)
+        # Get IDs of properties user has already saved (exclude these).
+        # Shared with the serializer's is_saved lookup for this request.
+        saved_property_ids = list(get_saved_property_ids(self.request))
         
         # Get user's lead preferences
         user_leads = Lead.objects.filter(user=user)
@@ -393,12 +388,14 @@ class UserRecommendationsView(generics.ListAPIView):
                 max_budget = lead.budget_max
         
         # Get preferences from saved properties
-        saved_properties = Property.objects.filter(id__in=saved_property_ids)
-        for prop in saved_properties:
-            if prop.location:
-                preferred_locations.add(prop.location.name)
-            if prop.property_type:
-                preferred_property_types.add(prop.property_type)
+        saved_properties = Property.objects.filter(
+            id__in=saved_property_ids
+        ).values_list("location__name", "property_type")
+        for location_name, property_type in saved_properties:
+            if location_name:
+                preferred_locations.add(location_name)
+            if property_type:
+                preferred_property_types.add(property_type)
         
         # Build recommendation query
         recommendations = base_qs.exclude(id__in=saved_property_ids)
@@ -424,7 +421,7 @@ class UserRecommendationsView(generics.ListAPIView):
         # Check if we have any recommendations
         if not recommendations.exists():
             # Fallback: return featured properties for new users
-            recommendations = Property.objects.filter(
+            recommendations = Property.objects.for_listing().filter(
                 is_featured=True,
                 is_verified=True,
                 status="available"
@@ -471,7 +468,7 @@ class ManagementPropertyListView(generics.ListAPIView):
             return Property.objects.none()
 
         # Return ALL properties for management, ordered by verification status (unverified first) then date
-        return Property.objects.all().order_by("is_verified", "-created_at")
+        return Property.objects.for_listing().order_by("is_verified", "-created_at")
 
 
 class ManagementPropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
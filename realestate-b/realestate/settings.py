@@ -147,6 +147,26 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Chat messages are broadcast at once and written in batches by each process
+# (leads.message_buffer) this many milliseconds after the first one, or once
+# this many are waiting.
+
+CHAT_MESSAGE_FLUSH_MS = config("CHAT_MESSAGE_FLUSH_MS", default=100, cast=int)
+CHAT_MESSAGE_BUFFER_SIZE = config("CHAT_MESSAGE_BUFFER_SIZE", default=200, cast=int)
+
+# ─── Cache ────────────────────────────────────────────────────────────────────
+# Shared through the same Redis as the channel layer, so cached stats dropped
+# by one process are dropped for all of them. Without REDIS_URL each process
+# keeps its own cache, and other processes serve cached stats until they expire.
+
+CACHES = {
+    "default": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": _REDIS_URL}
+        if _REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    ),
+}
+
 # ─── REST Framework ───────────────────────────────────────────────────────────
 
 REST_FRAMEWORK = {
@@ -194,6 +214,49 @@ SIMPLE_JWT = {
     "USER_ID_CLAIM": "user_id",
 }
 
+# ─── Property view counting & search logging ──────────────────────────────────
+# Detail-page hits are buffered in each process and flushed in bulk once the
+# buffer is this many seconds old or holds this many hits.
+
+PROPERTY_VIEW_FLUSH_INTERVAL = config("PROPERTY_VIEW_FLUSH_INTERVAL", default=10, cast=int)
+PROPERTY_VIEW_BUFFER_SIZE = config("PROPERTY_VIEW_BUFFER_SIZE", default=500, cast=int)
+
+# Searches are buffered and flushed the same way.
+
+SEARCH_LOG_FLUSH_INTERVAL = config("SEARCH_LOG_FLUSH_INTERVAL", default=10, cast=int)
+SEARCH_LOG_BUFFER_SIZE = config("SEARCH_LOG_BUFFER_SIZE", default=500, cast=int)
+
+# Seconds a property's analytics are cached for; a flush of its views drops them.
+PROPERTY_ANALYTICS_CACHE_TTL = config("PROPERTY_ANALYTICS_CACHE_TTL", default=300, cast=int)
+
+# ─── Analytics retention ──────────────────────────────────────────────────────
+# Raw property views and searches older than this many days are archived to
+# MEDIA_ROOT/archive and deleted by `manage.py archive_analytics`; the daily
+# rollups keep their totals.
+
+PROPERTY_VIEW_RETENTION_DAYS = config("PROPERTY_VIEW_RETENTION_DAYS", default=180, cast=int)
+SEARCH_ANALYTICS_RETENTION_DAYS = config("SEARCH_ANALYTICS_RETENTION_DAYS", default=90, cast=int)
+ANALYTICS_ARCHIVE_FORMAT = config("ANALYTICS_ARCHIVE_FORMAT", default="jsonl")  # jsonl or csv
+ANALYTICS_ARCHIVE_BATCH_SIZE = config("ANALYTICS_ARCHIVE_BATCH_SIZE", default=5000, cast=int)
+
+# ─── Agent assignment ─────────────────────────────────────────────────────────
+# How new leads and bookings without an agent are assigned (agents.assignment):
+# least_busy, round_robin or rating_weighted.
+
+AGENT_ASSIGNMENT_STRATEGY = config("AGENT_ASSIGNMENT_STRATEGY", default="least_busy")
+
+# ─── CRM stats ────────────────────────────────────────────────────────────────
+# Seconds an agent's lead stats are cached for; 0 disables the cache.
+
+CRM_STATS_CACHE_TTL = config("CRM_STATS_CACHE_TTL", default=30, cast=int)
+
+# ─── Management dashboard ─────────────────────────────────────────────────────
+# The summary is rebuilt at most once per this many seconds (per days value);
+# for this many more a stale copy is served while one request rebuilds it.
+
+MANAGEMENT_SUMMARY_CACHE_TTL = config("MANAGEMENT_SUMMARY_CACHE_TTL", default=60, cast=int)
+MANAGEMENT_SUMMARY_STALE_TTL = config("MANAGEMENT_SUMMARY_STALE_TTL", default=300, cast=int)
+
 # ─── Security headers ─────────────────────────────────────────────────────────
 # Only enforce in production — Render always serves HTTPS
 